@@ -0,0 +1,89 @@
+"""
+Compare chunked pages cached as JSON records (to_dict + json with the cache serializer) with binary encoded records,
+where embeddings are float32 blocks loaded as lists or as zero-copy views of the stored rows (as the chunker loads
+them), all saved and loaded through the SQLite records cache of cache_util.
+Reports save and load seconds and stored size for synthetic pages with embeddings of the configured dimensions.
+
+Usage: python -m benchmarks.cache_codec_benchmark --pages 200 --chunks 10
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from contextlib import closing
+from random import Random
+
+from graph_rag.config.config_manager import default_config
+from graph_rag.data_model import Chunk, GraphPage, PageType
+from graph_rag.utils import cache_util
+
+BENCHMARK_KEY = 'benchmark'
+
+
+def generate_pages(count: int, chunks: int, dimensions: int, seed: int = 0) -> dict[str, GraphPage]:
+    random = Random(seed)
+    return {f"page{i}": GraphPage(f"page{i}", f"Page {i}", PageType.PAGE, f"https://notion.so/page{i}",
+                                  content='content ' * 200,
+                                  chunks=[Chunk('chunk ' * 100, [random.uniform(-1, 1) for _ in range(dimensions)])
+                                          for _ in range(chunks)])
+            for i in range(count)}
+
+
+def run_benchmark(pages: dict[str, GraphPage], repeats: int = 3) -> list[dict]:
+    """
+    Save and load the pages as cache records, stored as JSON when given as dicts and binary encoded as models, whose
+    embeddings are loaded as lists or, with zero_copy, as views of the stored rows.
+    """
+    variants = [
+        ('json', {page_id: page.to_dict() for page_id, page in pages.items()}, False,
+         lambda records: {page_id: GraphPage.from_dict(data) for page_id, data in records.items()}),
+        ('binary', pages, False, lambda records: records),
+        ('binary_zero_copy', pages, True, lambda records: records),
+    ]
+    data_dir = cache_util.config.DATA_DIR
+    cache_util.config.DATA_DIR = tempfile.mkdtemp()
+    try:
+        results = []
+        for name, records, zero_copy, to_pages in variants:
+            encode_seconds = decode_seconds = 0.0
+            for _ in range(repeats):
+                # Empty the entry first, otherwise unchanged records aren't written again
+                cache_util.delete_model_records(name, list(records), BENCHMARK_KEY)
+                start = time.perf_counter()
+                cache_util.save_model_records(name, records, GraphPage, BENCHMARK_KEY)
+                encode_seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                loaded = to_pages(cache_util.load_model_records(name, GraphPage, BENCHMARK_KEY, check_ttl=False,
+                                                                zero_copy=zero_copy))
+                decode_seconds += time.perf_counter() - start
+            if len(loaded) != len(pages):
+                raise Exception(f"{name} loaded {len(loaded)} of {len(pages)} pages")
+            results.append({'variant': name, 'bytes': _records_size(name),
+                            'encode_seconds': round(encode_seconds / repeats, 4),
+                            'decode_seconds': round(decode_seconds / repeats, 4)})
+        return results
+    finally:
+        shutil.rmtree(cache_util.config.DATA_DIR, ignore_errors=True)
+        cache_util.config.DATA_DIR = data_dir
+
+
+def _records_size(file_name: str) -> int:
+    with closing(cache_util._connect_records_db()) as conn:
+        return conn.execute("SELECT SUM(LENGTH(CAST(data AS BLOB))) FROM records WHERE file_name = ? AND key = ?",
+                            (file_name, BENCHMARK_KEY)).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--chunks', type=int, default=10, help="chunks (embeddings) per page")
+    parser.add_argument('--dimensions', type=int, default=int(default_config.EMBEDDINGS_DIMENSIONS))
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    pages = generate_pages(args.pages, args.chunks, args.dimensions)
+    print(json.dumps(run_benchmark(pages, args.repeats), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure how chunking of page content scales with the document size. Time per KB should stay flat as documents grow.
+
+Usage: python -m benchmarks.chunking_benchmark --sizes-kb 128 256 512 1024 --encoding cl100k_base
+"""
+import argparse
+import json
+import time
+from random import Random
+from unittest.mock import patch
+
+import tiktoken
+
+from graph_rag.processor.content_chunker_and_embedder import ChunkCreator, TokenCounter
+
+WORDS = ['knowledge', 'graph', 'page', 'notion', 'the', 'of', 'and', 'embedding', 'retrieval', 'chunk', 'token',
+         'sentence', 'database', 'relation', 'context', 'a', 'to', 'is', 'with', 'über', 'naïve']
+
+
+def generate_document(size_bytes: int, seed: int = 0) -> str:
+    """Markdown-like text with sentences, paragraphs and list items of random length."""
+    random = Random(seed)
+    parts, size = [], 0
+    while size < size_bytes:
+        sentence = ' '.join(random.choice(WORDS) for _ in range(random.randint(4, 30)))
+        part = random.choice([f"{sentence.capitalize()}. ", f"{sentence}?\n", f"- {sentence}\n", f"{sentence}\n\n"])
+        parts.append(part)
+        size += len(part.encode())
+    return ''.join(parts)
+
+
+def _byte_level_encoding() -> tiktoken.Encoding:
+    """Encoding with a token per byte, for running the benchmark without downloading OpenAI encodings."""
+    return tiktoken.Encoding('byte_level', pat_str=r"""\s?\S+|\s+""",
+                             mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={})
+
+
+def run_benchmark(sizes_kb: list[int], encoding_name: str = 'cl100k_base', chunk_size: int = 2000,
+                  chunk_overlap: int = 200, repeat: int = 3) -> list[dict]:
+    encoding = _byte_level_encoding() if encoding_name == 'byte_level' else tiktoken.get_encoding(encoding_name)
+    with patch('tiktoken.encoding_for_model', return_value=encoding):
+        chunk_creator = ChunkCreator(chunk_size, chunk_overlap, TokenCounter(encoding_name))
+    results = []
+    for size_kb in sizes_kb:
+        document = generate_document(size_kb * 1024)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chunks = chunk_creator.create_sentence_aware_chunks(document, chunk_size)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({'size_kb': size_kb, 'chunks': len(chunks), 'seconds': round(best, 4),
+                        'milliseconds_per_kb': round(best / size_kb * 1000, 3)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-kb', type=int, nargs='+', default=[128, 256, 512, 1024])
+    parser.add_argument('--encoding', default='cl100k_base',
+                        help="tiktoken encoding name, or byte_level to run offline")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="max tokens per chunk")
+    parser.add_argument('--chunk-overlap', type=int, default=200, help="overlapping tokens of adjacent chunks")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.sizes_kb, args.encoding, args.chunk_size, args.chunk_overlap, args.repeat),
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
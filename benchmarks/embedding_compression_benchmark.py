@@ -0,0 +1,91 @@
+"""
+Compare recall@k, size and search latency of chunk embeddings truncated to fewer dimensions against exact search
+over the full embeddings, to pick embeddings.truncate_dimensions. Quantization of the stored vectors is left to
+the Neo4j vector index (embeddings.index_quantization).
+
+Embeddings of our own data are read from the chunked pages cache (run the pipeline first), --synthetic embeds
+generated sentences with the offline hash backend instead (only for trying the benchmark out, hash embeddings
+aren't Matryoshka embeddings, so truncating them loses their neighbours). Held-out chunks are used as queries.
+
+Usage: python -m benchmarks.embedding_compression_benchmark --dimensions 256 512 1024 --k 10
+"""
+import argparse
+import heapq
+import json
+import operator
+import time
+from random import Random
+
+from graph_rag.config.config_manager import default_config
+from graph_rag.processor.content_chunker_and_embedder import CACHE_FILE_NAME, chunk_cache_key
+from graph_rag.processor.embedding_backends import HashEmbeddings
+from graph_rag.utils import cache_util
+from graph_rag.utils.vector_index import truncate_embedding
+
+WORDS = ['knowledge', 'graph', 'page', 'notion', 'project', 'goal', 'value', 'embedding', 'retrieval', 'chunk',
+         'meeting', 'book', 'idea', 'habit', 'health', 'finance', 'travel', 'family', 'career', 'learning']
+
+
+def load_cached_embeddings(cache_key: str) -> list[list[float]]:
+    pages = cache_util.load_prepared_pages_from_cache(cache_key, CACHE_FILE_NAME, check_ttl=False)
+    return [chunk.embedding for page in pages.values() for chunk in page.chunks if chunk.embedding]
+
+
+def generate_embeddings(count: int, dimensions: int, seed: int = 0) -> list[list[float]]:
+    random = Random(seed)
+    embeddings = HashEmbeddings(dimensions)
+    return embeddings.embed_documents([' '.join(random.choice(WORDS) for _ in range(random.randint(5, 40)))
+                                       for _ in range(count)])
+
+
+def exact_search(vectors: list[list[float]], query: list[float], k: int) -> list[int]:
+    scores = [sum(map(operator.mul, query, vector)) for vector in vectors]
+    return heapq.nlargest(k, range(len(vectors)), key=scores.__getitem__)
+
+
+def run_benchmark(embeddings: list[list[float]], dimensions: list[int], k: int = 10, queries: int = 50,
+                  seed: int = 0) -> list[dict]:
+    random = Random(seed)
+    embeddings = list(embeddings)
+    random.shuffle(embeddings)
+    query_vectors, corpus = embeddings[:queries], embeddings[queries:]
+    if not query_vectors or len(corpus) < k:
+        raise Exception(f"Not enough embeddings for {queries} queries and k={k}: {len(embeddings)}")
+    full_dimensions = len(corpus[0])
+    truth = [set(exact_search(corpus, query, k)) for query in query_vectors]
+
+    def measure(name: str, dims: int, bytes_per_vector: float, search) -> dict:
+        start = time.perf_counter()
+        found = [search(query) for query in query_vectors]
+        seconds = time.perf_counter() - start
+        recall = sum(len(expected & set(result)) for expected, result in zip(truth, found)) / (k * len(truth))
+        return {'variant': name, 'dimensions': dims, 'bytes_per_vector': round(bytes_per_vector, 1),
+                'recall_at_k': round(recall, 4), 'milliseconds_per_query': round(seconds / len(found) * 1000, 3)}
+
+    results = [measure('float32', full_dimensions, full_dimensions * 4,
+                       lambda query: exact_search(corpus, query, k))]
+    for dims in sorted({d for d in dimensions if d < full_dimensions}, reverse=True):
+        truncated = [truncate_embedding(vector, dims) for vector in corpus]
+        results.append(measure('float32', dims, dims * 4, lambda query: exact_search(
+            truncated, truncate_embedding(query, dims), k)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dimensions', type=int, nargs='+', default=[256, 512, 1024],
+                        help="truncated dimensions to compare with the full embeddings")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=50, help="held-out chunks used as queries")
+    parser.add_argument('--synthetic', type=int, metavar='COUNT',
+                        help="embed COUNT generated texts with the hash backend instead of reading the cache")
+    args = parser.parse_args()
+    if args.synthetic:
+        embeddings = generate_embeddings(args.synthetic, int(default_config.EMBEDDINGS_DIMENSIONS))
+    else:
+        embeddings = load_cached_embeddings(chunk_cache_key(default_config))
+    print(json.dumps(run_benchmark(embeddings, args.dimensions, args.k, args.queries), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure Notion ingestion throughput against a local mock of the Notion API serving a synthetic workspace.
+
+Usage: python -m benchmarks.ingestion_benchmark --pages 1000 --latency 0.05 --rate-limit-probability 0.01
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+
+from benchmarks.mock_notion_server import MockNotionServer
+from benchmarks.notion_workspace import generate_workspace
+from graph_rag.data_source.notion_provider import NotionProvider
+from graph_rag.data_source.web_scraper import BookmarkFetcher
+from graph_rag.utils.kv_cache import LRUMemoryCache
+from graph_rag.utils.rate_limiter import TokenBucket
+
+
+def run_benchmark(pages: int = 200, max_depth: int = 5, blocks_per_page: int = 20, databases: int = 2,
+                  items_per_database: int = 10, links_per_page: int = 2, bookmarks_per_page: int = 1,
+                  server_page_size: int = 100, latency: float = 0.0, rate_limit_probability: float = 0.0,
+                  concurrency: int = None, rate_limit: float = 1000, seed: int = 0) -> dict:
+    """Crawl a generated workspace with NotionProvider and return throughput, API usage and peak memory."""
+    with MockNotionServer(latency_seconds=latency, rate_limit_probability=rate_limit_probability,
+                          page_size=server_page_size, seed=seed) as server:
+        server.workspace = generate_workspace(pages, max_depth, blocks_per_page, databases, items_per_database,
+                                              links_per_page, bookmarks_per_page, f"{server.url}web/", seed)
+
+        provider = NotionProvider()
+        if concurrency:
+            provider.max_concurrency = concurrency
+        provider.checkpoint_interval = 0
+        provider.block_tree_cache = None
+        provider.bookmark_fetcher = BookmarkFetcher()
+        notion_api = provider.notion_api
+        notion_api.base_url = f"{server.url}v1/"
+        notion_api.cache = LRUMemoryCache(notion_api.cache.max_size_bytes)
+        notion_api.file_cache = None
+        notion_api.rate_limiter = TokenBucket(rate_limit, rate_limit)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        prepared_pages, page_relations = asyncio.run(provider.crawl(server.workspace.root_id))
+        elapsed = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    api_stats = notion_api.get_stats()
+    api_stats.pop('memory_cache')
+    api_calls = sum(stats['calls'] for stats in api_stats.values())
+    notion_pages = sum(1 for page in prepared_pages.values() if page.source == 'Notion')
+    return {
+        'expected_nodes': server.workspace.node_count,
+        'nodes': len(prepared_pages),
+        'notion_pages': notion_pages,
+        'relations': len(page_relations),
+        'seconds': round(elapsed, 3),
+        'pages_per_second': round(notion_pages / elapsed, 2),
+        'api_calls': api_calls,
+        'api_calls_per_page': round(api_calls / max(1, notion_pages), 2),
+        'retries': sum(stats['retries'] for stats in api_stats.values()),
+        'rate_limited_responses': server.rate_limited_count,
+        'peak_memory_mb': round(peak_memory / 1024 / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-depth', type=int, default=5)
+    parser.add_argument('--blocks-per-page', type=int, default=20)
+    parser.add_argument('--databases', type=int, default=2)
+    parser.add_argument('--items-per-database', type=int, default=10)
+    parser.add_argument('--links-per-page', type=int, default=2)
+    parser.add_argument('--bookmarks-per-page', type=int, default=1)
+    parser.add_argument('--server-page-size', type=int, default=100, help="max items per paginated response")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every mock API response")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0,
+                        help="fraction of API requests answered with 429")
+    parser.add_argument('--concurrency', type=int, help="overrides notion_api.crawler.max_concurrency")
+    parser.add_argument('--rate-limit', type=float, default=1000, help="client-side requests per second")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_benchmark(args.pages, args.max_depth, args.blocks_per_page, args.databases,
+                           args.items_per_database, args.links_per_page, args.bookmarks_per_page,
+                           args.server_page_size, args.latency, args.rate_limit_probability, args.concurrency,
+                           args.rate_limit, args.seed)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
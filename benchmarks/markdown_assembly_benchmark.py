@@ -0,0 +1,73 @@
+"""
+Measure how rendering of page markdown scales with the page size. Time per block should stay flat as pages grow.
+
+Usage: python -m benchmarks.markdown_assembly_benchmark --sizes 1000 4000 16000 64000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.notion_workspace import _rich_text
+from graph_rag.data_source.notion_provider import NotionProvider, CrawledNode, BlockNode
+
+PARAGRAPH_TEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+
+
+def _paragraph(block_id: str, segments: int) -> BlockNode:
+    rich_text = [_rich_text(PARAGRAPH_TEXT) for _ in range(segments)]
+    return {'id': block_id, 'type': 'paragraph', 'has_children': False, 'paragraph': {'rich_text': rich_text}}, None
+
+
+def build_page(block_count: int, nesting_depth: int, segments_per_block: int) -> list[BlockNode]:
+    """Page of `block_count` paragraphs spread over a chain of `nesting_depth` nested toggles."""
+    per_level = max(1, block_count // (nesting_depth + 1))
+    counter = iter(range(block_count + nesting_depth + 1))
+    top_level = children = []
+    for level in range(nesting_depth):
+        children.extend(_paragraph(f"block-{next(counter)}", segments_per_block) for _ in range(per_level))
+        nested = []
+        toggle = {'id': f"block-{next(counter)}", 'type': 'toggle', 'has_children': True,
+                  'toggle': {'rich_text': [_rich_text(f"Level {level}")]}}
+        children.append((toggle, nested))
+        children = nested
+    children.extend(_paragraph(f"block-{next(counter)}", segments_per_block)
+                    for _ in range(block_count - per_level * nesting_depth))
+    return top_level
+
+
+def render_page(provider: NotionProvider, page: list[BlockNode]) -> str:
+    node = CrawledNode()
+    content = []
+    for block_node in page:
+        provider._render_block(node, block_node, content, parent_id='page')
+    return ''.join(content)
+
+
+def run_benchmark(sizes: list[int], nesting_depth: int = 50, segments_per_block: int = 3, repeat: int = 3) -> list[dict]:
+    provider = NotionProvider()
+    results = []
+    for size in sizes:
+        page = build_page(size, nesting_depth, segments_per_block)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            markdown = render_page(provider, page)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({'blocks': size, 'markdown_mb': round(len(markdown) / 1024 / 1024, 2),
+                        'seconds': round(best, 4), 'microseconds_per_block': round(best / size * 1e6, 2)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 4000, 16000, 64000])
+    parser.add_argument('--nesting-depth', type=int, default=50, help="depth of the nested toggles chain")
+    parser.add_argument('--segments-per-block', type=int, default=3, help="rich text segments per paragraph")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.sizes, args.nesting_depth, args.segments_per_block, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.notion_workspace import SyntheticWorkspace
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients (e.g. the bookmark fetcher reading only <head>) may close connections before the response is sent
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockNotionServer:
+    """
+    Local stand-in for the Notion API serving a SyntheticWorkspace under `{url}v1/`, and minimal html pages for
+    bookmarks under `{url}web/`. Every request is delayed by `latency_seconds`, and a `rate_limit_probability`
+    fraction of API requests is answered with 429 and a Retry-After header.
+    """
+
+    def __init__(self, workspace: SyntheticWorkspace = None, latency_seconds: float = 0.0,
+                 rate_limit_probability: float = 0.0, retry_after_seconds: float = 0.1, page_size: int = 100,
+                 seed: int = 0):
+        self.workspace = workspace
+        self.latency_seconds = latency_seconds
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after_seconds = retry_after_seconds
+        self.page_size = page_size
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> 'MockNotionServer':
+        handler = type('Handler', (_NotionRequestHandler,), {'mock': self})
+        self._server = _QuietHTTPServer(('127.0.0.1', 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-notion-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> 'MockNotionServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count_request(self, is_api: bool) -> bool:
+        """Count the request, returns True if it should be rate-limited."""
+        with self._lock:
+            self.request_count += 1
+            if is_api and self._random.random() < self.rate_limit_probability:
+                self.rate_limited_count += 1
+                return True
+            return False
+
+    def paginate(self, items: list, start_cursor: str | None, page_size: int | None) -> dict:
+        start = int(start_cursor) if start_cursor else 0
+        end = start + min(page_size or 100, self.page_size)
+        has_more = end < len(items)
+        return {'object': 'list', 'results': items[start:end], 'next_cursor': str(end) if has_more else None,
+                'has_more': has_more}
+
+
+class _NotionRequestHandler(BaseHTTPRequestHandler):
+    mock: MockNotionServer
+    protocol_version = 'HTTP/1.1'
+
+    GET_ROUTES = [
+        (re.compile(r'^/v1/pages/([\w-]+)/properties/([\w%-]+)$'), '_get_page_property'),
+        (re.compile(r'^/v1/pages/([\w-]+)$'), '_get_page'),
+        (re.compile(r'^/v1/blocks/([\w-]+)/children$'), '_get_block_children'),
+        (re.compile(r'^/v1/databases/([\w-]+)$'), '_get_database'),
+        (re.compile(r'^/web/(\w+)$'), '_get_web_page'),
+    ]
+    POST_ROUTES = [
+        (re.compile(r'^/v1/databases/([\w-]+)/query$'), '_query_database'),
+        (re.compile(r'^/v1/search$'), '_search'),
+    ]
+
+    def do_GET(self):
+        self._dispatch(self.GET_ROUTES)
+
+    def do_POST(self):
+        self._dispatch(self.POST_ROUTES)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, routes: list):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.mock._count_request(url.path.startswith('/v1/')):
+            return self._send_json(429, {'object': 'error', 'status': 429, 'code': 'rate_limited'},
+                                   {'Retry-After': str(self.mock.retry_after_seconds)})
+        time.sleep(self.mock.latency_seconds)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if body:
+            params.update(json.loads(body))
+        for pattern, handler_name in routes:
+            match = pattern.match(url.path)
+            if match:
+                return getattr(self, handler_name)(*[object_id.replace('-', '') for object_id in match.groups()],
+                                                   params)
+        self._send_not_found()
+
+    def _get_page(self, page_id: str, _params: dict):
+        page = self.mock.workspace.objects.get(page_id)
+        if not page or page['object'] != 'page':
+            return self._send_not_found()
+        self._send_json(200, page)
+
+    def _get_database(self, database_id: str, _params: dict):
+        database = self.mock.workspace.objects.get(database_id)
+        if not database or database['object'] != 'database':
+            return self._send_not_found()
+        self._send_json(200, database)
+
+    def _get_page_property(self, page_id: str, property_id: str, params: dict):
+        page = self.mock.workspace.objects.get(page_id)
+        prop = next((prop for prop in (page or {}).get('properties', {}).values() if prop['id'] == property_id), None)
+        if prop is None:
+            return self._send_not_found()
+        items = [{'object': 'property_item', 'type': prop['type'], prop['type']: value}
+                 for value in prop[prop['type']]]
+        self._send_json(200, self.mock.paginate(items, params.get('start_cursor'), int(params.get('page_size', 100))))
+
+    def _get_block_children(self, block_id: str, params: dict):
+        children = self.mock.workspace.children.get(block_id, [])
+        self._send_json(200, self.mock.paginate(children, params.get('start_cursor'),
+                                                int(params.get('page_size', 100))))
+
+    def _query_database(self, database_id: str, params: dict):
+        if database_id not in self.mock.workspace.database_items:
+            return self._send_not_found()
+        items = self.mock.workspace.database_items[database_id]
+        self._send_json(200, self.mock.paginate(items, params.get('start_cursor'), params.get('page_size')))
+
+    def _search(self, params: dict):
+        objects = [obj for obj in self.mock.workspace.objects.values()
+                   if not params.get('query') or params['query'] in json.dumps(obj.get('properties'))]
+        self._send_json(200, self.mock.paginate(objects, params.get('start_cursor'), params.get('page_size')))
+
+    def _get_web_page(self, page_number: str, _params: dict):
+        html = (f'<html><head><title>Bookmark {page_number}</title>'
+                f'<meta name="description" content="Synthetic bookmark {page_number}"></head>'
+                f'<body>{"Lorem ipsum " * 1000}</body></html>').encode()
+        self._send(200, html, 'text/html; charset=utf-8')
+
+    def _send_not_found(self):
+        self._send_json(404, {'object': 'error', 'status': 404, 'code': 'object_not_found'})
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        self._send(status, json.dumps(payload).encode(), 'application/json', headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,122 @@
+import random
+import uuid
+from dataclasses import dataclass, field
+
+EDITED_TIME = "2024-01-01T00:00:00.000Z"
+
+
+def _rich_text(text: str, href: str = None) -> dict:
+    return {'type': 'text', 'plain_text': text, 'href': href,
+            'text': {'content': text, 'link': {'url': href} if href else None},
+            'annotations': {'bold': False, 'italic': False, 'strikethrough': False, 'underline': False,
+                            'code': False, 'color': 'default'}}
+
+
+def _notion_url(object_id: str) -> str:
+    return f"https://www.notion.so/{object_id.replace('-', '')}"
+
+
+@dataclass
+class SyntheticWorkspace:
+    """Notion objects of a generated workspace, in the shapes returned by the Notion API. Keys are undashed ids."""
+    root_id: str
+    objects: dict[str, dict] = field(default_factory=dict)
+    children: dict[str, list[dict]] = field(default_factory=dict)
+    database_items: dict[str, list[dict]] = field(default_factory=dict)
+    bookmark_urls: set[str] = field(default_factory=set)
+
+    @property
+    def node_count(self) -> int:
+        """Number of pages, databases and bookmarks a full crawl from the root is expected to produce."""
+        return len(self.objects) + len(self.bookmark_urls)
+
+
+class _WorkspaceGenerator:
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.random.getrandbits(128)))
+
+    def page(self, title: str, parent: dict) -> dict:
+        page_id = self.new_id()
+        title_property = {'id': 'title', 'type': 'title', 'title': [_rich_text(title)]}
+        return {'object': 'page', 'id': page_id, 'created_time': EDITED_TIME, 'last_edited_time': EDITED_TIME,
+                'archived': False, 'in_trash': False, 'url': _notion_url(page_id), 'parent': parent,
+                'properties': {'title' if parent['type'] != 'database_id' else 'Name': title_property}}
+
+    def database(self, title: str, parent: dict) -> dict:
+        database_id = self.new_id()
+        return {'object': 'database', 'id': database_id, 'created_time': EDITED_TIME,
+                'last_edited_time': EDITED_TIME, 'archived': False, 'in_trash': False,
+                'url': _notion_url(database_id), 'parent': parent, 'title': [_rich_text(title)],
+                'properties': {'Name': {'id': 'title', 'type': 'title', 'title': {}}}}
+
+    def block(self, block_type: str, payload: dict, has_children: bool = False, block_id: str = None) -> dict:
+        return {'object': 'block', 'id': block_id or self.new_id(), 'type': block_type,
+                'created_time': EDITED_TIME, 'last_edited_time': EDITED_TIME, 'has_children': has_children,
+                'archived': False, block_type: payload}
+
+    def paragraph(self, text: str, href: str = None) -> dict:
+        rich_text = [_rich_text(text)]
+        if href:
+            rich_text.append(_rich_text(' link', href))
+        return self.block('paragraph', {'rich_text': rich_text, 'color': 'default'})
+
+
+def generate_workspace(page_count: int = 100, max_depth: int = 5, blocks_per_page: int = 20, databases: int = 2,
+                       items_per_database: int = 10, links_per_page: int = 2, bookmarks_per_page: int = 0,
+                       web_base_url: str = None, seed: int = 0) -> SyntheticWorkspace:
+    """
+    Generate a random but reproducible workspace: a tree of `page_count` pages (root included) at most
+    `max_depth` levels deep, with `databases` databases of `items_per_database` items placed under random pages.
+    Every page and database item has `blocks_per_page` blocks (every 10th block is a toggle with two nested
+    paragraphs), `links_per_page` of which mention random other pages. Bookmarks point to `web_base_url`.
+    """
+    gen = _WorkspaceGenerator(seed)
+    root = gen.page('Root', {'type': 'workspace', 'workspace': True})
+    workspace = SyntheticWorkspace(root['id'].replace('-', ''))
+    pages = [root]
+    depths = {root['id']: 0}
+    for i in range(1, page_count):
+        parent = gen.random.choice([page for page in pages if depths[page['id']] < max_depth - 1] or pages)
+        page = gen.page(f"Page {i}", {'type': 'page_id', 'page_id': parent['id']})
+        depths[page['id']] = depths[parent['id']] + 1
+        pages.append(page)
+        workspace.children.setdefault(parent['id'].replace('-', ''), []).append(
+            gen.block('child_page', {'title': f"Page {i}"}, has_children=True, block_id=page['id']))
+
+    content_pages = list(pages)
+    for i in range(databases):
+        parent = gen.random.choice(pages)
+        database = gen.database(f"Database {i}", {'type': 'page_id', 'page_id': parent['id']})
+        workspace.children.setdefault(parent['id'].replace('-', ''), []).append(
+            gen.block('child_database', {'title': f"Database {i}"}, block_id=database['id']))
+        items = [gen.page(f"Item {i}.{j}", {'type': 'database_id', 'database_id': database['id']})
+                 for j in range(items_per_database)]
+        workspace.database_items[database['id'].replace('-', '')] = items
+        workspace.objects[database['id'].replace('-', '')] = database
+        content_pages.extend(items)
+
+    for page in content_pages:
+        page_id = page['id'].replace('-', '')
+        workspace.objects[page_id] = page
+        blocks = []
+        link_positions = set(gen.random.sample(range(blocks_per_page), min(links_per_page, blocks_per_page)))
+        for i in range(blocks_per_page):
+            if i % 10 == 9:
+                toggle = gen.block('toggle', {'rich_text': [_rich_text(f"Toggle {i}")], 'color': 'default'},
+                                   has_children=True)
+                workspace.children[toggle['id'].replace('-', '')] = [gen.paragraph(f"Nested {i}.{j}")
+                                                                     for j in range(2)]
+                blocks.append(toggle)
+                continue
+            href = _notion_url(gen.random.choice(content_pages)['id']) if i in link_positions else None
+            blocks.append(gen.paragraph(f"Paragraph {i} of {page['id']}", href))
+        if web_base_url:
+            for _ in range(bookmarks_per_page):
+                url = f"{web_base_url}{gen.random.randrange(page_count * max(1, bookmarks_per_page))}"
+                workspace.bookmark_urls.add(url)
+                blocks.append(gen.block('bookmark', {'url': url, 'caption': []}))
+        workspace.children[page_id] = workspace.children.get(page_id, []) + blocks
+    return workspace
@@ -1,19 +1,25 @@
 import openai
 from graph_rag.config.config_manager import Config
+from graph_rag.utils.metrics import run_metrics
+from graph_rag.utils.rate_scheduler import PRIORITY_BACKFILL, scheduled_http_client
 
 class BaseAgent:
     def __init__(self):
         self.config = Config()
-        openai.api_key = self.config.OPENAI_API_KEY
         self.model = self.config.LLM_MODEL
         self.temperature = self.config.LLM_TEMPERATURE
         self.max_tokens = self.config.LLM_MAX_TOKENS
+        self.client = openai.OpenAI(
+            api_key=self.config.OPENAI_API_KEY,
+            http_client=scheduled_http_client(f"openai/{self.model}", self.config, PRIORITY_BACKFILL,
+                                              run_metrics.httpx_event_hooks('openai'))
+        )
 
     def generate_response(self, prompt):
-        response = openai.ChatCompletion.create(
+        response = self.client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=self.temperature,
             max_tokens=self.max_tokens
         )
-        return response.choices[0].message['content'].strip()
+        return response.choices[0].message.content.strip()
@@ -21,14 +21,26 @@ class Config:
         self.NOTION_API_BASE_URL: str = notion_config['base_url']
         self.NOTION_API_VERSION: str = notion_config['version']
         self.NOTION_API_TIMEOUT: int = notion_config['timeout']
+        self.NOTION_API_POOL_SIZE: int = notion_config['http']['pool_size']
+        self.NOTION_API_RATE_LIMIT_PER_SECOND: float = notion_config['http']['rate_limit_per_second']
+        self.NOTION_API_RATE_LIMIT_BURST: int = notion_config['http']['rate_limit_burst']
+        self.NOTION_API_MAX_RETRIES: int = notion_config['http']['max_retries']
+        self.NOTION_API_BACKOFF_BASE_SECONDS: float = notion_config['http']['backoff_base_seconds']
+        self.NOTION_API_BACKOFF_MAX_SECONDS: float = notion_config['http']['backoff_max_seconds']
+        self.NOTION_API_PRUNE_RESPONSES: bool = notion_config['prune_responses']
         self.NOTION_CACHE_TTL_SECONDS: int = notion_config['cache_ttl_seconds']
+        self.NOTION_MEMORY_CACHE_MAX_SIZE_MB: int = notion_config['memory_cache_max_size_mb']
         self.NOTION_CACHE_PATH: str = notion_config['cache_path']
+        self.NOTION_CACHE_MAX_SIZE_MB: int = notion_config['cache_max_size_mb']
         self.NOTION_ROOT_PAGE_ID = notion_config['root_page_id']
+        self.NOTION_SYNC_MODE: str = notion_config['sync_mode']
         self.NOTION_PAGE_MAX_DEPTH: int = notion_config['page_max_depth']
         self.NOTION_ADD_ARCHIVED_PAGE_NODES: bool = notion_config['add_archived_page_nodes']
         self.NOTION_ADD_REMOVED_PAGE_NODES: bool = notion_config['add_removed_page_nodes']
         self.NOTION_CREATE_UNPROCESSED_NODES: bool = notion_config['create_unprocessed_graph_nodes']
         self.NOTION_RECURSIVE_PROCESS_REFERENCE_PAGES: bool = notion_config['recursive_process_reference_pages']
+        self.NOTION_CRAWLER_MAX_CONCURRENCY: int = notion_config['crawler']['max_concurrency']
+        self.NOTION_CRAWLER_CHECKPOINT_INTERVAL_SECONDS: int = notion_config['crawler']['checkpoint_interval_seconds']
         self.NOTION_MARKDOWN_INDENT: str = notion_config['markdown_parser_options']['indent']
         self.NOTION_MARKDOWN_PARSER_EXCLUDED_PROPERTY_TYPES: list = notion_config['markdown_parser_options']['excluded_property_types']
         self.NOTION_MARKDOWN_PARSER_EXCLUDED_BLOCK_TYPES: list = notion_config['markdown_parser_options']['excluded_block_types']
@@ -45,26 +57,66 @@ class Config:
 
         # Embeddings configuration
         embeddings_config = config_data['embeddings']
+        self.EMBEDDINGS_BACKEND: str = embeddings_config['backend']
         self.EMBEDDINGS_MODEL: str = embeddings_config['model']
         self.EMBEDDINGS_DIMENSIONS: str = embeddings_config['dimensions']
+        self.EMBEDDINGS_TRUNCATE_DIMENSIONS: int | None = embeddings_config['truncate_dimensions']
+        self.EMBEDDINGS_INDEX_QUANTIZATION: bool | None = embeddings_config['index_quantization']
         self.EMBEDDINGS_MAX_TOKENS: int = embeddings_config['max_tokens']
         self.EMBEDDINGS_OVERLAP: int = embeddings_config['overlap']
+        self.EMBEDDINGS_CHUNKING_WORKERS: int = embeddings_config['chunking_workers']
+        self.EMBEDDINGS_MAX_INPUTS_PER_REQUEST: int = embeddings_config['max_inputs_per_request']
+        self.EMBEDDINGS_MAX_TOKENS_PER_REQUEST: int = embeddings_config['max_tokens_per_request']
+        self.EMBEDDINGS_MAX_CONCURRENT_REQUESTS: int = embeddings_config['max_concurrent_requests']
+        self.EMBEDDINGS_STORE_PATH: str = embeddings_config['store_path']
+        self.EMBEDDINGS_LOCAL_MODEL: str = embeddings_config['local_model']
+        self.EMBEDDINGS_LOCAL_BATCH_SIZE: int = embeddings_config['local_batch_size']
+        self.EMBEDDINGS_LOCAL_WORKERS: int = embeddings_config['local_workers']
+        self.EMBEDDINGS_LOCAL_POOL: str = embeddings_config['local_pool']
         self.EMBEDDINGS_BASE_URL: str = embeddings_config['base_url']
         self.EMBEDDINGS_API_KEY: str = embeddings_config['api_key']
 
+        # Rate scheduler configuration
+        rate_scheduler_config = config_data['rate_scheduler']
+        self.RATE_SCHEDULER_REQUESTS_PER_MINUTE: float = rate_scheduler_config['requests_per_minute']
+        self.RATE_SCHEDULER_TOKENS_PER_MINUTE: float = rate_scheduler_config['tokens_per_minute']
+        self.RATE_SCHEDULER_MAX_CONCURRENCY: int = rate_scheduler_config['max_concurrency']
+
         # Neo4j configuration
         neo4j_config = config_data['neo4j']
         self.NEO4J_URI: str = neo4j_config['uri']
         self.NEO4J_USER: str = neo4j_config['user']
         self.NEO4J_PASSWORD: str = neo4j_config['password']
 
+        # Pipeline configuration
+        pipeline_config = config_data['pipeline']
+        self.PIPELINE_STREAMING: bool = pipeline_config['streaming']
+        self.PIPELINE_BATCH_SIZE: int = pipeline_config['batch_size']
+        self.PIPELINE_QUEUE_SIZE: int = pipeline_config['queue_size']
+        self.PIPELINE_MAX_SOURCE_WORKERS: int = pipeline_config['max_source_workers']
+        self.PIPELINE_PAGE_CONFLICT_POLICY: str = pipeline_config['page_conflict_policy']
+        self.PIPELINE_INCREMENTAL: bool = pipeline_config['incremental']
+
+        # Metrics configuration
+        metrics_config = config_data['metrics']
+        self.METRICS_REPORT_FILE: str = metrics_config['report_file']
+        self.METRICS_PROMETHEUS_TEXTFILE: str = metrics_config['prometheus_textfile']
+
         # Cache configuration
         cache_config = config_data['cache']
         self.CACHE_ENABLED: int = cache_config['enabled']
         self.CACHE_PATH: str = cache_config['path']
         self.CACHE_TTL_SECONDS: int = cache_config['ttl_seconds']
 
-        self.WEB_PARSER_TIMEOUT: int = config_data['web_parser']['timeout']
+        web_parser_config = config_data['web_parser']
+        self.WEB_PARSER_TIMEOUT: int = web_parser_config['timeout']
+        self.WEB_PARSER_MAX_WORKERS: int = web_parser_config['max_workers']
+        self.WEB_PARSER_PER_HOST_CONCURRENCY: int = web_parser_config['per_host_concurrency']
+        self.WEB_PARSER_MAX_HEAD_BYTES: int = web_parser_config['max_head_bytes']
+        self.WEB_PARSER_CACHE_PATH: str = web_parser_config['cache_path']
+        self.WEB_PARSER_CACHE_FRESHNESS_SECONDS: int = web_parser_config['cache_freshness_seconds']
+        self.WEB_PARSER_FAILURE_BACKOFF_SECONDS: int = web_parser_config['failure_backoff_seconds']
+        self.WEB_PARSER_FAILURE_BACKOFF_MAX_SECONDS: int = web_parser_config['failure_backoff_max_seconds']
 
     def get_config(self, key: str, default: Any = None) -> Any:
         """
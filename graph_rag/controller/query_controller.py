@@ -15,8 +15,10 @@ from langchain_openai import ChatOpenAI
 from pyvis.network import Network
 
 from graph_rag.config.config_manager import default_config
-from graph_rag.processor import ContentChunkerAndEmbedder
+from graph_rag.processor.embedding_backends import create_embeddings
 from graph_rag.storage import Neo4jManager
+from graph_rag.utils.metrics import run_metrics
+from graph_rag.utils.rate_scheduler import PRIORITY_INTERACTIVE, scheduled_http_client
 
 CYPHER_GENERATION_TEMPLATE = """Task:Generate Cypher statement to query a graph database.
 Instructions:
@@ -37,6 +39,8 @@ CYPHER_GENERATION_PROMPT = PromptTemplate(
     input_variables=["schema", "question"], template=CYPHER_GENERATION_TEMPLATE
 )
 graph_manager = Neo4jManager()
+# Questions must be embedded by the same backend as the chunks they are compared with
+query_embeddings = create_embeddings(default_config, PRIORITY_INTERACTIVE)
 
 
 class GraphRetriever(Chain):
@@ -67,13 +71,12 @@ class GraphRetriever(Chain):
     def _call(self, inputs: Dict[str, Any],
               run_manager: Optional[CallbackManagerForChainRun] = None) -> Dict[str, Any]:
 
-        _embedder = ContentChunkerAndEmbedder()
         _graph_manager = Neo4jManager()
         _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
         question = inputs[self.input_key]
         _run_manager.on_text("Question for similarity search on graph:", end="\n", verbose=True)
         _run_manager.on_text(str(question), color="green", end="\n", verbose=True)
-        embed_query = _embedder.embeddings.embed_query(question)
+        embed_query = query_embeddings.embed_query(question)
         result = _graph_manager.retriever.get_enhanced_visualization_data(embed_query)
         final_result = []
         if result and result["nodes"] and result["relationships"]:
@@ -99,7 +102,9 @@ def answer_on_graph(query):
     llm = ChatOpenAI(
         temperature=default_config.LLM_TEMPERATURE,
         api_key=default_config.OPENAI_API_KEY,
-        model=default_config.LLM_MODEL
+        model=default_config.LLM_MODEL,
+        http_client=scheduled_http_client(f"openai/{default_config.LLM_MODEL}", default_config, PRIORITY_INTERACTIVE,
+                                          run_metrics.httpx_event_hooks('openai'))
     )
     search_by_schema_chain = CYPHER_GENERATION_PROMPT | llm
     invoke_cypher_qna(llm, query, search_by_schema_chain)
@@ -109,7 +114,9 @@ def deep_answer_on_graph(query, top_k=5):
     llm = ChatOpenAI(
         temperature=default_config.LLM_TEMPERATURE,
         api_key=default_config.OPENAI_API_KEY,
-        model=default_config.LLM_MODEL
+        model=default_config.LLM_MODEL,
+        http_client=scheduled_http_client(f"openai/{default_config.LLM_MODEL}", default_config, PRIORITY_INTERACTIVE,
+                                          run_metrics.httpx_event_hooks('openai'))
     )
     runnable_cfg = RunnableConfig(callbacks=[StdOutCallbackHandler()])
     semantic_retrieval = GraphRetriever(top_k=top_k, return_full_graph=True)
@@ -1,2 +1,3 @@
 from .cacheable import Cacheable
-from .graph_data_classes import ProcessedData, GraphPage, GraphRelation, Chunk, PageType, RelationType
+from .graph_data_classes import ProcessedData, GraphPage, GraphRelation, Chunk, PageType, RelationType, \
+    SyncState, PageFingerprints, PageChanges
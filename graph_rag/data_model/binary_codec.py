@@ -0,0 +1,169 @@
+"""
+Binary codec of Cacheable models, a faster alternative to to_dict + JSON for models holding embeddings.
+
+Values are encoded msgpack-style as a tag byte followed by the value, fields typed list[float] (embeddings) are
+stored as raw little-endian float32 blocks aligned to 4 bytes, so decoding them is a single copy of the block, or no
+copy at all with zero_copy=True, where they're read-only memoryviews of the decoded bytes (tolist() makes them lists).
+"""
+import struct
+import sys
+from array import array
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from typing import Any, Type, TypeVar, Union, get_args, get_origin
+
+from graph_rag.data_model.cacheable import Cacheable
+
+T = TypeVar('T', bound=Cacheable)
+
+MAGIC = b'GRC1'
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _DICT, _FLOAT32_BLOCK = range(9)
+
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def dumps(obj: Cacheable) -> bytes:
+    out = bytearray(MAGIC)
+    _encode_cacheable(out, obj)
+    return bytes(out)
+
+
+def loads(data: bytes, cls: Type[T], zero_copy: bool = False) -> T:
+    """
+    Decode a model encoded by dumps, versions of the model and its nested models are checked like by from_dict.
+    With zero_copy, embeddings are memoryviews of the data, which they keep alive.
+    """
+    buffer = memoryview(data)
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a binary encoded model")
+    value, _ = _decode(buffer, len(MAGIC), zero_copy)
+    return cls.from_dict(value)
+
+
+def _is_float_list(field_type) -> bool:
+    if get_origin(field_type) is Union and type(None) in get_args(field_type):
+        field_type = next(arg for arg in get_args(field_type) if arg is not type(None))
+    return get_origin(field_type) is list and get_args(field_type) == (float,)
+
+
+def _encode_cacheable(out: bytearray, obj: Cacheable):
+    # Same structure as Cacheable.to_dict, so from_dict decodes it
+    model_fields = fields(obj)
+    out.append(_DICT)
+    out += _U32.pack(len(model_fields) + 1)
+    for field in model_fields:
+        _encode_str(out, field.name)
+        value = getattr(obj, field.name)
+        if value is not None and _is_float_list(field.type):
+            _encode_float32_block(out, value)
+        else:
+            _encode(out, value)
+    _encode_str(out, 'version')
+    _encode(out, obj.get_class_version())
+
+
+def _encode(out: bytearray, value: Any):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        out.append(_INT)
+        out += _I64.pack(value)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _F64.pack(value)
+    elif isinstance(value, str):
+        out.append(_STR)
+        _encode_str(out, value)
+    elif isinstance(value, Enum):
+        out.append(_STR)
+        _encode_str(out, value.name)
+    elif is_dataclass(value) and isinstance(value, Cacheable):
+        _encode_cacheable(out, value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            _encode_str(out, key)
+            _encode(out, item)
+    elif isinstance(value, (array, memoryview)):
+        _encode_float32_block(out, value)
+    else:
+        raise TypeError(f"Object of type {value.__class__.__name__} can't be binary encoded")
+
+
+def _encode_str(out: bytearray, value: str):
+    encoded = value.encode()
+    out += _U32.pack(len(encoded))
+    out += encoded
+
+
+def _encode_float32_block(out: bytearray, values):
+    out.append(_FLOAT32_BLOCK)
+    out += _U32.pack(len(values))
+    out += bytes(-len(out) % 4)
+    block = array('f', values)
+    if not _LITTLE_ENDIAN:
+        block.byteswap()
+    out += block.tobytes()
+
+
+def _decode(buffer: memoryview, offset: int, zero_copy: bool) -> tuple[Any, int]:
+    tag = buffer[offset]
+    offset += 1
+    if tag == _STR:
+        return _decode_str(buffer, offset)
+    if tag == _DICT:
+        (count,), offset = _U32.unpack_from(buffer, offset), offset + 4
+        result = {}
+        for _ in range(count):
+            key, offset = _decode_str(buffer, offset)
+            result[key], offset = _decode(buffer, offset, zero_copy)
+        return result, offset
+    if tag == _LIST:
+        (count,), offset = _U32.unpack_from(buffer, offset), offset + 4
+        result = []
+        for _ in range(count):
+            item, offset = _decode(buffer, offset, zero_copy)
+            result.append(item)
+        return result, offset
+    if tag == _FLOAT32_BLOCK:
+        (count,), offset = _U32.unpack_from(buffer, offset), offset + 4
+        offset += -offset % 4
+        end = offset + count * 4
+        if _LITTLE_ENDIAN:
+            block = buffer[offset:end].cast('f')
+            return (block if zero_copy else block.tolist()), end
+        swapped = array('f', buffer[offset:end])
+        swapped.byteswap()
+        return swapped.tolist(), end
+    if tag == _INT:
+        return _I64.unpack_from(buffer, offset)[0], offset + 8
+    if tag == _FLOAT:
+        return _F64.unpack_from(buffer, offset)[0], offset + 8
+    if tag == _NONE:
+        return None, offset
+    if tag == _TRUE:
+        return True, offset
+    if tag == _FALSE:
+        return False, offset
+    raise ValueError(f"Unknown binary tag {tag} at offset {offset - 1}")
+
+
+def _decode_str(buffer: memoryview, offset: int) -> tuple[str, int]:
+    (length,) = _U32.unpack_from(buffer, offset)
+    offset += 4
+    return str(buffer[offset:offset + length], 'utf-8'), offset + length
@@ -49,7 +49,7 @@ class Cacheable(ABC):
                     init_args[field.name] = value
             elif is_dataclass(field_type) and issubclass(field_type, Cacheable):
                 init_args[field.name] = field_type.from_dict(value)
-            elif issubclass(field_type, Enum):
+            elif isinstance(field_type, type) and issubclass(field_type, Enum):
                 init_args[field.name] = field_type[value]
             else:
                 init_args[field.name] = value
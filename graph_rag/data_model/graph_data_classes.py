@@ -64,7 +64,48 @@ class GraphRelation(Cacheable):
         return 1
 
 
+@dataclass
+class SyncState(Cacheable):
+    """Incremental sync bookkeeping of a data source: everything edited on or after the watermark is re-synced."""
+    watermark: str
+
+    @classmethod
+    def get_class_version(cls) -> int:
+        return 1
+
+
+@dataclass
+class PageFingerprints(Cacheable):
+    """Content fingerprints of the pages processed by the previous pipeline run, by page id."""
+    fingerprints: dict[str, str]
+    # Names of the data sources that produced the pages, by page id
+    sources: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def get_class_version(cls) -> int:
+        return 2
+
+
+@dataclass
+class PageChanges:
+    """Ids of pages added, changed and removed since the previous pipeline run."""
+    added: set[str] = field(default_factory=set)
+    changed: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+
+    @property
+    def dirty(self) -> set[str]:
+        """Pages that have to be (re)processed."""
+        return self.added | self.changed
+
+
 @dataclass
 class ProcessedData:
     pages: dict[str, GraphPage]
     relations: list[GraphRelation]
+    # Content fingerprints of the pages, by page id
+    fingerprints: dict[str, str] = field(default_factory=dict)
+    # Names of the data sources that produced the pages, by page id
+    page_sources: dict[str, str] = field(default_factory=dict)
+    # Changes since the previous run, None when unknown and every page has to be processed
+    changes: Optional[PageChanges] = None
@@ -1,11 +1,20 @@
 import logging
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 from graph_rag.data_model import ProcessedData
+from graph_rag.utils.metrics import run_metrics
 
 logger = logging.getLogger(__name__)
 
 
+def split_into_batches(data: ProcessedData, batch_size: int) -> Iterator[ProcessedData]:
+    """Split processed data into batches of at most batch_size pages and batch_size relations."""
+    pages = list(data.pages.items())
+    for start in range(0, max(len(pages), len(data.relations)), batch_size):
+        yield ProcessedData(dict(pages[start:start + batch_size]), data.relations[start:start + batch_size])
+
+
 class ContentProvider(ABC):
     def __init__(self):
         logger.info(f"{self.__class__.__name__} initialized")
@@ -15,4 +24,28 @@ class ContentProvider(ABC):
 
     def fetch_data(self) -> ProcessedData:
         logger.info(f"Fetching data from {self.__class__.__name__}")
-        return self._fetch_data()
+        with run_metrics.measure(self.__class__.__name__, 'source') as stage:
+            data = self._fetch_data()
+            stage.items_out += len(data.pages)
+        return data
+
+    def _stream_data(self, batch_size: int) -> Iterator[ProcessedData]:
+        """Providers that can produce pages incrementally override this, by default all data is fetched at once."""
+        yield from split_into_batches(self._fetch_data(), batch_size)
+
+    def stream_data(self, batch_size: int) -> Iterator[ProcessedData]:
+        """
+        Yield pages and relations in batches of about batch_size pages as soon as they are available.
+        Every page and relation is yielded once, a relation may be yielded before the pages it links.
+        """
+        logger.info(f"Streaming data from {self.__class__.__name__}")
+        batches = self._stream_data(batch_size)
+        while True:
+            # Only the time spent producing batches is measured, not the time the consumer holds the generator
+            with run_metrics.measure(self.__class__.__name__, 'source') as stage:
+                batch = next(batches, None)
+                if batch is not None:
+                    stage.items_out += len(batch.pages)
+            if batch is None:
+                return
+            yield batch
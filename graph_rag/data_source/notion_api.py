@@ -1,59 +1,131 @@
-import hashlib
+import inspect
 import json
 import logging
 import os
+import random
+import threading
 import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from typing import Callable
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from graph_rag.config import Config
+from graph_rag.data_source.to_markdown_parser import DEFAULT_ANNOTATIONS
+from graph_rag.utils.kv_cache import SqliteCache, LRUMemoryCache
+from graph_rag.utils.metrics import run_metrics
+from graph_rag.utils.rate_limiter import TokenBucket
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Top-level fields of pages, databases and blocks that nothing downstream reads
+UNUSED_OBJECT_FIELDS = {'icon', 'cover', 'created_by', 'last_edited_by', 'created_time', 'public_url', 'request_id'}
+
+
+def prune_notion_payload(value):
+    """
+    Drop fields of a decoded Notion response that are never used: unused top-level fields of pages, databases and
+    blocks, default annotations of rich text and rich text payloads duplicated by plain_text and href.
+    """
+    if isinstance(value, list):
+        return [prune_notion_payload(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if 'plain_text' in value:
+        return _prune_rich_text(value)
+    if value.get('object') in ('page', 'database', 'block'):
+        return {key: prune_notion_payload(item) for key, item in value.items() if key not in UNUSED_OBJECT_FIELDS}
+    return {key: prune_notion_payload(item) for key, item in value.items()}
+
+
+def _prune_rich_text(rich_text: dict) -> dict:
+    pruned = {'type': rich_text['type'], 'plain_text': rich_text['plain_text'], 'href': rich_text.get('href')}
+    annotations = rich_text.get('annotations')
+    if annotations and annotations != DEFAULT_ANNOTATIONS:
+        pruned['annotations'] = annotations
+    link = rich_text.get('text', {}).get('link')
+    if rich_text['type'] == 'text' and link:
+        pruned['text'] = {'link': link}
+    return pruned
+
+
+def _json_dumps(value) -> bytes:
+    return orjson.dumps(value) if orjson else json.dumps(value).encode()
+
+
+def _json_loads(value: bytes):
+    return orjson.loads(value) if orjson else json.loads(value)
+
 
 def cache_api_call(func: Callable) -> Callable:
+    signature = inspect.signature(func)
+
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        cache_key = f"{func.__name__}:{args}:{kwargs}"
+        # Canonical key of the call: explicitly passed default values and omitted ones produce the same key
+        call_args = signature.bind(self, *args, **kwargs)
+        call_args.apply_defaults()
+        call_args.arguments.pop('self')
+        cache_key = f"{func.__name__}:{json.dumps(call_args.arguments, sort_keys=True, default=str)}"
 
         # Check in-memory cache
-        if cache_key in self.cache:
-            cached_data, cache_time = self.cache[cache_key]
-            if not self.cache_ttl or time.time() - cache_time < self.cache_ttl:
-                return cached_data
+        cached_data = self.cache.get(cache_key, self.cache_ttl)
+        if cached_data is not None:
+            return cached_data
 
         # If not in memory, check file cache
-        if self.config.NOTION_CACHE_PATH:
-            safe_filename = self._get_safe_filename(cache_key)
-            cache_path = os.path.join(self.config.DATA_DIR, self.config.NOTION_CACHE_PATH)
-            file_path = os.path.join(cache_path, safe_filename)
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    file_cache = json.load(f)
-                if not self.cache_ttl or time.time() - file_cache['time'] < self.cache_ttl:
-                    self.cache[cache_key] = (file_cache['data'], file_cache['time'])
-                    return file_cache['data']
+        if self.file_cache is not None:
+            cached_value = self.file_cache.get(cache_key)
+            if cached_value is not None:
+                cached_data = _json_loads(cached_value)
+                self.cache.set(cache_key, cached_data, len(cached_value))
+                return cached_data
 
         # If not in cache or expired, call the API
         result = func(self, *args, **kwargs)
+        serialized_result = _json_dumps(result)
 
         # Update in-memory cache
-        self.cache[cache_key] = (result, time.time())
+        self.cache.set(cache_key, result, len(serialized_result))
 
         # Update file cache
-        if self.config.NOTION_CACHE_PATH:
-            os.makedirs(cache_path, exist_ok=True)
-            with open(file_path, 'w') as f:
-                json.dump({'data': result, 'time': time.time()}, f)
+        if self.file_cache is not None:
+            self.file_cache.set(cache_key, serialized_result, self.cache_ttl)
 
         return result
 
     return wrapper
 
 
+@dataclass
+class EndpointStats:
+    calls: int = 0
+    retries: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'errors': self.errors,
+            'avg_latency': self.total_latency / self.calls if self.calls else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+
 class NotionAPI:
+    RETRYABLE_EXCEPTIONS = (requests.Timeout, requests.ConnectionError)
+
     def __init__(self):
         self.config = Config()
         self.base_url = self.config.NOTION_API_BASE_URL
@@ -63,37 +135,128 @@ class NotionAPI:
             "Notion-Version": self.version,
             "Content-Type": "application/json"
         }
-        self.cache = {}
+        self.cache = LRUMemoryCache(self.config.NOTION_MEMORY_CACHE_MAX_SIZE_MB * 1024 * 1024)
         self.cache_ttl = self.config.NOTION_CACHE_TTL_SECONDS
+        self.file_cache = None
+        if self.config.NOTION_CACHE_PATH:
+            cache_file = os.path.join(self.config.DATA_DIR, self.config.NOTION_CACHE_PATH, 'notion_api_cache.sqlite')
+            self.file_cache = SqliteCache(cache_file, self.config.NOTION_CACHE_MAX_SIZE_MB * 1024 * 1024)
+            self.file_cache.vacuum_expired()
+
+        # One pooled keep-alive session shared by all (possibly concurrent) calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config.NOTION_API_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.headers)
+        self.rate_limiter = TokenBucket(self.config.NOTION_API_RATE_LIMIT_PER_SECOND,
+                                        self.config.NOTION_API_RATE_LIMIT_BURST)
+        self.max_retries = self.config.NOTION_API_MAX_RETRIES
+        self.prune_responses = self.config.NOTION_API_PRUNE_RESPONSES
+        self.stats: dict[str, EndpointStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def get_stats(self) -> dict[str, dict]:
+        """Per-endpoint call, retry and latency counters and in-memory cache counters."""
+        with self._stats_lock:
+            stats = {endpoint: stats.to_dict() for endpoint, stats in self.stats.items()}
+        stats['memory_cache'] = self.cache.stats()
+        return stats
+
+    def _record(self, endpoint: str, latency: float = None, retry: bool = False, error: bool = False):
+        with self._stats_lock:
+            stats = self.stats.setdefault(endpoint, EndpointStats())
+            if latency is not None:
+                stats.calls += 1
+                stats.total_latency += latency
+                stats.max_latency = max(stats.max_latency, latency)
+            stats.retries += retry
+            stats.errors += error
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        max_delay = min(self.config.NOTION_API_BACKOFF_MAX_SECONDS,
+                        self.config.NOTION_API_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        return random.uniform(0, max_delay)
 
     @staticmethod
-    def _get_safe_filename(cache_key: str) -> str:
-        """Generate a safe filename from the cache key."""
-        return hashlib.md5(cache_key.encode()).hexdigest() + '.json'
+    def _get_retry_after(response: requests.Response) -> float | None:
+        retry_after = response.headers.get('Retry-After')
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def _decode(self, response: requests.Response):
+        """Decode the response body (with orjson if it's installed) and prune unused fields if enabled."""
+        data = orjson.loads(response.content) if orjson else response.json()
+        return prune_notion_payload(data) if self.prune_responses else data
+
+    def _request(self, method: str, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """
+        Make a rate-limited request through the pooled session. Rate-limited (429), server error (5xx) and timed out
+        requests are retried with exponential backoff, honoring the Retry-After header when it's present.
+        Returns the last response, so callers handle non-retryable and exhausted failures themselves.
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.config.NOTION_API_TIMEOUT, **kwargs)
+            except self.RETRYABLE_EXCEPTIONS as e:
+                self._record(endpoint, latency=time.perf_counter() - start, error=True)
+                run_metrics.record_call('notion', seconds=time.perf_counter() - start, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                self._record(endpoint, latency=time.perf_counter() - start)
+                status = response.status_code
+                run_metrics.record_call('notion', bytes_sent=len(response.request.body or b''),
+                                        bytes_received=len(response.content), seconds=time.perf_counter() - start,
+                                        error=status >= 400)
+                if status != 429 and not 500 <= status < 600:
+                    return response
+                self._record(endpoint, error=True)
+                if attempt >= self.max_retries:
+                    return response
+                retry_after = self._get_retry_after(response)
+                delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+                if status == 429:
+                    # Throttle every caller sharing this client, not only the one that got rate-limited
+                    self.rate_limiter.pause(delay)
+                reason = f"status {status}"
+
+            attempt += 1
+            self._record(endpoint, retry=True)
+            logger.info(f"Retrying {endpoint} request after {delay:.2f}s ({reason}, attempt {attempt}/{self.max_retries})")
+            time.sleep(delay)
 
     @cache_api_call
     def get_page_metadata(self, page_id):
         url = f"{self.base_url}pages/{page_id}"
-        response = requests.get(url, headers=self.headers, timeout=self.config.NOTION_API_TIMEOUT)
+        response = self._request('GET', 'pages', url)
         if response.status_code == 200:
-            return response.json()
+            return self._decode(response)
         else:
             raise Exception(f"Failed to fetch page info: {response.status_code} - {response.text}\nurl={url}")
 
     @cache_api_call
-    def get_page_content_blocks(self, page_id, first_call=True, start_cursor=None, page_size=100):
+    def get_page_content_blocks(self, page_id, start_cursor=None, page_size=100):
         url = f"{self.base_url}blocks/{page_id}/children?page_size={page_size}"
         if start_cursor:
             url += "&start_cursor=" + start_cursor
 
-        response = requests.get(url, headers=self.headers, timeout=self.config.NOTION_API_TIMEOUT)
+        response = self._request('GET', 'blocks.children', url)
         if response.status_code == 200:
-            return response.json()
-        elif 500 <= response.status_code < 600 and first_call:
-            logger.info("Retrying failed request after 1 second...")
-            time.sleep(1)
-            return self.get_page_content_blocks(page_id, first_call=False, start_cursor=start_cursor,
-                                                page_size=page_size)
+            return self._decode(response)
         else:
             raise Exception(f"Failed to fetch block children: {response.status_code} - {response.text}\nurl={url}")
 
@@ -111,19 +274,14 @@ class NotionAPI:
         return all_items
 
     @cache_api_call
-    def get_page_properties(self, page_id, property_id, first_call=True, start_cursor=None, page_size=100):
+    def get_page_properties(self, page_id, property_id, start_cursor=None, page_size=100):
         url = f"{self.base_url}pages/{page_id}/properties/{property_id}?page_size={page_size}"
         if start_cursor:
             url += "&start_cursor=" + start_cursor
 
-        response = requests.get(url, headers=self.headers, timeout=self.config.NOTION_API_TIMEOUT)
+        response = self._request('GET', 'pages.properties', url)
         if response.status_code == 200:
-            return response.json()
-        elif 500 <= response.status_code < 600 and first_call:
-            logger.info("Retrying failed request after 1 second...")
-            time.sleep(1)
-            return self.get_page_properties(page_id, property_id, first_call=False, start_cursor=start_cursor,
-                                            page_size=page_size)
+            return self._decode(response)
         else:
             raise Exception(f"Failed to fetch page properties: {response.status_code} - {response.text}\nurl={url}")
 
@@ -143,9 +301,9 @@ class NotionAPI:
     @cache_api_call
     def get_database_metadata(self, database_id):
         url = f"{self.base_url}databases/{database_id}"
-        response = requests.get(url, headers=self.headers, timeout=self.config.NOTION_API_TIMEOUT)
+        response = self._request('GET', 'databases', url)
         if response.status_code == 200:
-            return response.json()
+            return self._decode(response)
         else:
             raise Exception(f"Failed to fetch database info: {response.status_code} - {response.text}\nurl={url}")
 
@@ -158,9 +316,9 @@ class NotionAPI:
         if start_cursor:
             payload["start_cursor"] = start_cursor
 
-        response = requests.post(url, headers=self.headers, json=payload, timeout=self.config.NOTION_API_TIMEOUT)
+        response = self._request('POST', 'databases.query', url, json=payload)
         if response.status_code == 200:
-            return response.json()
+            return self._decode(response)
         else:
             raise Exception(f"Failed to query database: {response.status_code} - {response.text}\nurl={url}")
 
@@ -173,34 +331,45 @@ class NotionAPI:
         if search_filter:
             params["filter"] = search_filter
 
-        return self._get_all_paginated_results(url, **params)
+        return self._get_all_paginated_results(url, 'search', **params)
+
+    def get_pages_edited_since(self, since: str) -> list[dict]:
+        """All pages and databases edited on or after `since`, newest first. Never cached."""
+        url = f"{self.base_url}search"
+        sort = {"direction": "descending", "timestamp": "last_edited_time"}
+        return self._get_all_paginated_results(url, 'search', sort=sort,
+                                               stop_at=lambda item: item['last_edited_time'] < since)
+
+    def query_database_edited_since(self, database_id: str, since: str) -> list[dict]:
+        """All items of the database edited on or after `since`. Never cached."""
+        url = f"{self.base_url}databases/{database_id}/query"
+        edited_filter = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}}
+        return self._get_all_paginated_results(url, 'databases.query', filter=edited_filter)
 
-    def _get_all_paginated_results(self, url, r_type=requests.api.post, page_size=100, **payload_params) -> list[dict]:
+    def _get_all_paginated_results(self, url, endpoint, method='POST', page_size=100,
+                                   stop_at: Callable[[dict], bool] = None, **payload_params) -> list[dict]:
+        """Fetch all pages of results. If stop_at is given, stop at the first item it returns True for."""
         logger.debug(f"Fetching paginated items from {url}(params: {payload_params})...")
         all_items = []
         has_more = True
-        first_call = True
         payload = {
             "page_size": page_size,
             **payload_params
         }
 
         while has_more:
-            response = r_type(url, headers=self.headers, timeout=self.config.NOTION_API_TIMEOUT, json=payload)
-            if response.status_code == 200:
-                response_json = response.json()
-                all_items.extend(response_json['results'])
-                has_more = response_json['has_more']
-                payload.update({"start_cursor": response_json.get('next_cursor')})
-                first_call = True
-                logger.debug(
-                    f"Retrieved {len(all_items)} paginated items.{' Fetching next page' if has_more else ' Finished.'}")
-            elif 500 <= response.status_code < 600 and first_call:
-                logger.info("Retrying failed request after 1 second...")
-                first_call = False
-                time.sleep(1)
-            else:
-                response.raise_for_status()
+            response = self._request(method, endpoint, url, json=payload)
+            response.raise_for_status()
+            response_json = self._decode(response)
+            has_more = response_json['has_more']
+            for item in response_json['results']:
+                if stop_at and stop_at(item):
+                    has_more = False
+                    break
+                all_items.append(item)
+            payload.update({"start_cursor": response_json.get('next_cursor')})
+            logger.debug(
+                f"Retrieved {len(all_items)} paginated items.{' Fetching next page' if has_more else ' Finished.'}")
 
         return all_items
 
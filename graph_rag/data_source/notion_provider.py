@@ -1,19 +1,44 @@
+import asyncio
+import json
 import logging
 import os
+import queue
 import re
-from datetime import datetime
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Callable, Iterator
 
 from graph_rag.config import Config
 from graph_rag.data_model.graph_data_classes import GraphPage, get_page_type_from_string, GraphRelation, RelationType, \
-    PageType, ProcessedData
-from graph_rag.data_source import ContentProvider
+    PageType, ProcessedData, SyncState
+from graph_rag.data_source.base_content_provider import ContentProvider, split_into_batches
 from graph_rag.data_source.notion_api import NotionAPI
-from graph_rag.data_source.web_scraper import get_info_from_url
+from graph_rag.data_source.web_scraper import create_bookmark_fetcher
 from graph_rag.data_source.to_markdown_parser import Notion2MarkdownParser
 from graph_rag.utils import cache_util
+from graph_rag.utils.kv_cache import SqliteCache
 
 logger = logging.getLogger(__name__)
 
+# Notion's last_edited_time has minute precision, also leave room for a clock skew between us and Notion
+WATERMARK_SAFETY_MARGIN = timedelta(minutes=5)
+
+# (block, resolved child blocks or None if the block has no children to render)
+BlockNode = tuple[dict, list['BlockNode'] | None]
+
+# How often a streaming crawl waiting for the consumer checks whether the stream was closed
+STREAM_PUT_TIMEOUT_SECONDS = 0.5
+
+
+class StreamClosed(Exception):
+    """Raised in the ingest thread of a stream whose consumer stopped iterating, to abort the crawl."""
+
 
 def _extract_notion_uuid(href):
     """ Extract and normalize UUID from notion URL.
@@ -52,21 +77,51 @@ def _extract_rich_text(rich_text: list[dict]):
     return ''.join([text['plain_text'] for text in rich_text])
 
 
-def first_time_after_second(first_time: str, second_time: str):
-    dt_format = "%Y-%m-%dT%H:%M:%S.%fZ"
-    dt1 = datetime.strptime(first_time, dt_format)
-    dt2 = datetime.strptime(second_time, dt_format)
-    return dt1 > dt2
+def _new_watermark() -> str:
+    """Watermark for the sync that starts now: pages edited on or after it will be re-synced next time."""
+    watermark = datetime.now(timezone.utc) - WATERMARK_SAFETY_MARGIN
+    return watermark.strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+@dataclass
+class CrawledNode:
+    """
+    Result of visiting a single page or bookmark during the crawl. Every relation found on the page is stored together
+    with the id of the node that has to be emitted right after it (None if the target is not crawled), so the final
+    pages and relations can be assembled in the same depth-first order as a sequential traversal would produce.
+    """
+    page: GraphPage | None = None
+    edges: list[tuple[GraphRelation, str | None]] = field(default_factory=list)
 
 
 class NotionProvider(ContentProvider):
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        """:param resume: continue an interrupted crawl from its last checkpoint if there is one"""
         super().__init__()
         self.notion_api = NotionAPI()
         self.config = Config()
         self.content_parser = Notion2MarkdownParser()
+        self.bookmark_fetcher = create_bookmark_fetcher()
         self.prepared_pages: dict[str, GraphPage] = {}
         self.page_relations: list[GraphRelation] = []
+        self.max_concurrency = max(1, self.config.NOTION_CRAWLER_MAX_CONCURRENCY)
+        self._nodes: dict[str, CrawledNode] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self.resume = resume
+        self.checkpoint_interval = self.config.NOTION_CRAWLER_CHECKPOINT_INTERVAL_SECONDS
+        # Claimed nodes that are not fully processed yet, with arguments needed to schedule them again
+        self._pending: dict[str, dict] = {}
+        self._checkpoint_root_id: str | None = None
+        self._root_ids: list[str] = []
+        self._last_checkpoint_time = 0.0
+        # Called with every node as soon as it's completely processed, set while streaming data
+        self._on_node_done: Callable[[str, CrawledNode], None] | None = None
+        # Fully resolved block trees of pages, valid as long as the page's last_edited_time doesn't change
+        self.block_tree_cache = None
+        if self.config.NOTION_CACHE_PATH:
+            cache_file = os.path.join(self.config.DATA_DIR, self.config.NOTION_CACHE_PATH, 'notion_block_trees.sqlite')
+            self.block_tree_cache = SqliteCache(cache_file, self.config.NOTION_CACHE_MAX_SIZE_MB * 1024 * 1024)
 
     def _fetch_data(self) -> ProcessedData:
         self.process_pages(self.config.NOTION_ROOT_PAGE_ID)
@@ -76,56 +131,396 @@ class NotionProvider(ContentProvider):
 
         return ProcessedData(self.prepared_pages, self.page_relations)
 
+    def _stream_data(self, batch_size: int) -> Iterator[ProcessedData]:
+        """
+        Run the ingestion in a background thread and yield crawled pages with their relations as soon as they are
+        processed. Pages that are not crawled in this run (loaded from cache or unchanged since the last delta sync)
+        are yielded when the ingestion is finished. The crawl waits while pipeline.queue_size batches are not consumed.
+        """
+        batches = queue.Queue(maxsize=self.config.PIPELINE_QUEUE_SIZE)
+        end_of_stream = object()
+        stopped = threading.Event()
+        streamed_ids = set()
+        batch = ProcessedData(pages={}, relations=[])
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=STREAM_PUT_TIMEOUT_SECONDS)
+                    return
+                except queue.Full:
+                    pass
+            raise StreamClosed("Stream consumer stopped iterating")
+
+        def flush():
+            nonlocal batch
+            if batch.pages or batch.relations:
+                put(batch)
+                batch = ProcessedData(pages={}, relations=[])
+
+        def on_node_done(node_id: str, node: CrawledNode):
+            if stopped.is_set():
+                raise StreamClosed("Stream consumer stopped iterating")
+            streamed_ids.add(node_id)
+            if node.page:
+                batch.pages[node_id] = node.page
+            batch.relations.extend(relation for relation, _ in node.edges)
+            if len(batch.pages) >= batch_size:
+                flush()
+
+        def ingest():
+            try:
+                self._fetch_data()
+                flush()
+                not_streamed = ProcessedData(
+                    {page_id: page for page_id, page in self.prepared_pages.items() if page_id not in streamed_ids},
+                    [relation for relation in self.page_relations if relation.from_page_id not in streamed_ids])
+                for remaining_batch in split_into_batches(not_streamed, batch_size):
+                    put(remaining_batch)
+                put(end_of_stream)
+            except StreamClosed:
+                logger.info("Stopped streaming Notion data, the consumer closed the stream")
+            except BaseException as e:
+                try:
+                    put(e)
+                    put(end_of_stream)
+                except StreamClosed:
+                    pass
+            finally:
+                self._on_node_done = None
+
+        self._on_node_done = on_node_done
+        threading.Thread(target=ingest, name='notion-stream', daemon=True).start()
+        try:
+            while (item := batches.get()) is not end_of_stream:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Unblock the ingest thread if it waits for a free slot, the crawl is aborted when it puts the next batch
+            stopped.set()
+            try:
+                while True:
+                    batches.get_nowait()
+            except queue.Empty:
+                pass
+
     def process_pages(self, root_page_id: str):
-        if self.config.CACHE_ENABLED:
+        if self.config.CACHE_ENABLED and self.config.NOTION_SYNC_MODE == 'delta':
+            try:
+                self.prepared_pages = cache_util.load_prepared_pages_from_cache(root_page_id, check_ttl=False)
+                self.page_relations = cache_util.load_page_relations_from_cache(root_page_id, check_ttl=False)
+                sync_state = cache_util.load_sync_state_from_cache(root_page_id)
+            except Exception as e:
+                logger.warning(f"Failed to load cache for delta sync: {e}. Running the full ingestion process.")
+            else:
+                logger.info(f"Loaded from cache: {len(self.prepared_pages)} pages and {len(self.page_relations)} "
+                            f"relations. Syncing changes since {sync_state.watermark}")
+                new_sync_state = SyncState(_new_watermark())
+                asyncio.run(self.sync_changes(root_page_id, sync_state.watermark))
+                logger.info(f"Notion API stats: {self.notion_api.get_stats()}")
+                self._save_to_cache(root_page_id, new_sync_state)
+                return
+        elif self.config.CACHE_ENABLED:
             try:
                 self.prepared_pages = cache_util.load_prepared_pages_from_cache(root_page_id)
                 self.page_relations = cache_util.load_page_relations_from_cache(root_page_id)
                 logger.info(f"Loaded from cache: {len(self.prepared_pages)} pages and {len(self.page_relations)} relations")
-                # self.refresh_updated_pages()
-                # cache_util.save_prepared_pages_to_cache(root_page_id, self.prepared_pages)
-                # cache_util.save_page_relations_to_cache(root_page_id, self.page_relations)
-                logger.info("Cache updated with the latest changes")
                 return
             except Exception as e:
                 logger.warning(f"Failed to load cache: {e}. Running the ingestion process.")
 
-        if not root_page_id:
-            logger.info("No root page id provided. Fetching all available pages.")
-            all_pages = self.notion_api.get_search_results()
-            for page in all_pages:
-                notion_page = GraphPage(normalize_uuid(page['id']), _extract_title(page),
-                                        get_page_type_from_string(page['object']),
-                                        page['url'], source='Notion',
-                                        last_edited_time=page['last_edited_time'])
-                self.prepared_pages.update({notion_page.id: notion_page})
-                notion_page.content = self.recursive_process_page_content(page)
-        else:
-            logger.info(f"Processing root page: {root_page_id}")
-            root_page = self.notion_api.get_root_page_info(root_page_id)
-            notion_page = GraphPage(normalize_uuid(root_page['id']), _extract_title(root_page),
-                                    get_page_type_from_string(root_page['object']),
-                                    root_page['url'], source='Notion', last_edited_time=root_page['last_edited_time'])
-            self.prepared_pages.update({notion_page.id: notion_page})
-            notion_page.content = self.recursive_process_page_content(root_page)
+        new_sync_state = SyncState(_new_watermark())
+        self.prepared_pages, self.page_relations = asyncio.run(self.crawl(root_page_id))
+        logger.info(f"Notion API stats: {self.notion_api.get_stats()}")
 
         if self.config.CACHE_ENABLED:
-            cache_util.save_prepared_pages_to_cache(root_page_id, self.prepared_pages)
-            cache_util.save_page_relations_to_cache(root_page_id, self.page_relations)
-            logger.info("Saved processed notion data to cache.")
-
-    def refresh_updated_pages(self):
-        logger.info("Refreshing processed pages with the latest changes")
-        for i, page in enumerate(self.prepared_pages.values()):
-            if page.type != PageType.BOOKMARK:
-                logger.info(f"Checking page {i}/{len(self.prepared_pages)}: {page.title}-{page.id}")
-                self.recursive_process_unprocessed_page(page.id, page.type == PageType.DATABASE)
-
-    def recursive_process_page_content(self, page_info: dict, recursive_depth: int = 0) -> str | None:
+            self._save_to_cache(root_page_id, new_sync_state)
+
+    def _save_to_cache(self, root_page_id: str, sync_state: SyncState):
+        cache_util.save_prepared_pages_to_cache(root_page_id, self.prepared_pages)
+        cache_util.save_page_relations_to_cache(root_page_id, self.page_relations)
+        cache_util.save_sync_state_to_cache(root_page_id, sync_state)
+        logger.info("Saved processed notion data to cache.")
+
+    @contextmanager
+    def _crawl_session(self):
+        self._nodes = {}
+        self._tasks = set()
+        self._pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='notion-crawler') as executor:
+            self._executor = executor
+            try:
+                yield
+            finally:
+                self._executor = None
+
+    async def _drain(self):
+        """Wait until the whole frontier is processed, including pages scheduled while waiting."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    async def crawl(self, root_page_id: str) -> tuple[dict[str, GraphPage], list[GraphRelation]]:
+        """
+        Crawl the workspace starting from root_page_id (or from all available pages if it's empty).
+        Pages found on the way form a work frontier that is processed concurrently, with at most
+        notion_api.crawler.max_concurrency API requests in flight. Every page and bookmark is visited only once.
+        """
+        with self._crawl_session():
+            checkpoint = cache_util.load_crawl_checkpoint(root_page_id) if self.resume else None
+            if checkpoint:
+                self._restore_checkpoint(checkpoint)
+            else:
+                if self.resume:
+                    logger.info("No crawl checkpoint found. Starting the crawl from scratch.")
+                if not root_page_id:
+                    logger.info("No root page id provided. Fetching all available pages.")
+                    root_pages = await self._call_api(self.notion_api.get_search_results)
+                else:
+                    logger.info(f"Processing root page: {root_page_id}")
+                    root_pages = [await self._call_api(self.notion_api.get_root_page_info, root_page_id)]
+
+                self._root_ids = []
+                for page_info in root_pages:
+                    page_id = normalize_uuid(page_info['id'])
+                    self._root_ids.append(page_id)
+                    self._schedule_page(page_id, page_info=page_info, is_root=True)
+
+            self._checkpoint_root_id = root_page_id
+            self._last_checkpoint_time = time.monotonic()
+            try:
+                await self._drain()
+                await self._fill_bookmarks()
+            except BaseException:
+                if self.checkpoint_interval:
+                    self._save_checkpoint()
+                raise
+            finally:
+                self._checkpoint_root_id = None
+
+        cache_util.remove_crawl_checkpoint(root_page_id)
+        return self._assemble(self._root_ids)
+
+    def _save_checkpoint(self):
+        """Persist completed nodes and the frontier of claimed but unfinished nodes, so the crawl can be resumed."""
+        completed_nodes = {node_id: {'page': node.page, 'edges': node.edges}
+                           for node_id, node in self._nodes.items() if node_id not in self._pending}
+        checkpoint = {'root_ids': self._root_ids, 'nodes': completed_nodes, 'pending': dict(self._pending)}
+        cache_util.save_crawl_checkpoint(self._checkpoint_root_id, checkpoint)
+        self._last_checkpoint_time = time.monotonic()
+        logger.info(f"Saved crawl checkpoint: {len(completed_nodes)} completed and {len(self._pending)} pending nodes")
+
+    def _maybe_save_checkpoint(self):
+        if (self._checkpoint_root_id is not None and self.checkpoint_interval
+                and time.monotonic() - self._last_checkpoint_time >= self.checkpoint_interval):
+            self._save_checkpoint()
+
+    def _restore_checkpoint(self, checkpoint: dict):
+        self._root_ids = checkpoint['root_ids']
+        for node_id, node in checkpoint['nodes'].items():
+            self._nodes[node_id] = CrawledNode(node['page'], [tuple(edge) for edge in node['edges']])
+            if self._on_node_done and not (node['page'] and node['page'].type == PageType.BOOKMARK):
+                self._on_node_done(node_id, self._nodes[node_id])
+        for node_id, visit in checkpoint['pending'].items():
+            if visit['kind'] == 'bookmark':
+                self._schedule_bookmark(node_id, recursive_depth=visit['recursive_depth'])
+            else:
+                self._schedule_page(node_id, is_database=visit['is_database'], page_info=visit['page_info'],
+                                    recursive_depth=visit['recursive_depth'], is_root=visit['is_root'])
+        logger.info(f"Resuming crawl from checkpoint: {len(checkpoint['nodes'])} completed and "
+                    f"{len(checkpoint['pending'])} pending nodes")
+
+    async def sync_changes(self, root_page_id: str, since: str):
+        """
+        Re-crawl only pages edited on or after `since` and merge them into prepared_pages and page_relations.
+        Changed pages are found with the search endpoint sorted by last_edited_time and with filtered queries of
+        every known database (which also reveals new database items). The crawl doesn't descend into unchanged
+        pages, so its cost is proportional to the number of edited pages.
         """
-        Recursively process all blocks of the given page and its sub-pages if this page hasn't been processed before
-        (not in self.processed_pages). Add every processed sub-page into processed_pages and add relation to
-        page_relations If is_database, then make additional call of get_all_database_items to get all db pages
+        with self._crawl_session():
+            edited_pages = await self._call_api(self.notion_api.get_pages_edited_since, since)
+            database_ids = [page_id for page_id, page in self.prepared_pages.items() if page.type == PageType.DATABASE]
+            edited_db_items = await asyncio.gather(*[
+                self._call_api(self.notion_api.query_database_edited_since, database_id, since)
+                for database_id in database_ids])
+
+            changed_pages = {}
+            for page_info in edited_pages:
+                page_id = normalize_uuid(page_info['id'])
+                # New sub-pages are discovered by re-crawling their (also edited) parents
+                if page_id in self.prepared_pages or (not root_page_id and page_info['parent']['type'] == 'workspace'):
+                    changed_pages[page_id] = page_info
+            new_relations = []
+            for database_id, db_items in zip(database_ids, edited_db_items):
+                for page_info in db_items:
+                    page_id = normalize_uuid(page_info['id'])
+                    if page_id not in self.prepared_pages:
+                        new_relations.append(GraphRelation(database_id, RelationType.CONTAINS, page_id))
+                    changed_pages[page_id] = page_info
+            logger.info(f"Found {len(changed_pages)} pages changed since {since}")
+
+            # Unchanged pages and bookmarks are treated as already crawled, so the crawl stops at them
+            unchanged_ids = [page_id for page_id in self.prepared_pages if page_id not in changed_pages]
+            self._nodes.update({page_id: CrawledNode() for page_id in unchanged_ids})
+            for page_id, page_info in changed_pages.items():
+                self._schedule_page(page_id, page_info=page_info, is_root=page_id == normalize_uuid(root_page_id or ''))
+            await self._drain()
+            await self._fill_bookmarks()
+
+        unchanged_ids = set(unchanged_ids)
+        crawled = {node_id: node for node_id, node in self._nodes.items() if node_id not in unchanged_ids}
+        self.page_relations = [relation for relation in self.page_relations if relation.from_page_id not in crawled]
+        for node_id, node in crawled.items():
+            if node.page:
+                self.prepared_pages[node_id] = node.page
+            else:
+                # e.g. archived or removed since the last sync
+                self.prepared_pages.pop(node_id, None)
+            self.page_relations.extend(relation for relation, _ in node.edges)
+        # Re-crawled databases already have CONTAINS edges of their new items
+        self.page_relations.extend(relation for relation in new_relations if relation.from_page_id not in crawled)
+        logger.info(f"Synced {len(crawled)} changed or new pages and bookmarks")
+        if root_page_id:
+            self._prune_unreachable(normalize_uuid(root_page_id))
+
+    def _prune_unreachable(self, root_id: str):
+        """
+        Drop pages that are no longer reachable from the root, e.g. when a child page block was removed from an edited
+        parent. Such pages aren't trashed, so the edited pages search doesn't report them.
+        """
+        targets = defaultdict(list)
+        for relation in self.page_relations:
+            targets[relation.from_page_id].append(relation.to_page_id)
+        reachable = {root_id}
+        stack = [root_id]
+        while stack:
+            for target_id in targets[stack.pop()]:
+                if target_id not in reachable:
+                    reachable.add(target_id)
+                    stack.append(target_id)
+        unreachable = [page_id for page_id in self.prepared_pages if page_id not in reachable]
+        for page_id in unreachable:
+            del self.prepared_pages[page_id]
+        self.page_relations = [relation for relation in self.page_relations if relation.from_page_id in reachable]
+        if unreachable:
+            logger.info(f"Removed {len(unreachable)} pages and bookmarks no longer reachable from the root page")
+
+    async def _call_api(self, func: Callable, *args, **kwargs):
+        """Run a blocking API call on the crawler thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def _spawn(self, node_id: str, coro):
+        task = asyncio.ensure_future(self._run_visit(node_id, coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_visit(self, node_id: str, coro):
+        await coro
+        self._pending.pop(node_id, None)
+        if self._on_node_done:
+            self._on_node_done(node_id, self._nodes[node_id])
+        self._maybe_save_checkpoint()
+
+    def _schedule_page(self, page_id: str, is_database: bool = None, page_info: dict = None,
+                       recursive_depth: int = 0, is_root: bool = False):
+        # Single-flight: only the first reference to a page triggers its fetch and processing
+        if page_id in self._nodes:
+            return
+        node = self._nodes[page_id] = CrawledNode()
+        self._pending[page_id] = {'kind': 'page', 'is_database': is_database, 'page_info': page_info,
+                                  'recursive_depth': recursive_depth, 'is_root': is_root}
+        self._spawn(page_id, self._visit_page(node, page_id, is_database, page_info, recursive_depth, is_root))
+
+    def _schedule_bookmark(self, url: str, recursive_depth: int = 0):
+        """Add a placeholder bookmark, its title and description are fetched after the crawl by _fill_bookmarks."""
+        if url in self._nodes:
+            return
+        self._nodes[url] = CrawledNode(GraphPage(url, '', PageType.BOOKMARK, url, content='', source='Web'))
+        logger.info(f"[Depth={recursive_depth}] Adding new bookmark[{len(self._nodes)}]: {url}")
+
+    async def _fill_bookmarks(self):
+        """Fetch titles and descriptions of all placeholder bookmarks concurrently."""
+        bookmarks = {url: node for url, node in self._nodes.items() if node.page and node.page.type == PageType.BOOKMARK}
+        placeholders = {url: node.page for url, node in bookmarks.items() if not node.page.title}
+        if placeholders:
+            logger.info(f"Fetching info of {len(placeholders)} bookmarks")
+            bookmark_infos = await self._call_api(self.bookmark_fetcher.fetch_all, list(placeholders))
+            for url, bookmark_info in bookmark_infos.items():
+                if bookmark_info:
+                    placeholders[url].title, placeholders[url].content = bookmark_info
+        if self._on_node_done:
+            for url, node in bookmarks.items():
+                self._on_node_done(url, node)
+
+    def _assemble(self, root_ids: list[str]) -> tuple[dict[str, GraphPage], list[GraphRelation]]:
+        """Flatten crawled nodes into pages and relations following the depth-first order of their discovery."""
+        pages: dict[str, GraphPage] = {}
+        relations: list[GraphRelation] = []
+        emitted = set()
+        stack = []
+
+        def emit(node_id: str):
+            emitted.add(node_id)
+            node = self._nodes[node_id]
+            if node.page:
+                pages[node_id] = node.page
+            stack.append(iter(node.edges))
+
+        for root_id in root_ids:
+            if root_id in emitted:
+                continue
+            emit(root_id)
+            while stack:
+                edge = next(stack[-1], None)
+                if edge is None:
+                    stack.pop()
+                    continue
+                relation, target_id = edge
+                relations.append(relation)
+                if target_id is not None and target_id not in emitted:
+                    emit(target_id)
+
+        return pages, relations
+
+    async def _visit_page(self, node: CrawledNode, page_id: str, is_database: bool = None, page_info: dict = None,
+                          recursive_depth: int = 0, is_root: bool = False):
+        if not page_info:
+            try:
+                if is_database is None:
+                    page_info = await self._call_api(self.notion_api.get_root_page_info, page_id)
+                elif is_database:
+                    page_info = await self._call_api(self.notion_api.get_database_metadata, page_id)
+                else:
+                    page_info = await self._call_api(self.notion_api.get_page_metadata, page_id)
+            except Exception as e:
+                logger.error(f"[Depth={recursive_depth}] Failed to get {'database' if is_database else 'page'} info "
+                             f"for id: {page_id}: {e}")
+                logger.debug(f"Stack_trace for {page_id} exception", stack_info=True, stacklevel=15)
+                return
+
+        # TODO don't save page only if already exists in neo4j and last_edited_time is not greater than in neo4j
+        page = GraphPage(page_id, _extract_title(page_info), get_page_type_from_string(page_info['object']),
+                         page_info['url'], source='Notion', last_edited_time=page_info['last_edited_time'])
+
+        if not is_root:
+            if not self._should_add_page(page_info):
+                return
+            self._update_page_title(page_info, page)
+
+        logger.info(f"[Depth={recursive_depth}] Adding new processed page[{len(self._nodes)}]: {page.title}({page.type};{page.id})")
+        node.page = page
+
+        if not is_root and not self._should_process_content(page_info):
+            return
+
+        page.content = await self._crawl_page_content(node, page_info, recursive_depth=recursive_depth)
+
+    async def _crawl_page_content(self, node: CrawledNode, page_info: dict, recursive_depth: int = 0) -> str | None:
+        """
+        Fetch all blocks of the given page (and, for databases, all its items) concurrently, then render them into
+        markdown. Every sub-page, database item and bookmark found on the way is saved as a relation of the page and
+        scheduled for processing. If the page is a database, make additional call of get_all_database_items to get
+        all db pages.
         """
         recursive_depth += 1
         if recursive_depth >= self.config.NOTION_PAGE_MAX_DEPTH:
@@ -133,54 +528,106 @@ class NotionProvider(ContentProvider):
                 f"Current recursion depth {recursive_depth} for processing pages exceeded depth limit. See "
                 f"notion_api.page_max_depth in config.yaml")
             return None
+        page_id = page_info['id']
         is_database = page_info['object'] == 'database'
-        logger.debug(f"[Depth={recursive_depth}] Recursively processing page: {page_info['id']}, is_database: {is_database}")
+        logger.debug(f"[Depth={recursive_depth}] Crawling page: {page_id}, is_database: {is_database}")
 
-        content = ''
-        # TODO add parse comments
         if is_database:
             # TODO parse mentions in db title and relations in db properties
-            child_db_pages = self.notion_api.get_all_database_items(page_info['id'])
-            for child_page in child_db_pages:
-                self.save_relation_and_process_page(
-                    parent_id=page_info['id'],
-                    rel_type=RelationType.CONTAINS,
-                    page_id=child_page['id'],
-                    page_info=child_page,
-                    recursive_depth=recursive_depth)
+            page_items = self._call_api(self.notion_api.get_all_database_items, page_id)
         else:
-            self.recursive_process_page_properties(page_info, recursive_depth)
-            content = self.content_parser.parse_properties(page_info['properties'])
+            page_items = self._fetch_paginated_properties(page_info)
+        page_items, child_blocks = await asyncio.gather(page_items, self._get_page_block_tree(page_info),
+                                                        return_exceptions=True)
+        if isinstance(page_items, BaseException):
+            raise page_items
+
+        # Markdown of the whole page is written into one buffer and joined once
+        content = []
+        # TODO add parse comments
+        if is_database:
+            for child_page in page_items:
+                self._add_page_edge(node, parent_id=page_id, rel_type=RelationType.CONTAINS, page_id=child_page['id'],
+                                    page_info=child_page, recursive_depth=recursive_depth)
+        else:
+            self._process_page_properties(node, page_info, page_items, recursive_depth)
+            content.append(self.content_parser.parse_properties(page_info['properties']))
 
+        if isinstance(child_blocks, BaseException):
+            logger.error(f"[Depth={recursive_depth}] Exception occurred during fetching of page {page_id} blocks: "
+                         f"{child_blocks}")
+            return ''.join(content)
+        for block_node in child_blocks:
+            self._render_block(node, block_node, content, parent_id=page_id, recursive_depth=recursive_depth)
+
+        return ''.join(content)
+
+    async def _get_page_block_tree(self, page_info: dict) -> list[BlockNode]:
+        """
+        Block tree of the page from the block tree cache if the page wasn't edited since it was cached,
+        otherwise fetch it and cache it if all nested blocks were fetched successfully.
+        """
+        page_id, last_edited_time = page_info['id'], page_info['last_edited_time']
+        if self.block_tree_cache is not None:
+            cached_value = self.block_tree_cache.get(page_id)
+            if cached_value is not None:
+                cached = json.loads(cached_value)
+                if cached['last_edited_time'] == last_edited_time:
+                    logger.debug(f"Using cached block tree of page {page_id}")
+                    return cached['blocks']
+
+        failed_block_ids = []
+        block_tree = await self._fetch_block_tree(page_id, failed_block_ids=failed_block_ids)
+        # Edits made within the same minute don't change last_edited_time, so recently edited pages aren't cached
+        if self.block_tree_cache is not None and not failed_block_ids and last_edited_time < _new_watermark():
+            cached_value = json.dumps({'last_edited_time': last_edited_time, 'blocks': block_tree}).encode()
+            self.block_tree_cache.set(page_id, cached_value)
+        return block_tree
+
+    async def _fetch_block_tree(self, block_id: str, recursive_depth: int = 0,
+                                failed_block_ids: list[str] = None) -> list[BlockNode]:
+        """Fetch children of the block and, concurrently, the children of every nested block."""
+        blocks = await self._call_api(self.notion_api.get_all_content_blocks, block_id)
+        children = await asyncio.gather(*[self._fetch_nested_blocks(block, recursive_depth, failed_block_ids)
+                                          for block in blocks])
+        return list(zip(blocks, children))
+
+    async def _fetch_nested_blocks(self, block: dict, recursive_depth: int,
+                                   failed_block_ids: list[str] = None) -> list[BlockNode] | None:
+        if (not block.get('has_children') or block['type'] in ['child_page', 'child_database']
+                or block['type'] == 'unsupported'):
+            return None
         try:
-            child_blocks = self.notion_api.get_all_content_blocks(page_info['id'])
+            return await self._fetch_block_tree(block['id'], recursive_depth, failed_block_ids)
         except Exception as e:
-            logger.error(f"[Depth={recursive_depth}] Exception occurred during fetching of page {page_info['id']} blocks: {e}")
-            logger.debug(f"Stack_trace for {page_info['id']} exception", stack_info=True, stacklevel=15)
-            return content
-        for block in child_blocks:
-            content += self.recursive_process_block(block, parent_id=page_info['id'], recursive_depth=recursive_depth)
-
-        return content
-
-    def save_relation_and_process_page(self, parent_id: str, rel_type: RelationType, page_id: str,
-                                       rel_context: str = None,
-                                       is_database: bool = None, page_info: dict = None, recursive_depth: int = 0):
-        self.page_relations.append(GraphRelation(normalize_uuid(parent_id), rel_type, normalize_uuid(page_id), rel_context))
+            logger.error(f"[Depth={recursive_depth}] Exception occurred during fetching of page {block['id']} blocks: {e}")
+            logger.debug(f"Stack_trace for {block['id']} exception", stack_info=True, stacklevel=15)
+            if failed_block_ids is not None:
+                failed_block_ids.append(block['id'])
+            return None
+
+    def _add_page_edge(self, node: CrawledNode, parent_id: str, rel_type: RelationType, page_id: str,
+                       rel_context: str = None, is_database: bool = None, page_info: dict = None,
+                       recursive_depth: int = 0):
+        page_id = normalize_uuid(page_id)
+        relation = GraphRelation(normalize_uuid(parent_id), rel_type, page_id, rel_context)
         if rel_type == RelationType.REFERENCES and not self.config.NOTION_RECURSIVE_PROCESS_REFERENCE_PAGES:
+            node.edges.append((relation, None))
             return
-        self.recursive_process_unprocessed_page(page_id, is_database=is_database, page_info=page_info,
-                                                recursive_depth=recursive_depth)
-
-    def save_relation_and_process_bookmark(self, parent_id: str, url: str,
-                                           rel_type: RelationType = RelationType.REFERENCES,
-                                           rel_context: str = None, recursive_depth: int = 0):
-        self.page_relations.append(GraphRelation(normalize_uuid(parent_id), rel_type, url, rel_context))
-        self.process_unprocessed_bookmark(url, recursive_depth=recursive_depth)
-
-    def recursive_process_block(self, block: dict, parent_id: str, indent_level: int = 0,
-                                recursive_depth: int = 0) -> str:
-        logger.debug(f"[Depth={recursive_depth}] Recursively parsing block: {block['id']}, parent_id: {parent_id}")
+        node.edges.append((relation, page_id))
+        self._schedule_page(page_id, is_database=is_database, page_info=page_info, recursive_depth=recursive_depth)
+
+    def _add_bookmark_edge(self, node: CrawledNode, parent_id: str, url: str,
+                           rel_type: RelationType = RelationType.REFERENCES,
+                           rel_context: str = None, recursive_depth: int = 0):
+        node.edges.append((GraphRelation(normalize_uuid(parent_id), rel_type, url, rel_context), url))
+        self._schedule_bookmark(url, recursive_depth=recursive_depth)
+
+    def _render_block(self, node: CrawledNode, block_node: BlockNode, content: list[str], parent_id: str,
+                      indent_level: int = 0, recursive_depth: int = 0):
+        """Append markdown of the block and its nested blocks to the page's content buffer."""
+        block, child_blocks = block_node
+        logger.debug(f"[Depth={recursive_depth}] Parsing block: {block['id']}, parent_id: {parent_id}")
         unsupported_block_types = [  # noqa: F841
             'breadcrumb',
             'column',  # retrieve block children for content
@@ -217,7 +664,8 @@ class NotionProvider(ContentProvider):
         ]
 
         if block['type'] in ['child_page', 'child_database']:
-            self.save_relation_and_process_page(
+            self._add_page_edge(
+                node,
                 parent_id=parent_id,
                 rel_type=RelationType.CONTAINS,
                 page_id=block['id'],
@@ -226,18 +674,20 @@ class NotionProvider(ContentProvider):
 
         elif block['type'] == 'link_to_page':
             uuid = block['link_to_page'][block['link_to_page']['type']]
-            self.save_relation_and_process_page(
+            self._add_page_edge(
+                node,
                 parent_id=parent_id,
                 rel_type=RelationType.REFERENCES,
                 page_id=uuid,
                 recursive_depth=recursive_depth)
 
         elif block['type'] in rich_text_block_types:
-            self.process_rich_text_array(block[block['type']]['rich_text'], parent_id, recursive_depth)
+            self._process_rich_text_array(node, block[block['type']]['rich_text'], parent_id, recursive_depth)
 
         elif block['type'] in url_block_types:
             url = block[block['type']]['url']
-            self.save_relation_and_process_bookmark(
+            self._add_bookmark_edge(
+                node,
                 parent_id=parent_id,
                 url=url,
                 recursive_depth=recursive_depth
@@ -245,32 +695,25 @@ class NotionProvider(ContentProvider):
 
         elif block['type'] == 'unsupported':
             logger.warning(f"Unsupported block_id {block['id']} of page {parent_id}")
-            return ''
+            return
 
         block_content = self.content_parser.parse_block(block, indent_level)
-        content = block_content if block_content else ''
+        if block_content:
+            content.append(block_content)
 
-        if 'has_children' in block and block['has_children'] and block['type'] not in ['child_page', 'child_database']:
-            try:
-                child_blocks = self.notion_api.get_all_content_blocks(block['id'])
-            except Exception as e:
-                logger.error(f"[Depth={recursive_depth}] Exception occurred during fetching of page {block['id']} blocks: {e}")
-                logger.debug(f"Stack_trace for {block['id']} exception", stack_info=True, stacklevel=15)
-                return content
-            for child_block in child_blocks:
-                content += self.recursive_process_block(child_block, parent_id, indent_level + 1, recursive_depth)
-
-        return content
+        for child_block in child_blocks or []:
+            self._render_block(node, child_block, content, parent_id, indent_level + 1, recursive_depth)
 
-    def process_rich_text_array(self, rich_text_array: list, parent_id: str, recursive_depth: int,
-                                rel_context: str = None):
+    def _process_rich_text_array(self, node: CrawledNode, rich_text_array: list, parent_id: str, recursive_depth: int,
+                                 rel_context: str = None):
         for text in rich_text_array:
             if 'href' in text and text['href']:
                 uuid = _extract_notion_uuid(text['href'])
                 rich_text = _extract_rich_text(rich_text_array)
                 full_context = f"{rel_context}\n{rich_text}" if rel_context else rich_text
                 if uuid:
-                    self.save_relation_and_process_page(
+                    self._add_page_edge(
+                        node,
                         parent_id=parent_id,
                         rel_type=RelationType.REFERENCES,
                         page_id=uuid,
@@ -278,63 +721,26 @@ class NotionProvider(ContentProvider):
                         recursive_depth=recursive_depth
                     )
                 else:
-                    self.save_relation_and_process_bookmark(
+                    self._add_bookmark_edge(
+                        node,
                         parent_id=parent_id,
                         url=text['href'],
                         rel_context=full_context,
                         recursive_depth=recursive_depth
                     )
 
-    def process_unprocessed_bookmark(self, url: str, recursive_depth: int = 0):
-        if url not in self.prepared_pages.keys():
-            try:
-                title, description = get_info_from_url(url)
-            except Exception:
-                title, description = '', ''
-            bookmark_page = GraphPage(url, title, PageType.BOOKMARK, url, content=description, source='Web')
-            logger.info(f"[Depth={recursive_depth}] Adding new processed bookmark[{len(self.prepared_pages)}]: [{title}]({url})")
-            self.prepared_pages.update({url: bookmark_page})
-
-    def recursive_process_unprocessed_page(self, page_id: str, is_database: bool = None, page_info: dict = None, recursive_depth: int = 0):
-        page_id = normalize_uuid(page_id)
-
-        if not page_info:
-            try:
-                if is_database is None:
-                    page_info = self.notion_api.get_root_page_info(page_id)
-                elif is_database:
-                    page_info = self.notion_api.get_database_metadata(page_id)
-                else:
-                    page_info = self.notion_api.get_page_metadata(page_id)
-            except Exception as e:
-                logger.error(f"[Depth={recursive_depth}] Failed to get {'database' if is_database else 'page'} info "
-                             f"for id: {page_id}: {e}")
-                logger.debug(f"Stack_trace for {page_id} exception", stack_info=True, stacklevel=15)
-                return
-
-        # Stop processing if page already exists in prepared_pages and wasn't updated
-        if (page_id in self.prepared_pages.keys()
-                and not first_time_after_second(page_info['last_edited_time'],
-                                                self.prepared_pages[page_id].last_edited_time)):
-            return
-
-        # TODO don't save page only if already exists in neo4j and last_edited_time is not greater than in neo4j
-        page = GraphPage(page_id, _extract_title(page_info), get_page_type_from_string(page_info['object']),
-                         page_info['url'], source='Notion', last_edited_time=page_info['last_edited_time'])
-
-        if not self._should_add_page(page_info):
-            return
-
-        self._update_page_title(page_info, page)
-        logger.info(f"[Depth={recursive_depth}] Adding new processed page[{len(self.prepared_pages)}]: {page.title}({page.type};{page.id})")
-        self.prepared_pages.update({page_id: page})
-
-        if not self._should_process_content(page_info):
-            return
-
-        page.content = self.recursive_process_page_content(page_info, recursive_depth=recursive_depth)
-
-    def recursive_process_page_properties(self, page_info: dict, recursive_depth: int = 0):
+    async def _fetch_paginated_properties(self, page_info: dict) -> dict[str, list]:
+        """Concurrently fetch full values of all truncated (has_more) properties the crawler follows links in."""
+        paginated = [(prop_name, prop) for prop_name, prop in page_info['properties'].items()
+                     if prop['type'] in ['relation', 'rich_text', 'title'] and prop[prop['type']]
+                     and prop.get('has_more')]
+        values = await asyncio.gather(*[self._call_api(self.notion_api.get_all_page_properties, page_info['id'],
+                                                       prop['id']) for _, prop in paginated])
+        return {prop_name: [elem[prop['type']] for elem in items]
+                for (prop_name, prop), items in zip(paginated, values)}
+
+    def _process_page_properties(self, node: CrawledNode, page_info: dict, paginated_properties: dict[str, list],
+                                 recursive_depth: int = 0):
         unsupported_properties = [  # noqa: F841
             'checkbox',
             'created_by',
@@ -357,13 +763,14 @@ class NotionProvider(ContentProvider):
 
         for prop_name in page_info['properties']:
             prop = page_info['properties'][prop_name]
+            prop_values = paginated_properties.get(prop_name, prop.get(prop['type']))
             if prop['type'] == 'files' and prop['files']:
                 # TODO for every file extract ['external']['url']
                 pass
             if prop['type'] == 'relation' and prop['relation']:
-                relations = self.get_paginated_properties(page_info['id'], prop, 'relation')
-                for relation in relations:
-                    self.save_relation_and_process_page(
+                for relation in prop_values:
+                    self._add_page_edge(
+                        node,
                         parent_id=page_info['id'],
                         rel_type=RelationType.REFERENCES,
                         page_id=relation['id'],
@@ -371,26 +778,22 @@ class NotionProvider(ContentProvider):
                         recursive_depth=recursive_depth
                     )
             if prop['type'] == 'rich_text' and prop['rich_text']:
-                rich_text_array = self.get_paginated_properties(page_info['id'], prop, 'rich_text')
-                self.process_rich_text_array(rich_text_array, page_info['id'], rel_context=f"Text property **{prop_name}**:",
-                                             recursive_depth=recursive_depth)
+                self._process_rich_text_array(node, prop_values, page_info['id'],
+                                              rel_context=f"Text property **{prop_name}**:",
+                                              recursive_depth=recursive_depth)
             if prop['type'] == 'title' and prop['title']:
-                rich_text_array = self.get_paginated_properties(page_info['id'], prop, 'title')
-                self.process_rich_text_array(rich_text_array, page_info['id'], rel_context=f"Title property **{prop_name}**:",
-                                             recursive_depth=recursive_depth)
+                self._process_rich_text_array(node, prop_values, page_info['id'],
+                                              rel_context=f"Title property **{prop_name}**:",
+                                              recursive_depth=recursive_depth)
             if prop['type'] == 'url' and prop['url']:
-                self.save_relation_and_process_bookmark(
+                self._add_bookmark_edge(
+                    node,
                     parent_id=page_info['id'],
                     url=prop['url'],
                     rel_context=f"Url property **{prop_name}**",
                     recursive_depth=recursive_depth
                 )
 
-    def get_paginated_properties(self, page_id: str, prop: dict, prop_name: str):
-        return [elem[prop_name] for elem in
-                self.notion_api.get_all_page_properties(page_id, prop['id'])] if 'has_more' in prop and prop[
-            'has_more'] else prop[prop_name]
-
     def _should_add_page(self, page_info: dict):
         if page_info['archived']:
             return self.config.NOTION_ADD_ARCHIVED_PAGE_NODES
@@ -5,6 +5,10 @@ from graph_rag.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Notion responses may be pruned of default annotations (see notion_api.prune_notion_payload)
+DEFAULT_ANNOTATIONS = {'bold': False, 'italic': False, 'strikethrough': False, 'underline': False, 'code': False,
+                       'color': 'default'}
+
 
 class Notion2MarkdownParser:
     def __init__(self):
@@ -74,15 +78,15 @@ class Notion2MarkdownParser:
             self.block_handlers.pop(block_type, '')
 
     def parse_properties(self, properties: dict) -> str:
-        markdown = ""
+        lines = []
         for prop_name, prop in properties.items():
             prop_type = prop['type']
             if prop_type in self.property_handlers:
                 if prop[prop_type]:
-                    markdown += f"**{prop_name}**: {self.property_handlers[prop_type](prop[prop_type])}\n"
+                    lines.append(f"**{prop_name}**: {self.property_handlers[prop_type](prop[prop_type])}\n")
             elif prop_type not in self.config.NOTION_MARKDOWN_PARSER_EXCLUDED_PROPERTY_TYPES:
                 logger.warning(f"Unsupported property type: {prop_type}")
-        return f"###Properties:\n{markdown}" if markdown else ''
+        return f"###Properties:\n{''.join(lines)}" if lines else ''
 
     def parse_block(self, block: dict, indent_level: int = 0) -> str:
         block_type = block['type']
@@ -351,10 +355,10 @@ class Notion2MarkdownParser:
 
 
 def _extract_rich_text(rich_text: list[dict]) -> str:
-    text = ""
+    parts = []
     for rt in rich_text:
         content = rt['plain_text']
-        annotations = rt['annotations']
+        annotations = rt.get('annotations', DEFAULT_ANNOTATIONS)
 
         if annotations['code']:
             content = f"`{content}`"
@@ -367,7 +371,7 @@ def _extract_rich_text(rich_text: list[dict]) -> str:
         if annotations['underline']:
             content = f"<u>{content}</u>"
 
-        if rt['type'] == 'text' and rt['text'].get('link'):
+        if rt['type'] == 'text' and rt.get('text', {}).get('link'):
             content = f"[{content}]({rt['text']['link']['url']})"
         elif rt.get('href'):
             content = f"[{content}]({rt['href']})"
@@ -375,8 +379,8 @@ def _extract_rich_text(rich_text: list[dict]) -> str:
         if annotations['color'] != 'default':
             content = f'<span style="color: {annotations["color"].replace("_background", "")}">{content}</span>'
 
-        text += content
-    return text
+        parts.append(content)
+    return ''.join(parts)
 
 
 def _format_date(date_string: str) -> str:
@@ -1,15 +1,175 @@
+import importlib.util
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
 
 from graph_rag.config import Config
+from graph_rag.utils.kv_cache import SqliteCache
+from graph_rag.utils.metrics import run_metrics
+
+logger = logging.getLogger(__name__)
 
 config = Config()
 
+# lxml is much faster than the builtin parser, but it's an optional dependency
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+CHARSET_PATTERN = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class BookmarkFetcher:
+    """
+    Fetches titles and descriptions of web pages concurrently (fetch_all), with at most `per_host_limit` requests
+    to the same host at a time. Only the <head> of every page is downloaded (up to `max_head_bytes`).
+
+    If a cache is given, fetched info is stored in it and reused for `freshness_seconds`, after that it's revalidated
+    with a conditional request. Failed urls are not requested again until their backoff (doubled with every
+    consecutive failure) expires.
+    """
+
+    def __init__(self, max_workers: int = None, per_host_limit: int = None, max_head_bytes: int = None,
+                 timeout: float = None, cache: SqliteCache = None):
+        self.max_workers = max_workers or config.WEB_PARSER_MAX_WORKERS
+        self.per_host_limit = per_host_limit or config.WEB_PARSER_PER_HOST_CONCURRENCY
+        self.max_head_bytes = max_head_bytes or config.WEB_PARSER_MAX_HEAD_BYTES
+        self.timeout = timeout or config.WEB_PARSER_TIMEOUT
+        self.cache = cache
+        self.freshness_seconds = config.WEB_PARSER_CACHE_FRESHNESS_SECONDS
+        self.failure_backoff_seconds = config.WEB_PARSER_FAILURE_BACKOFF_SECONDS
+        self.failure_backoff_max_seconds = config.WEB_PARSER_FAILURE_BACKOFF_MAX_SECONDS
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.per_host_limit)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def fetch_all(self, urls: list[str]) -> dict[str, tuple[str | None, str | None] | None]:
+        """
+        Title and description of every url, None for urls that failed to be fetched. Urls are queued per host and the
+        next url of a host is only submitted when one of its requests finishes, so no worker waits on a busy host.
+        """
+        host_queues: dict[str, deque[str]] = defaultdict(deque)
+        for url in dict.fromkeys(urls):
+            host_queues[urlparse(url).netloc].append(url)
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bookmark-fetcher') as executor:
+            in_flight = {}
+
+            def submit_next(host: str):
+                url = host_queues[host].popleft()
+                in_flight[executor.submit(self._fetch_or_none, url)] = host, url
+
+            for host, queue in host_queues.items():
+                for _ in range(min(self.per_host_limit, len(queue))):
+                    submit_next(host)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, url = in_flight.pop(future)
+                    results[url] = future.result()
+                    if host_queues[host]:
+                        submit_next(host)
+        return {url: results[url] for url in urls}
+
+    def fetch(self, url: str) -> tuple[str | None, str | None]:
+        if self.cache is None:
+            return self._fetch(url)[0]
+
+        now = time.time()
+        cached_value = self.cache.get(url)
+        entry = json.loads(cached_value) if cached_value is not None else {}
+        if entry.get('retry_at', 0) > now:
+            if 'fetched_at' in entry:
+                # Serve the stale info of urls fetched before until their host can be revalidated
+                return entry['title'], entry['description']
+            raise Exception(f"Skipped after {entry['failures']} failed attempts, next retry in "
+                            f"{entry['retry_at'] - now:.0f}s")
+        if 'fetched_at' in entry and now - entry['fetched_at'] < self.freshness_seconds:
+            return entry['title'], entry['description']
+
+        try:
+            info, etag, last_modified = self._fetch(url, entry.get('etag'), entry.get('last_modified'))
+        except Exception:
+            failures = entry.get('failures', 0) + 1
+            if 'fetched_at' in entry:
+                # Keep serving the stale info, but don't revalidate it on every run while the host is down
+                entry.update(failures=failures, retry_at=now + self._failure_backoff(failures))
+                self.cache.set(url, json.dumps(entry).encode())
+                return entry['title'], entry['description']
+            self.cache.set(url, json.dumps({'failures': failures,
+                                            'retry_at': now + self._failure_backoff(failures)}).encode())
+            raise
+
+        title, description = info if info else (entry['title'], entry['description'])
+        self.cache.set(url, json.dumps({'title': title, 'description': description,
+                                        'etag': etag or entry.get('etag'),
+                                        'last_modified': last_modified or entry.get('last_modified'),
+                                        'fetched_at': now}).encode())
+        return title, description
+
+    def _fetch(self, url: str, etag: str = None,
+               last_modified: str = None) -> tuple[tuple[str | None, str | None] | None, str | None, str | None]:
+        """Returns title and description (None if the page wasn't modified) with the ETag and Last-Modified headers."""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        start = time.perf_counter()
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                run_metrics.record_call('web', seconds=time.perf_counter() - start)
+                return None, response.headers.get('ETag'), response.headers.get('Last-Modified')
+            if not response.ok:
+                run_metrics.record_call('web', seconds=time.perf_counter() - start, error=True)
+            response.raise_for_status()
+            head = self._read_head(response)
+            run_metrics.record_call('web', bytes_received=len(head), seconds=time.perf_counter() - start)
+            charset = CHARSET_PATTERN.search(response.headers.get('Content-Type', ''))
+
+        soup = BeautifulSoup(head, HTML_PARSER, parse_only=SoupStrainer(['title', 'meta']),
+                             from_encoding=charset.group(1) if charset else None)
+        title = soup.title.string if soup.title else None
+        description_tag = soup.find('meta', attrs={'name': 'description'})
+        description = description_tag.get('content') if description_tag else None
+        return (title, description), response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+    def _failure_backoff(self, failures: int) -> float:
+        return min(self.failure_backoff_max_seconds, self.failure_backoff_seconds * 2 ** (failures - 1))
+
+    def _fetch_or_none(self, url: str) -> tuple[str | None, str | None] | None:
+        try:
+            return self.fetch(url)
+        except Exception as e:
+            logger.warning(f"Failed to fetch bookmark info for {url}: {e}")
+            return None
+
+    def _read_head(self, response: requests.Response) -> bytes:
+        """Read the response body until the end of <head> or until max_head_bytes are read."""
+        content = bytearray()
+        lowered = bytearray()
+        for chunk in response.iter_content(chunk_size=8192):
+            search_from = max(0, len(lowered) - len(b'</head>'))
+            content += chunk
+            lowered += chunk.lower()
+            head_end = lowered.find(b'</head>', search_from)
+            if head_end != -1:
+                return bytes(content[:head_end + len(b'</head>')])
+            if len(content) >= self.max_head_bytes:
+                return bytes(content[:self.max_head_bytes])
+        return bytes(content)
+
 
-def get_info_from_url(url):
-    response = requests.get(url, timeout=config.WEB_PARSER_TIMEOUT)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    title = soup.title.string
-    description_tag = soup.find('meta', attrs={'name': 'description'})
-    description = description_tag['content'] if description_tag else None
-    return title, description
+def create_bookmark_fetcher() -> BookmarkFetcher:
+    """Bookmark fetcher with the persistent cache configured in web_parser.cache_path (if any)."""
+    cache = None
+    if config.WEB_PARSER_CACHE_PATH:
+        cache = SqliteCache(os.path.join(config.DATA_DIR, config.WEB_PARSER_CACHE_PATH, 'bookmarks_cache.sqlite'))
+    return BookmarkFetcher(cache=cache)
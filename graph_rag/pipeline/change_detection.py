@@ -0,0 +1,39 @@
+import hashlib
+import logging
+
+from graph_rag.data_model import ProcessedData, GraphPage, GraphRelation, PageChanges
+
+logger = logging.getLogger(__name__)
+
+
+def page_fingerprint(page: GraphPage, outgoing_relations: list[GraphRelation]) -> str:
+    """
+    Hash of everything processors store for the page: its fields (except chunks, which are derived from them)
+    and its outgoing relations, so e.g. a database gets changed when an item is added to it.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in (page.id, page.title, page.type.value, page.url, page.content, page.source, page.last_edited_time):
+        digest.update(b'\x00' if value is None else value.encode() + b'\x01')
+    for relation in sorted(outgoing_relations, key=lambda r: (r.relation_type.value, r.to_page_id, r.context or '')):
+        digest.update(f"{relation.relation_type.value}\x01{relation.to_page_id}\x01{relation.context or ''}\x00".encode())
+    return digest.hexdigest()
+
+
+def compute_fingerprints(processed_data: ProcessedData) -> dict[str, str]:
+    outgoing_relations: dict[str, list[GraphRelation]] = {}
+    for relation in processed_data.relations:
+        outgoing_relations.setdefault(relation.from_page_id, []).append(relation)
+    return {page_id: page_fingerprint(page, outgoing_relations.get(page_id, []))
+            for page_id, page in processed_data.pages.items()}
+
+
+def detect_changes(previous_fingerprints: dict[str, str], fingerprints: dict[str, str]) -> PageChanges:
+    changes = PageChanges(
+        added={page_id for page_id in fingerprints if page_id not in previous_fingerprints},
+        changed={page_id for page_id, fingerprint in fingerprints.items()
+                 if page_id in previous_fingerprints and previous_fingerprints[page_id] != fingerprint},
+        removed={page_id for page_id in previous_fingerprints if page_id not in fingerprints},
+    )
+    logger.info(f"Changes since the previous run: {len(changes.added)} pages added, {len(changes.changed)} changed, "
+                f"{len(changes.removed)} removed, {len(fingerprints) - len(changes.dirty)} unchanged")
+    return changes
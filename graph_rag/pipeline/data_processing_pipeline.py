@@ -1,12 +1,64 @@
 import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from graph_rag.config import Config
-from graph_rag.data_model import ProcessedData
+from graph_rag.data_model import ProcessedData, GraphPage, PageFingerprints
 from graph_rag.data_source import ContentProvider
+from graph_rag.pipeline.change_detection import compute_fingerprints, detect_changes
 from graph_rag.processor import Processor
+from graph_rag.utils import cache_util
+from graph_rag.utils.metrics import run_metrics
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of the stream in the queues between pipeline stages
+_END_OF_STREAM = object()
+
+PAGE_CONFLICT_POLICIES = ['keep_first', 'keep_last', 'latest_edited', 'fail']
+
+# Cache key of data shared by all sources of the pipeline, like the page fingerprints of the previous run
+PIPELINE_CACHE_KEY = 'pipeline'
+
+
+class PageConflictResolver:
+    """
+    Decides which page wins when several data sources produce the same page id (pipeline.page_conflict_policy):
+    keep_first/keep_last keep the page of the source that comes first/last, latest_edited keeps the page with
+    the greatest last_edited_time and fail raises an exception.
+    """
+
+    def __init__(self, policy: str):
+        if policy not in PAGE_CONFLICT_POLICIES:
+            raise Exception(f"Unknown page conflict policy '{policy}', expected one of {PAGE_CONFLICT_POLICIES}")
+        self.policy = policy
+        self.conflicts = 0
+        self._accepted: dict[str, tuple[ContentProvider, str | None]] = {}
+        self._lock = threading.Lock()
+
+    def accept(self, page: GraphPage, source: ContentProvider) -> bool:
+        """Whether the page should replace the one with the same id accepted before (if any)."""
+        with self._lock:
+            accepted = self._accepted.get(page.id)
+            if accepted is None or accepted[0] is source:
+                self._accepted[page.id] = (source, page.last_edited_time)
+                return True
+            self.conflicts += 1
+            accepted_source, accepted_edited_time = accepted
+            message = (f"Page {page.id} is produced by both {accepted_source.__class__.__name__} "
+                       f"and {source.__class__.__name__}")
+            if self.policy == 'fail':
+                raise Exception(message)
+            logger.debug(message)
+            if self.policy == 'keep_first':
+                return False
+            if self.policy == 'latest_edited' and (page.last_edited_time or '') <= (accepted_edited_time or ''):
+                return False
+            self._accepted[page.id] = (source, page.last_edited_time)
+            return True
+
 
 class DataProcessingPipeline:
     def __init__(self):
@@ -21,15 +73,179 @@ class DataProcessingPipeline:
         self.processors.append(processor)
 
     def run(self):
-        # Step 1: Fetch data from all sources
+        run_metrics.reset()
+        error = None
+        try:
+            if self.config.PIPELINE_STREAMING:
+                self.run_streaming()
+                return
+
+            # Step 1: Fetch data from all sources
+            processed_data, failed_sources = self._fetch_all_sources()
+            if self.config.PIPELINE_INCREMENTAL:
+                fingerprints = self._detect_changes(processed_data, failed_sources)
+
+            # Step 2: Run all processors
+            for processor in self.processors:
+                processor.process_data(processed_data)
+
+            # Pages count as processed only once every processor succeeded
+            if self.config.PIPELINE_INCREMENTAL:
+                cache_util.save_page_fingerprints_to_cache(PIPELINE_CACHE_KEY, fingerprints)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._write_run_report(error)
+
+    def _detect_changes(self, processed_data: ProcessedData, failed_sources: set[str]) -> PageFingerprints:
+        """
+        Fingerprint the pages and find which ones were added, changed or removed since the previous run.
+        Pages of sources that failed in this run are kept as they were, not removed. Returns the fingerprints
+        to save once the run succeeds, including those of the kept pages.
+        """
+        processed_data.fingerprints = compute_fingerprints(processed_data)
+        try:
+            previous = cache_util.load_page_fingerprints_from_cache(PIPELINE_CACHE_KEY)
+        except Exception:
+            logger.info("No fingerprints of a previous run found, all pages will be processed")
+            previous = PageFingerprints({})
+        kept_ids = {page_id for page_id, source in previous.sources.items()
+                    if source in failed_sources and page_id not in processed_data.fingerprints}
+        if kept_ids:
+            logger.warning(f"Keeping {len(kept_ids)} pages of failed sources {sorted(failed_sources)} unchanged")
+        fingerprints = PageFingerprints({**{page_id: previous.fingerprints[page_id] for page_id in kept_ids},
+                                         **processed_data.fingerprints},
+                                        {**{page_id: previous.sources[page_id] for page_id in kept_ids},
+                                         **processed_data.page_sources})
+        processed_data.changes = detect_changes(previous.fingerprints, fingerprints.fingerprints)
+        return fingerprints
+
+    def _write_run_report(self, error: BaseException | None):
+        """Save metrics of the run (metrics.report_file and metrics.prometheus_textfile), a failure is only logged."""
+        try:
+            if self.config.METRICS_REPORT_FILE:
+                run_metrics.write_report(os.path.join(self.config.DATA_DIR, self.config.METRICS_REPORT_FILE), error)
+            if self.config.METRICS_PROMETHEUS_TEXTFILE:
+                run_metrics.write_prometheus_textfile(
+                    os.path.join(self.config.DATA_DIR, self.config.METRICS_PROMETHEUS_TEXTFILE), error)
+        except OSError as e:
+            logger.warning(f"Failed to save pipeline run report: {e}")
+
+    def run_streaming(self):
+        """
+        Run data sources and every processor concurrently, each in its own thread. Batches of pages flow between
+        the stages through bounded queues (pipeline.queue_size), so a fast stage waits for a slow one downstream
+        instead of piling up data in memory. Page conflicts between sources are resolved in the order batches arrive.
+        """
+        queues = [queue.Queue(maxsize=self.config.PIPELINE_QUEUE_SIZE) for _ in self.processors]
+        errors: list[BaseException] = []
+        threads = [threading.Thread(target=self._run_sources_stage, args=(queues[0] if queues else None, errors),
+                                    name='pipeline-sources')]
+        for i, processor in enumerate(self.processors):
+            output_queue = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(target=self._run_processor_stage,
+                                            args=(processor, queues[i], output_queue, errors),
+                                            name=f"pipeline-{processor.__class__.__name__}"))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def _fetch_all_sources(self) -> tuple[ProcessedData, set[str]]:
+        """
+        Fetch data from all sources concurrently. A failing source is logged and skipped, names of failed sources
+        are returned with the data. Results are merged in the order the sources were added, regardless of which
+        one finishes first.
+        """
+        max_workers = self.config.PIPELINE_MAX_SOURCE_WORKERS or len(self.data_sources) or 1
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline-source') as executor:
+            futures = [executor.submit(data_source.fetch_data) for data_source in self.data_sources]
+            results, source_errors, failed_sources = [], [], set()
+            for data_source, future in zip(self.data_sources, futures):
+                try:
+                    results.append((data_source, future.result()))
+                except Exception as e:
+                    logger.error(f"Failed to fetch data from {data_source.__class__.__name__}: {e}")
+                    source_errors.append(e)
+                    failed_sources.add(data_source.__class__.__name__)
+        if self.data_sources and not results:
+            raise source_errors[0]
+
         processed_data = ProcessedData(pages={}, relations=[])
-        pages = processed_data.pages
-        relations = processed_data.relations
-        for data_source in self.data_sources:
-            source_data = data_source.fetch_data()
-            pages.update(source_data.pages)
-            relations.extend(source_data.relations)
-
-        # Step 2: Run all processors
-        for processor in self.processors:
-            processor.process_data(processed_data)
+        resolver = PageConflictResolver(self.config.PIPELINE_PAGE_CONFLICT_POLICY)
+        for data_source, source_data in results:
+            for page_id, page in source_data.pages.items():
+                if resolver.accept(page, data_source):
+                    processed_data.pages[page_id] = page
+                    processed_data.page_sources[page_id] = data_source.__class__.__name__
+            processed_data.relations.extend(source_data.relations)
+        if resolver.conflicts:
+            logger.warning(f"{resolver.conflicts} pages were produced by more than one data source, "
+                           f"resolved with '{resolver.policy}' policy")
+        return processed_data, failed_sources
+
+    def _run_sources_stage(self, output_queue: queue.Queue | None, errors: list[BaseException]):
+        """Stream all data sources concurrently into the output queue, a failing source doesn't stop the others."""
+        resolver = PageConflictResolver(self.config.PIPELINE_PAGE_CONFLICT_POLICY)
+        source_errors = []
+
+        def stream_source(data_source: ContentProvider):
+            try:
+                for batch in data_source.stream_data(self.config.PIPELINE_BATCH_SIZE):
+                    if errors:
+                        return
+                    try:
+                        batch.pages = {page_id: page for page_id, page in batch.pages.items()
+                                       if resolver.accept(page, data_source)}
+                    except Exception as e:
+                        # A conflict under 'fail' policy stops the whole pipeline, not just this source
+                        errors.append(e)
+                        return
+                    if output_queue:
+                        output_queue.put(batch)
+            except Exception as e:
+                logger.error(f"Failed to stream data from {data_source.__class__.__name__}: {e}")
+                source_errors.append(e)
+
+        try:
+            source_threads = [threading.Thread(target=stream_source, args=(data_source,),
+                                               name=f"pipeline-{data_source.__class__.__name__}")
+                              for data_source in self.data_sources]
+            for thread in source_threads:
+                thread.start()
+            for thread in source_threads:
+                thread.join()
+            if self.data_sources and len(source_errors) == len(self.data_sources):
+                errors.append(source_errors[0])
+        finally:
+            if output_queue:
+                output_queue.put(_END_OF_STREAM)
+
+    @staticmethod
+    def _run_processor_stage(processor: Processor, input_queue: queue.Queue, output_queue: queue.Queue | None,
+                             errors: list[BaseException]):
+        input_done = False
+        try:
+            while (batch := input_queue.get()) is not _END_OF_STREAM:
+                # After a failure keep draining the input, so upstream stages are not blocked on a full queue
+                if errors:
+                    continue
+                result = processor.process_batch(batch)
+                if result is not None and output_queue:
+                    output_queue.put(result)
+            input_done = True
+            if not errors:
+                result = processor.finish()
+                if result is not None and output_queue:
+                    output_queue.put(result)
+        except BaseException as e:
+            logger.error(f"{processor.__class__.__name__} failed, stopping the pipeline: {e}")
+            errors.append(e)
+            while not input_done and input_queue.get() is not _END_OF_STREAM:
+                pass
+        finally:
+            if output_queue:
+                output_queue.put(_END_OF_STREAM)
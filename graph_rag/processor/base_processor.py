@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 
 from graph_rag.config import Config
 from graph_rag.data_model import ProcessedData
+from graph_rag.utils.metrics import run_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__)
 class Processor(ABC):
     def __init__(self):
         self.config = Config()
+        self._buffered_data: ProcessedData | None = None
         logger.info(f"{self.__class__.__name__} initialized")
 
     @abstractmethod
@@ -18,4 +20,40 @@ class Processor(ABC):
 
     def process_data(self, processed_content: ProcessedData):
         logger.info(f"Processing started with {self.__class__.__name__}")
-        self._process(processed_content)
+        with run_metrics.measure(self.__class__.__name__, 'processor', items_in=len(processed_content.pages)) as stage:
+            self._process(processed_content)
+            stage.items_out += len(processed_content.pages)
+
+    def _process_batch(self, batch: ProcessedData) -> ProcessedData | None:
+        """
+        Process a batch of streamed data and return what is ready to be passed to the next processor.
+        By default batches are buffered and all data is processed at once by finish.
+        """
+        if self._buffered_data is None:
+            self._buffered_data = ProcessedData(pages={}, relations=[])
+        self._buffered_data.pages.update(batch.pages)
+        self._buffered_data.relations.extend(batch.relations)
+        return None
+
+    def _finish(self) -> ProcessedData | None:
+        """Complete processing of the stream, returns data that is still to be passed to the next processor."""
+        buffered_data, self._buffered_data = self._buffered_data, None
+        if buffered_data is not None:
+            self._process(buffered_data)
+        return buffered_data
+
+    def process_batch(self, batch: ProcessedData) -> ProcessedData | None:
+        logger.debug(f"Processing batch of {len(batch.pages)} pages with {self.__class__.__name__}")
+        with run_metrics.measure(self.__class__.__name__, 'processor', items_in=len(batch.pages)) as stage:
+            result = self._process_batch(batch)
+            if result is not None:
+                stage.items_out += len(result.pages)
+        return result
+
+    def finish(self) -> ProcessedData | None:
+        logger.info(f"Finishing stream processing with {self.__class__.__name__}")
+        with run_metrics.measure(self.__class__.__name__, 'processor') as stage:
+            result = self._finish()
+            if result is not None:
+                stage.items_out += len(result.pages)
+        return result
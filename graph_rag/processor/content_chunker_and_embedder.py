@@ -1,16 +1,26 @@
 import logging
+import os
 import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 
 import tiktoken
-from langchain_openai import OpenAIEmbeddings
 
+from graph_rag.config import Config
 from graph_rag.data_model import GraphPage, ProcessedData, Chunk, PageType
 from graph_rag.processor import Processor
+from graph_rag.processor.embedding_backends import create_embeddings
+from graph_rag.processor.embedding_batcher import EmbeddingBatcher
 from graph_rag.utils import cache_util
+from graph_rag.utils.embedding_store import EmbeddingStore
 from graph_rag.utils.logging import LoggingProgressBar, ProgressBarHandler
+from graph_rag.utils.vector_index import embedding_model_id, embedding_dimensions, embedding_space_id
 
 CACHE_FILE_NAME = 'chunked_pages.json'
 
+# Chunks are cut after the last of these characters that fits into them
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'[.?!\n]')
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,17 +51,36 @@ class TokenCounter:
 
 
 class ChunkCreator:
-    def __init__(self, chunk_size: int, chunk_overlap: int, token_counter: TokenCounter):
+    def __init__(self, chunk_size: int, chunk_overlap: int, token_counter: TokenCounter, workers: int = 1):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.token_counter = token_counter
+        self.workers = workers
+
+    def create_chunks_for_pages(self, pages: list[GraphPage]) -> list[list[str]]:
+        """
+        Chunks of every page, in the order of pages. Pages are chunked by a pool of `workers` processes,
+        or in this process with contents of all pages encoded at once by tiktoken's multithreaded batch encoding.
+        """
+        if self.workers > 1 and len(pages) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pages)), initializer=_init_chunking_worker,
+                                     initargs=(self,)) as executor:
+                return list(executor.map(_create_chunks_in_worker, pages,
+                                         chunksize=max(1, len(pages) // (self.workers * 4))))
+
+        encoder = self.token_counter.encoder
+        if isinstance(encoder, tiktoken.Encoding):
+            contents_tokens = encoder.encode_batch([page.content or '' for page in pages], disallowed_special=())
+        else:
+            contents_tokens = [None] * len(pages)
+        return [self.create_chunks(page, content_tokens) for page, content_tokens in zip(pages, contents_tokens)]
 
-    def create_chunks(self, page: GraphPage) -> list[str]:
+    def create_chunks(self, page: GraphPage, content_tokens: list[int] | None = None) -> list[str]:
         constant_part = self._create_constant_part_for_content(page)  # TODO limit so it wouldn't exceed max chunk size
         constant_token_count = self.token_counter.count(constant_part)
         available_tokens = self.chunk_size - constant_token_count
 
-        content_chunks = self.create_sentence_aware_chunks(page.content, available_tokens)
+        content_chunks = self.create_sentence_aware_chunks(page.content, available_tokens, content_tokens)
 
         if content_chunks:
             return [f"{constant_part}{chunk}" for chunk in content_chunks]
@@ -87,39 +116,66 @@ class ChunkCreator:
                 end = mid - 1
         return start
 
-    def create_sentence_aware_chunks(self, content: str, available_tokens: int) -> list[str]:
+    def create_sentence_aware_chunks(self, content: str, available_tokens: int,
+                                     tokens: list[int] | None = None) -> list[str]:
         overlap = self.chunk_overlap
+        if available_tokens < 1:
+            logger.warning(f"No tokens left for content in a chunk (max content chunk size {available_tokens}). "
+                           f"Using chunks of a single token.")
+            available_tokens = 1
         if available_tokens <= overlap:
             logger.warning(f"Chunk overlap {overlap} is greater than max content chunk size {available_tokens}. "
                            f"Skipping overlap.")
             overlap = 0
         chunks = []
-        tokens = self.token_counter.encoder.encode(content, disallowed_special=())
-
-        while tokens:
-            chunk = tokens[:available_tokens]
-            chunk_text = self.token_counter.encoder.decode(chunk)
-            last_punctuation = max(
-                chunk_text.rfind("."),
-                chunk_text.rfind("?"),
-                chunk_text.rfind("!"),
-                chunk_text.rfind("\n"),
-            )
-            if last_punctuation != -1:
-                chunk_text = chunk_text[: last_punctuation + 1]
+        # The content is encoded once, chunks are cut from it by token character offsets
+        token_starts, token_ends = self._encode_with_offsets(content, tokens)
+        boundaries = [match.start() for match in SENTENCE_BOUNDARY_PATTERN.finditer(content)]
+        token_count = len(token_starts)
 
+        start = 0
+        while start < token_count:
+            end = min(start + available_tokens, token_count)
+            chunk_start, chunk_end = token_starts[start], token_ends[end - 1]
+            last_boundary = bisect_left(boundaries, chunk_end) - 1
+            if last_boundary >= 0 and boundaries[last_boundary] >= chunk_start:
+                chunk_end = boundaries[last_boundary] + 1
+
+            chunk_text = content[chunk_start:chunk_end]
             if chunk_text and (not chunk_text.isspace()):
                 chunks.append(chunk_text)
 
-            chunk_size = self.token_counter.count(chunk_text)
-            if chunk_size >= len(tokens):
+            # Tokens of the chunk, including a token the boundary cuts through
+            chunk_size = bisect_left(token_starts, chunk_end, start, end) - start
+            if chunk_size >= token_count - start:
                 break
 
-            skip_tokens = chunk_size - overlap
-            tokens = tokens[skip_tokens:]
+            # A chunk shorter than the overlap is skipped whole, overlapping it could go backwards or loop forever
+            start += chunk_size - overlap if chunk_size > overlap else chunk_size
 
         return chunks
 
+    def _encode_with_offsets(self, content: str, tokens: list[int] | None = None) -> tuple[list[int], list[int]]:
+        """Start and end character offsets of the content tokens, the content is encoded unless tokens are given."""
+        encoder = self.token_counter.encoder
+        if tokens is None:
+            tokens = encoder.encode(content, disallowed_special=())
+        if isinstance(encoder, tiktoken.Encoding):
+            _, token_starts = encoder.decode_with_offsets(tokens)
+            return token_starts, token_starts[1:] + [len(content)]
+
+        # Encoders without offsets support: find decoded tokens in the content one after another
+        token_starts, token_ends, position = [], [], 0
+        for token in tokens:
+            token_text = encoder.decode([token])
+            token_start = content.find(token_text, position)
+            if token_start == -1:
+                token_start = position
+            position = token_start + len(token_text)
+            token_starts.append(token_start)
+            token_ends.append(position)
+        return token_starts, token_ends
+
     @staticmethod
     def _create_constant_part_for_content(page: GraphPage) -> str:
         return f"{ChunkCreator._create_constant_part(page)}\nContent:\n"
@@ -129,58 +185,187 @@ class ChunkCreator:
         return f"Title: {page.title}\nLast edited time: {page.last_edited_time}\n"
 
 
+# Chunk creator of a chunking worker process
+_worker_chunk_creator: ChunkCreator | None = None
+
+
+def _init_chunking_worker(chunk_creator: ChunkCreator):
+    global _worker_chunk_creator
+    _worker_chunk_creator = chunk_creator
+
+
+def _create_chunks_in_worker(page: GraphPage) -> list[str]:
+    return _worker_chunk_creator.create_chunks(page)
+
+
+def chunk_cache_key(config: Config) -> str:
+    """Cache key of chunked pages, chunks embedded by another backend, model or dimensions are a cache miss."""
+    return f"{config.NOTION_ROOT_PAGE_ID}/{embedding_space_id(config)}"
+
+
 class ContentChunkerAndEmbedder(Processor):
     def __init__(self):
         super().__init__()
         self.model = self.config.EMBEDDINGS_MODEL
-        self.embeddings = OpenAIEmbeddings(
-            model=self.model,
-            openai_api_base=self.config.EMBEDDINGS_BASE_URL,
-            openai_api_key=self.config.EMBEDDINGS_API_KEY
-        )
+        self.embeddings = create_embeddings(self.config)
         self.token_counter = TokenCounter(self.model)
         self.chunk_creator = ChunkCreator(
             self.config.EMBEDDINGS_MAX_TOKENS,
             self.config.EMBEDDINGS_OVERLAP,
-            self.token_counter
+            self.token_counter,
+            self.config.EMBEDDINGS_CHUNKING_WORKERS
         )
         self.text_cleaner = TextCleaner()
+        self.embedding_batcher = EmbeddingBatcher(
+            lambda texts: self.embeddings.embed_documents(texts),
+            self.token_counter.count,
+            self.config.EMBEDDINGS_MAX_INPUTS_PER_REQUEST,
+            self.config.EMBEDDINGS_MAX_TOKENS_PER_REQUEST,
+            self.config.EMBEDDINGS_MAX_CONCURRENT_REQUESTS
+        )
+        self.embedding_store = None
+        if self.config.EMBEDDINGS_STORE_PATH:
+            self.embedding_store = EmbeddingStore(os.path.join(self.config.DATA_DIR, self.config.EMBEDDINGS_STORE_PATH),
+                                                  embedding_model_id(self.config), embedding_dimensions(self.config))
+        self.cache_key = chunk_cache_key(self.config)
+        # Previously chunked pages and pages chunked so far, used while processing a stream of batches
+        self._cached_pages: dict[str, GraphPage] | None = None
+        self._chunked_pages: dict[str, GraphPage] = {}
 
     def _process(self, processed_content: ProcessedData):
         logger.info("Processing content chunks and embeddings")
+        if processed_content.changes is not None:
+            self._process_changes(processed_content)
+            return
+
         if self.config.CACHE_ENABLED:
-            root_page_id = self.config.NOTION_ROOT_PAGE_ID
             try:
-                processed_content.pages = cache_util.load_prepared_pages_from_cache(root_page_id, CACHE_FILE_NAME)
+                processed_content.pages = cache_util.load_prepared_pages_from_cache(self.cache_key, CACHE_FILE_NAME)
                 logger.info("Chunked pages loaded from cache")
                 return
             except Exception:
                 logger.warning("No cache found for chunked pages. Processing from scratch.")
 
-        progress_bar = LoggingProgressBar(len(processed_content.pages), prefix='Processing:',
-                                          suffix=f"Complete out of {len(processed_content.pages)} pages ", length=50)
-        handler = ProgressBarHandler(progress_bar)
-        logger.addHandler(handler)
-        progress_bar.start()
-        for _, page in processed_content.pages.items():
-            progress_bar.update()
-            if page.type in [PageType.PAGE, PageType.DATABASE]:
-                self._process_page(page)
-
-        progress_bar.finish()
-        logger.removeHandler(handler)
+        self._process_pages([page for page in processed_content.pages.values()
+                             if page.type in [PageType.PAGE, PageType.DATABASE]])
 
         if self.config.CACHE_ENABLED:
-            cache_util.save_prepared_pages_to_cache(root_page_id, processed_content.pages, CACHE_FILE_NAME)
+            cache_util.save_prepared_pages_to_cache(self.cache_key, processed_content.pages, CACHE_FILE_NAME)
+            logger.info("Chunked pages saved to cache")
+
+    def _process_changes(self, processed_content: ProcessedData):
+        """
+        Chunk and embed only added and changed pages, unchanged pages get their chunks from the cache. Unchanged
+        pages missing from the cache (e.g. embedded by another model or with other dimensions) are embedded again
+        and marked as changed, so the next processors store their new chunks.
+        """
+        cached_pages = self._load_cached_pages()
+        dirty_pages = []
+        for page_id, page in processed_content.pages.items():
+            if page.type not in [PageType.PAGE, PageType.DATABASE]:
+                continue
+            if page_id in processed_content.changes.dirty:
+                dirty_pages.append(page)
+            elif page_id in cached_pages:
+                page.chunks = cached_pages[page_id].chunks
+            elif self.config.CACHE_ENABLED:
+                processed_content.changes.changed.add(page_id)
+                dirty_pages.append(page)
+        logger.info(f"Chunking and embedding {len(dirty_pages)} added or changed pages")
+        self._process_pages([page for page in dirty_pages if not self._reuse_cached_chunks(page, cached_pages)])
+
+        if self.config.CACHE_ENABLED and (dirty_pages or processed_content.changes.removed):
+            # Pages that are neither in the data nor removed (those of a failed source) keep their cached chunks
+            cache_util.save_prepared_pages_to_cache(
+                self.cache_key,
+                {page_id: page for page_id, page in processed_content.pages.items()
+                 if page.type in [PageType.PAGE, PageType.DATABASE]}, CACHE_FILE_NAME, replace=False)
+            cache_util.remove_prepared_pages_from_cache(self.cache_key, sorted(processed_content.changes.removed),
+                                                        CACHE_FILE_NAME)
             logger.info("Chunked pages saved to cache")
 
-    def _process_page(self, page: GraphPage) -> None:
-        logger.debug(f"Chunking and embedding content of page {page.title}-{page.id}")
-        chunks = self.chunk_creator.create_chunks(page)
-        cleaned_chunks = [self.text_cleaner.clean_markdown(chunk) for chunk in chunks]
-        chunk_embeddings = self.embeddings.embed_documents(cleaned_chunks)
+    def _process_batch(self, batch: ProcessedData) -> ProcessedData:
+        """Chunk and embed pages of the batch, reusing cached chunks of pages that weren't edited since cached."""
+        if self._cached_pages is None:
+            self._cached_pages = self._load_cached_pages()
+
+        pages = [page for page in batch.pages.values() if page.type in [PageType.PAGE, PageType.DATABASE]]
+        self._process_pages([page for page in pages if not self._reuse_cached_chunks(page, self._cached_pages)])
+        if self.config.CACHE_ENABLED:
+            self._chunked_pages.update((page.id, page) for page in pages)
+        return batch
+
+    def _load_cached_pages(self) -> dict[str, GraphPage]:
+        """
+        Cached chunked pages, their embeddings are views of the cached rows: most of them belong to unchanged pages,
+        which are neither embedded nor stored again, so they're never copied into lists.
+        """
+        if self.config.CACHE_ENABLED:
+            try:
+                return cache_util.load_prepared_pages_from_cache(self.cache_key, CACHE_FILE_NAME, check_ttl=False,
+                                                                 zero_copy=True)
+            except Exception:
+                logger.warning("No cache found for chunked pages. Processing from scratch.")
+        return {}
 
-        page.chunks = [
-            Chunk(content=chunk, embedding=embedding)
-            for chunk, embedding in zip(chunks, chunk_embeddings)
-        ]
+    @staticmethod
+    def _reuse_cached_chunks(page: GraphPage, cached_pages: dict[str, GraphPage]) -> bool:
+        """Take chunks of the cached page if it wasn't edited since it was cached, returns whether they were taken."""
+        cached_page = cached_pages.get(page.id)
+        if cached_page and cached_page.chunks and cached_page.last_edited_time == page.last_edited_time:
+            page.chunks = cached_page.chunks
+            return True
+        return False
+
+    def _finish(self) -> None:
+        if self.config.CACHE_ENABLED and self._chunked_pages:
+            cache_util.save_prepared_pages_to_cache(self.cache_key, self._chunked_pages, CACHE_FILE_NAME)
+            logger.info("Chunked pages saved to cache")
+        self._cached_pages = None
+        self._chunked_pages = {}
+
+    def _process_pages(self, pages: list[GraphPage]) -> None:
+        """Chunk the pages and embed chunks of all of them together, packed in as few requests as possible."""
+        if not pages:
+            return
+        logger.debug(f"Chunking content of {len(pages)} pages")
+        page_chunks = self.chunk_creator.create_chunks_for_pages(pages)
+        cleaned_chunks = [self.text_cleaner.clean_markdown(chunk) for chunks in page_chunks for chunk in chunks]
+
+        progress_bar = LoggingProgressBar(len(cleaned_chunks), prefix='Embedding:',
+                                          suffix=f"Complete out of {len(cleaned_chunks)} chunks of {len(pages)} pages ",
+                                          length=50)
+        handler = ProgressBarHandler(progress_bar)
+        logger.addHandler(handler)
+        progress_bar.start()
+        try:
+            chunk_embeddings = self._embed(cleaned_chunks, on_progress=progress_bar.update)
+        finally:
+            progress_bar.finish()
+            logger.removeHandler(handler)
+
+        # Scatter embeddings back to pages, in the order their chunks were packed
+        offset = 0
+        for page, chunks in zip(pages, page_chunks):
+            page.chunks = [
+                Chunk(content=chunk, embedding=embedding)
+                for chunk, embedding in zip(chunks, chunk_embeddings[offset:offset + len(chunks)])
+            ]
+            offset += len(chunks)
+
+    def _embed(self, texts: list[str], on_progress=None) -> list[list[float]]:
+        """Embeddings of the texts, only texts not found in the embedding store are sent to the embeddings API."""
+        if self.embedding_store is None:
+            return self.embedding_batcher.embed(texts, on_progress=on_progress)
+
+        embeddings = self.embedding_store.get_many(texts)
+        missing_texts = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        logger.info(f"{len(texts) - len(missing_texts)} of {len(texts)} chunk embeddings found in the embedding store")
+        if on_progress:
+            on_progress(len(texts) - len(missing_texts))
+        if not missing_texts:
+            return embeddings
+
+        new_embeddings = dict(zip(missing_texts, self.embedding_batcher.embed(missing_texts, on_progress=on_progress)))
+        self.embedding_store.put_many(list(new_embeddings), list(new_embeddings.values()))
+        return [embedding if embedding is not None else new_embeddings[text] for text, embedding in zip(texts, embeddings)]
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from graph_rag.config import Config
+from graph_rag.utils.metrics import run_metrics
+from graph_rag.utils.rate_scheduler import PRIORITY_BACKFILL, scheduled_http_client
+from graph_rag.utils.vector_index import truncate_embedding
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ['openai', 'local', 'hash']
+LOCAL_POOLS = ['thread', 'process']
+
+# How long a query waits for concurrent queries to be embedded together with it
+QUERY_BATCH_WAIT_SECONDS = 0.005
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic offline embeddings for tests and benchmarks: words of the text are hashed into signed buckets of
+    a normalized vector, so texts sharing words are similar. Nothing is downloaded and no model is run.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for word in WORD_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embeddings of a sentence-transformers model run on the CPU. Documents are sorted by length and encoded in batches
+    of similar length (less padding) by a pool of threads or processes, concurrent queries are encoded together.
+    The model must produce embeddings of the given dimensions, which is checked when it's loaded.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32, workers: int = 1, pool: str = 'thread',
+                 dimensions: int | None = None, model=None):
+        if pool not in LOCAL_POOLS:
+            raise Exception(f"Unknown local embeddings pool {pool}, expected one of {LOCAL_POOLS}")
+        self.model_name = model_name
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self.workers = workers
+        self.pool = pool
+        self._model = model
+        self._process_pool = None
+        self._lock = threading.Lock()
+        self._pending_queries: list[tuple[str, Future]] = []
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise Exception("Local embeddings need sentence-transformers, install it with "
+                                    "`pip install sentence-transformers`")
+                logger.info(f"Loading local embedding model {self.model_name}")
+                model = SentenceTransformer(self.model_name, device='cpu')
+                model_dimensions = model.get_sentence_embedding_dimension()
+                if self.dimensions and model_dimensions != self.dimensions:
+                    raise Exception(f"Local embedding model {self.model_name} produces {model_dimensions}-dimensional "
+                                    f"embeddings, but embeddings.dimensions is {self.dimensions}. "
+                                    f"Set embeddings.dimensions to {model_dimensions}")
+                self._model = model
+            return self._model
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        if self.pool == 'process' and self.workers > 1:
+            return self._encode_in_processes(texts)
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        embeddings: list[list[float] | None] = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(batches)),
+                                thread_name_prefix='local-embeddings') as executor:
+            for batch, batch_embeddings in zip(batches, executor.map(
+                    lambda batch: self._encode([texts[i] for i in batch]), batches)):
+                for i, embedding in zip(batch, batch_embeddings):
+                    embeddings[i] = embedding
+        return embeddings
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embedding of the query, queries arriving within a few milliseconds of each other are encoded at once."""
+        future = Future()
+        with self._lock:
+            self._pending_queries.append((text, future))
+            is_leader = len(self._pending_queries) == 1
+        if is_leader:
+            time.sleep(QUERY_BATCH_WAIT_SECONDS)
+            with self._lock:
+                queries, self._pending_queries = self._pending_queries, []
+            try:
+                for (_, query_future), embedding in zip(queries, self._encode([query for query, _ in queries])):
+                    query_future.set_result(embedding)
+            except Exception as e:
+                for _, query_future in queries:
+                    if not query_future.done():
+                        query_future.set_exception(e)
+        return future.result()
+
+    def close(self):
+        if self._process_pool is not None:
+            self.model.stop_multi_process_pool(self._process_pool)
+            self._process_pool = None
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        return [list(map(float, embedding))
+                for embedding in self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True)]
+
+    def _encode_in_processes(self, texts: list[str]) -> list[list[float]]:
+        if self._process_pool is None:
+            self._process_pool = self.model.start_multi_process_pool(target_devices=['cpu'] * self.workers)
+        embeddings = self.model.encode_multi_process(texts, self._process_pool, batch_size=self.batch_size,
+                                                     normalize_embeddings=True)
+        return [list(map(float, embedding)) for embedding in embeddings]
+
+
+class TruncatedEmbeddings(Embeddings):
+    """Embeddings of another backend truncated to their first dimensions and normalized again."""
+
+    def __init__(self, embeddings: Embeddings, dimensions: int):
+        self.embeddings = embeddings
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [truncate_embedding(embedding, self.dimensions) for embedding in self.embeddings.embed_documents(texts)]
+
+    def embed_query(self, text: str) -> list[float]:
+        return truncate_embedding(self.embeddings.embed_query(text), self.dimensions)
+
+
+def create_embeddings(config: Config, priority: int = PRIORITY_BACKFILL) -> Embeddings:
+    """
+    Embeddings of the backend selected in the config, documents and queries must be embedded by the same one.
+    Requests of API backends are scheduled with the given priority (rate_scheduler.PRIORITY_*).
+    """
+    embeddings = _create_backend_embeddings(config, priority)
+    if config.EMBEDDINGS_TRUNCATE_DIMENSIONS:
+        return TruncatedEmbeddings(embeddings, config.EMBEDDINGS_TRUNCATE_DIMENSIONS)
+    return embeddings
+
+
+
+def _create_backend_embeddings(config: Config, priority: int) -> Embeddings:
+    backend = config.EMBEDDINGS_BACKEND
+    if backend == 'openai':
+        return OpenAIEmbeddings(
+            model=config.EMBEDDINGS_MODEL,
+            openai_api_base=config.EMBEDDINGS_BASE_URL,
+            openai_api_key=config.EMBEDDINGS_API_KEY,
+            http_client=scheduled_http_client(f"openai/{config.EMBEDDINGS_MODEL}", config, priority,
+                                              run_metrics.httpx_event_hooks('openai'))
+        )
+    if backend == 'local':
+        return LocalEmbeddings(config.EMBEDDINGS_LOCAL_MODEL, config.EMBEDDINGS_LOCAL_BATCH_SIZE,
+                               config.EMBEDDINGS_LOCAL_WORKERS, config.EMBEDDINGS_LOCAL_POOL,
+                               int(config.EMBEDDINGS_DIMENSIONS))
+    if backend == 'hash':
+        return HashEmbeddings(int(config.EMBEDDINGS_DIMENSIONS))
+    raise Exception(f"Unknown embeddings backend {backend}, expected one of {EMBEDDING_BACKENDS}")
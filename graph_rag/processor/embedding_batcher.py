@@ -0,0 +1,58 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Embeds texts of many pages at once: texts are packed into requests of at most max_inputs_per_request texts and
+    max_tokens_per_request tokens, and up to max_concurrent_requests requests are sent concurrently.
+    """
+
+    def __init__(self, embed_documents: Callable[[list[str]], list[list[float]]], count_tokens: Callable[[str], int],
+                 max_inputs_per_request: int = 2048, max_tokens_per_request: int = 300000,
+                 max_concurrent_requests: int = 4):
+        self.embed_documents = embed_documents
+        self.count_tokens = count_tokens
+        self.max_inputs_per_request = max_inputs_per_request
+        self.max_tokens_per_request = max_tokens_per_request
+        self.max_concurrent_requests = max_concurrent_requests
+
+    def embed(self, texts: list[str], on_progress: Callable[[int], None] = None) -> list[list[float]]:
+        """Embeddings of the texts in the same order, on_progress is called with the number of texts of every request done."""
+        batches = self._split_into_requests(texts)
+        if not batches:
+            return []
+        logger.debug(f"Embedding {len(texts)} texts in {len(batches)} requests")
+        embeddings = []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(batches)),
+                                thread_name_prefix='embeddings') as executor:
+            futures = [executor.submit(self.embed_documents, batch) for batch in batches]
+            try:
+                for batch, future in zip(batches, futures):
+                    batch_embeddings = future.result()
+                    if len(batch_embeddings) != len(batch):
+                        raise Exception(f"Expected {len(batch)} embeddings, got {len(batch_embeddings)}")
+                    embeddings.extend(batch_embeddings)
+                    if on_progress:
+                        on_progress(len(batch))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return embeddings
+
+    def _split_into_requests(self, texts: list[str]) -> list[list[str]]:
+        batches, batch, batch_tokens = [], [], 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if batch and (len(batch) >= self.max_inputs_per_request or batch_tokens + tokens > self.max_tokens_per_request):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
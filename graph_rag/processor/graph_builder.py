@@ -12,8 +12,14 @@ class GraphBuilder(Processor):
     def __init__(self):
         super().__init__()
         self.neo4j_manager = Neo4jManager()
+        # All pages and relations of a stream, relations are linked once all pages are created
+        self._streamed_data: ProcessedData | None = None
 
     def _process(self, processed_data: ProcessedData):
+        if processed_data.changes is not None:
+            self._process_changes(processed_data)
+            return
+
         self.neo4j_manager.create_vector_index()
 
         self.create_processed_page_nodes([p for p in processed_data.pages.values()])
@@ -25,6 +31,48 @@ class GraphBuilder(Processor):
 
         logger.info("Notion structure has been parsed and stored in Neo4j.")
 
+    def _process_changes(self, processed_data: ProcessedData):
+        """Write only added and changed pages with their outgoing relations, and delete removed pages."""
+        changes = processed_data.changes
+        self.neo4j_manager.create_vector_index()
+
+        if changes.removed:
+            self.neo4j_manager.remove_pages(sorted(changes.removed))
+            logger.info(f"{len(changes.removed)} removed pages deleted from graph")
+
+        dirty = changes.dirty
+        self.create_processed_page_nodes([page for page_id, page in processed_data.pages.items() if page_id in dirty])
+
+        # Relations of changed pages are re-created, as some of them may not exist anymore
+        if changes.changed:
+            self.neo4j_manager.remove_outgoing_relations(sorted(changes.changed))
+        dirty_data = ProcessedData(processed_data.pages,
+                                   [relation for relation in processed_data.relations if relation.from_page_id in dirty])
+        self.handle_orphan_relations(dirty_data)
+        for relation in dirty_data.relations:
+            self.neo4j_manager.link_entities(relation)
+        logger.info(f"{len(dirty)} added or changed pages stored in Neo4j.")
+
+    def _process_batch(self, batch: ProcessedData) -> ProcessedData:
+        if self._streamed_data is None:
+            self.neo4j_manager.create_vector_index()
+            self._streamed_data = ProcessedData(pages={}, relations=[])
+        for page in batch.pages.values():
+            self.neo4j_manager.create_page_node(page)
+        self._streamed_data.pages.update(batch.pages)
+        self._streamed_data.relations.extend(batch.relations)
+        logger.info(f"{len(self._streamed_data.pages)} pages saved to graph")
+        return batch
+
+    def _finish(self) -> None:
+        streamed_data, self._streamed_data = self._streamed_data, None
+        if streamed_data is None:
+            return
+        self.handle_orphan_relations(streamed_data)
+        for relation in streamed_data.relations:
+            self.neo4j_manager.link_entities(relation)
+        logger.info("Notion structure has been parsed and stored in Neo4j.")
+
     def handle_orphan_relations(self, processed_data: ProcessedData):
         if self.config.NOTION_CREATE_UNPROCESSED_NODES:
             self.add_missing_pages(processed_data.pages, processed_data.relations)
@@ -1,9 +1,12 @@
 import logging
+import time
 
 from langchain_community.graphs.neo4j_graph import Neo4jGraph
 
 from graph_rag.config import Config
 from graph_rag.data_model import GraphRelation, GraphPage, Chunk, PageType, RelationType
+from graph_rag.utils.metrics import run_metrics
+from graph_rag.utils.vector_index import embedding_dimensions, embedding_space_id
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +27,7 @@ class Neo4jRetriever:
 
         // Collect all properties of the main node
         WITH p, node, score, 
-             apoc.map.removeKeys(p {.*}, ['embedding']) AS page_properties,
+             apoc.map.removeKeys(p {.*}, ['embedding', 'embedding_model']) AS page_properties,
              apoc.map.removeKeys(node {.*}, ['embedding']) AS chunk_properties
 
         // 1-hop neighbors
@@ -57,13 +60,13 @@ class Neo4jRetriever:
         WITH p, node, score, page_properties, chunk_properties,
              collect(DISTINCT {
                  id: neighbor1.id,
-                 properties: apoc.map.removeKeys(neighbor1 {.*}, ['embedding']),
+                 properties: apoc.map.removeKeys(neighbor1 {.*}, ['embedding', 'embedding_model']),
                  relation: type(r1),
                  similarity: neighbor1_similarity
              }) AS hop1_neighbors,
              collect(DISTINCT {
                  id: neighbor2.id,
-                 properties: apoc.map.removeKeys(neighbor2 {.*}, ['embedding']),
+                 properties: apoc.map.removeKeys(neighbor2 {.*}, ['embedding', 'embedding_model']),
                  relation: type(r2),
                  similarity: neighbor2_similarity
              }) AS hop2_neighbors
@@ -144,8 +147,18 @@ class Neo4jManager:
         )
         self.retriever = Neo4jRetriever(self.config, self.graph)
 
+    def _query(self, query: str, params: dict = None) -> list[dict]:
+        start = time.perf_counter()
+        try:
+            result = self.graph.query(query, params or {})
+        except Exception:
+            run_metrics.record_call('neo4j', seconds=time.perf_counter() - start, error=True)
+            raise
+        run_metrics.record_call('neo4j', seconds=time.perf_counter() - start)
+        return result
+
     def clean_database(self):
-        self.graph.query("MATCH (n) DETACH DELETE n")
+        self._query("MATCH (n) DETACH DELETE n")
         logger.info("Database has been cleaned")
         self.create_vector_index()
 
@@ -154,49 +167,84 @@ class Neo4jManager:
             "CREATE CONSTRAINT chunk_id IF NOT EXISTS "
             f"FOR (c:{PageType.CHUNK.value}) REQUIRE c.id IS UNIQUE"
         )
-        self.graph.query(constraint_query)
-
-        # Create the vector index if it doesn't exist
+        self._query(constraint_query)
+
+        # Settings that the index has to be re-created for when they change
+        dimensions = embedding_dimensions(self.config)
+        quantization = self.config.EMBEDDINGS_INDEX_QUANTIZATION
+        index_settings = {'vector.dimensions': dimensions}
+        if quantization is not None:
+            index_settings['vector.quantization.enabled'] = bool(quantization)
+
+        existing_config = self.get_vector_index_config()
+        if existing_config is not None and any(existing_config.get(key) != value
+                                               for key, value in index_settings.items()):
+            # Pages embedded with other dimensions are re-written by the pipeline (see create_page_node)
+            logger.warning(f"Dropping vector index 'chunk_embedding' with {existing_config} to re-create it with "
+                           f"{index_settings}")
+            self._query("DROP INDEX chunk_embedding IF EXISTS")
+
+        quantization_option = f", `vector.quantization.enabled`: {str(bool(quantization)).lower()}" \
+            if quantization is not None else ''
         index_query = (
             "CREATE VECTOR INDEX chunk_embedding IF NOT EXISTS "
             f"FOR (c:{PageType.CHUNK.value}) "
             "ON (c.embedding) "
-            f"OPTIONS {{indexConfig: {{`vector.dimensions`: {self.config.EMBEDDINGS_DIMENSIONS}, `vector.similarity_function`: 'cosine'}}}}"
+            f"OPTIONS {{indexConfig: {{`vector.dimensions`: {dimensions}, `vector.similarity_function`: 'cosine'"
+            f"{quantization_option}}}}}"
         )
         try:
-            self.graph.query(index_query)
+            self._query(index_query)
             logger.info("Vector index 'chunk_embedding' created or already exists")
         except Exception as e:
             logger.error(f"Failed to create vector index: {str(e)}")
 
-    def check_page_exists(self, page_id: str) -> str | None:
+    def get_vector_index_config(self) -> dict | None:
+        """indexConfig of the existing chunk_embedding vector index, None if there is no such index."""
+        query = (
+            "SHOW INDEXES YIELD name, type, options "
+            "WHERE name = 'chunk_embedding' AND type = 'VECTOR' "
+            "RETURN options.indexConfig AS index_config"
+        )
+        result = self._query(query)
+        if result:
+            return result[0]['index_config']
+        return None
+
+    def check_page_exists(self, page_id: str) -> tuple[str | None, str | None] | None:
+        """
+        last_edited_time of the page and the embedding model with dimensions of its chunks, None if the page
+        doesn't exist.
+        """
         query = (
             "MATCH (p) WHERE p.id = $page_id "
-            "RETURN p.last_edited_time AS last_edited_time"
+            "RETURN p.last_edited_time AS last_edited_time, p.embedding_model AS embedding_model"
         )
-        result = self.graph.query(query, {'page_id': page_id})
+        result = self._query(query, {'page_id': page_id})
         if result:
-            return result[0]['last_edited_time']
+            return result[0]['last_edited_time'], result[0]['embedding_model']
         return None
 
     def create_page_node(self, page: GraphPage):
-        existing_last_edited_time = self.check_page_exists(page.id)
+        existing = self.check_page_exists(page.id)
+        embedding_model = embedding_space_id(self.config)
 
-        if existing_last_edited_time and page.last_edited_time == existing_last_edited_time:
+        if existing and existing[0] and existing == (page.last_edited_time, embedding_model):
             logger.debug(f"Page {page.id} already exists with a newer or equal last_edited_time. Skipping update.")
             return
 
         query = (
             f"MERGE (p:{page.type.value} {{id: $page_id}}) "
             "SET p.title = $title, p.content = $content, p.url = $url, p.source = $source, "
-            "p.last_edited_time = $last_edited_time"
+            "p.last_edited_time = $last_edited_time, p.embedding_model = $embedding_model"
         )
-        self.graph.query(query, {'page_id': page.id,
-                                 'title': page.title,
-                                 'content': page.content,
-                                 'url': page.url,
-                                 'source': page.source,
-                                 'last_edited_time': page.last_edited_time})
+        self._query(query, {'page_id': page.id,
+                            'title': page.title,
+                            'content': page.content,
+                            'url': page.url,
+                            'source': page.source,
+                            'last_edited_time': page.last_edited_time,
+                            'embedding_model': embedding_model})
 
         # Remove existing chunks
         self.remove_page_chunks(page.id)
@@ -211,7 +259,24 @@ class Neo4jManager:
             "WHERE p.id = $page_id "
             "DELETE r, c"
         )
-        self.graph.query(query, {'page_id': page_id})
+        self._query(query, {'page_id': page_id})
+
+    def remove_pages(self, page_ids: list[str]):
+        """Delete the pages with their chunks and relations."""
+        query = (
+            "MATCH (p) WHERE (p:Page OR p:Database OR p:Bookmark) AND p.id IN $page_ids "
+            f"OPTIONAL MATCH (p)-[:{RelationType.HAS_CHUNK.value}]->(c:{PageType.CHUNK.value}) "
+            "DETACH DELETE p, c"
+        )
+        self._query(query, {'page_ids': page_ids})
+
+    def remove_outgoing_relations(self, page_ids: list[str]):
+        """Delete relations from the pages to other pages, keeping their chunks."""
+        query = (
+            "MATCH (p)-[r]->(e) WHERE p.id IN $page_ids AND (e:Page OR e:Database OR e:Bookmark) "
+            "DELETE r"
+        )
+        self._query(query, {'page_ids': page_ids})
 
     def create_chunk_nodes(self, page_id: str, chunks: list[Chunk]):
         for i, chunk in enumerate(chunks):
@@ -220,10 +285,11 @@ class Neo4jManager:
                 f"CREATE (c:{PageType.CHUNK.value} {{content: $content, embedding: $embedding, sequence: $sequence}}) "
                 f"CREATE (p)-[:{RelationType.HAS_CHUNK.value}]->(c)"
             )
-            self.graph.query(query, {
+            self._query(query, {
                 'page_id': page_id,
                 'content': chunk.content,
-                'embedding': chunk.embedding,
+                # Embeddings of cached chunks may be zero-copy memoryviews (see binary_codec.loads)
+                'embedding': chunk.embedding.tolist() if isinstance(chunk.embedding, memoryview) else chunk.embedding,
                 'sequence': i
             })
 
@@ -233,16 +299,16 @@ class Neo4jManager:
             "MATCH (e2) WHERE (e2:Page OR e2:Database OR e2:Bookmark) AND e2.id = $entity_id_2 "
             f"MERGE (e1)-[:{relation.relation_type.value} {{context: $context}}]->(e2)"
         )
-        self.graph.query(query, {'entity_id_1': relation.from_page_id,
-                                 'entity_id_2': relation.to_page_id,
-                                 'context': relation.context if relation.context else ''})
+        self._query(query, {'entity_id_1': relation.from_page_id,
+                            'entity_id_2': relation.to_page_id,
+                            'context': relation.context if relation.context else ''})
 
     def get_entities_for_page(self, page_id):
         query = (
             "MATCH (p:Page {id: $page_id})-[:MENTIONS]->(e) "
             "RETURN labels(e) AS entity_type, e.name AS entity_name"
         )
-        result = self.graph.query(query, {'page_id': page_id})
+        result = self._query(query, {'page_id': page_id})
         return [{'type': row['entity_type'][0], 'name': row['entity_name']} for row in result]
 
     def get_related_pages(self, entity_type, entity_name, limit=5):
@@ -251,7 +317,7 @@ class Neo4jManager:
             "RETURN p.id AS page_id, p.title AS page_title "
             "LIMIT $limit"
         )
-        result = self.graph.query(query, {'entity_name': entity_name, 'limit': limit})
+        result = self._query(query, {'entity_name': entity_name, 'limit': limit})
         return [{'id': row['page_id'], 'title': row['page_title']} for row in result]
 
     def get_entity_relationships(self, entity_type, entity_name):
@@ -263,6 +329,6 @@ class Neo4jManager:
             "ORDER BY strength DESC "
             "LIMIT 10"
         )
-        result = self.graph.query(query, {'entity_name': entity_name})
+        result = self._query(query, {'entity_name': entity_name})
         return [{'type': row['related_type'][0], 'name': row['related_name'], 'strength': row['strength']} for row in
                 result]
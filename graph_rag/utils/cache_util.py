@@ -1,16 +1,23 @@
+import hashlib
 import importlib
 import json
 import os
+import sqlite3
 import time
+from contextlib import closing
 from datetime import timedelta
 from typing import Any, Type
 
 from graph_rag.config import Config
 from graph_rag.data_model import Cacheable
-from graph_rag.data_model import GraphPage, GraphRelation
+from graph_rag.data_model import GraphPage, GraphRelation, SyncState, PageFingerprints
+from graph_rag.data_model import binary_codec
 
 config = Config()
 
+# SQLite database (in the cache dir) of caches stored as individual records, e.g. one per page
+RECORDS_DB_FILE_NAME = 'cache_records.sqlite'
+
 
 def get_all_cacheable_classes():
     cacheable_classes = {}
@@ -27,8 +34,13 @@ CACHEABLE_CLASSES = get_all_cacheable_classes()
 
 
 def save_cache(file_path: str, data: dict[str, Any]):
-    with open(file_path, 'w') as f:
+    # Write to a temporary file and atomically swap it in, so a crash mid-write never corrupts the existing cache
+    tmp_file_path = f"{file_path}.tmp"
+    with open(tmp_file_path, 'w') as f:
         json.dump(data, f, default=custom_serializer)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file_path, file_path)
 
 
 def load_cache(file_path: str) -> dict[str, Any]:
@@ -78,7 +90,7 @@ def save_model_cache(file_name: str, model_data: Any, model_class: Type[Cacheabl
     save_cache(file_path, cache_data)
 
 
-def load_model_cache(file_name: str, model_class: Type[Cacheable], key: str) -> Any:
+def load_model_cache(file_name: str, model_class: Type[Cacheable], key: str, check_ttl: bool = True) -> Any:
     file_path = os.path.join(config.DATA_DIR, config.CACHE_PATH, file_name)
     cache_data = load_cache(file_path)
 
@@ -88,33 +100,176 @@ def load_model_cache(file_name: str, model_class: Type[Cacheable], key: str) ->
     cache_entry = cache_data[key]
     model_class.check_version(cache_entry['version'])
 
-    if config.CACHE_TTL_SECONDS and (time.time() - cache_entry['save_time']) > timedelta(
+    if check_ttl and config.CACHE_TTL_SECONDS and (time.time() - cache_entry['save_time']) > timedelta(
             seconds=config.CACHE_TTL_SECONDS).total_seconds():
         raise ValueError("Cache expired")
 
     return cache_entry['data']
 
 
+def _connect_records_db() -> sqlite3.Connection:
+    cache_path = os.path.join(config.DATA_DIR, config.CACHE_PATH)
+    os.makedirs(cache_path, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(cache_path, RECORDS_DB_FILE_NAME))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                 "file_name TEXT NOT NULL, "
+                 "key TEXT NOT NULL, "
+                 "version INTEGER NOT NULL, "
+                 "save_time REAL NOT NULL, "
+                 "PRIMARY KEY (file_name, key)) WITHOUT ROWID")
+    conn.execute("CREATE TABLE IF NOT EXISTS records ("
+                 "file_name TEXT NOT NULL, "
+                 "key TEXT NOT NULL, "
+                 "record_id TEXT NOT NULL, "
+                 "hash BLOB NOT NULL, "
+                 "data BLOB NOT NULL, "
+                 "PRIMARY KEY (file_name, key, record_id)) WITHOUT ROWID")
+    return conn
+
+
+def save_model_records(file_name: str, records: dict[str, Any], model_class: Type[Cacheable], key: str,
+                       replace: bool = True):
+    """
+    Save records of the cache entry in one transaction. Only records that changed since they were saved are written,
+    with replace=True records that aren't in the given ones are deleted, otherwise they're kept.
+    Records that are models of the model class are stored binary encoded, others as JSON.
+    """
+    serialized = {record_id: _serialize_record(record, model_class) for record_id, record in records.items()}
+    hashes = {record_id: hashlib.blake2b(data, digest_size=16).digest() for record_id, data in serialized.items()}
+    with closing(_connect_records_db()) as conn, conn:
+        saved_hashes = dict(conn.execute("SELECT record_id, hash FROM records WHERE file_name = ? AND key = ?",
+                                         (file_name, key)))
+        conn.executemany("INSERT OR REPLACE INTO records (file_name, key, record_id, hash, data) VALUES (?, ?, ?, ?, ?)",
+                         [(file_name, key, record_id, hashes[record_id], data) for record_id, data in serialized.items()
+                          if saved_hashes.get(record_id) != hashes[record_id]])
+        if replace:
+            conn.executemany("DELETE FROM records WHERE file_name = ? AND key = ? AND record_id = ?",
+                             [(file_name, key, record_id) for record_id in saved_hashes if record_id not in serialized])
+        conn.execute("INSERT OR REPLACE INTO entries (file_name, key, version, save_time) VALUES (?, ?, ?, ?)",
+                     (file_name, key, model_class.get_class_version(), time.time()))
+
+
+def delete_model_records(file_name: str, record_ids: list[str], key: str):
+    with closing(_connect_records_db()) as conn, conn:
+        conn.executemany("DELETE FROM records WHERE file_name = ? AND key = ? AND record_id = ?",
+                         [(file_name, key, record_id) for record_id in record_ids])
+
+
+def load_model_records(file_name: str, model_class: Type[Cacheable], key: str, check_ttl: bool = True,
+                       record_ids: list[str] | None = None, zero_copy: bool = False) -> dict[str, Any]:
+    """
+    Records of the cache entry, or only the given ones of them (those that are found).
+    With zero_copy, embeddings of binary encoded models are views of the stored rows (see binary_codec.loads).
+    """
+    with closing(_connect_records_db()) as conn:
+        entry = conn.execute("SELECT version, save_time FROM entries WHERE file_name = ? AND key = ?",
+                             (file_name, key)).fetchone()
+        if entry is None:
+            raise KeyError(f"No cache entry found for key: {key}")
+        version, save_time = entry
+        model_class.check_version(version)
+        if check_ttl and config.CACHE_TTL_SECONDS and (time.time() - save_time) > timedelta(
+                seconds=config.CACHE_TTL_SECONDS).total_seconds():
+            raise ValueError("Cache expired")
+
+        if record_ids is None:
+            rows = conn.execute("SELECT record_id, data FROM records WHERE file_name = ? AND key = ?",
+                                (file_name, key)).fetchall()
+        else:
+            rows = [row for record_id in record_ids for row in conn.execute(
+                "SELECT record_id, data FROM records WHERE file_name = ? AND key = ? AND record_id = ?",
+                (file_name, key, record_id))]
+    return {record_id: _deserialize_record(data, model_class, zero_copy) for record_id, data in rows}
+
+
+def _serialize_record(record: Any, model_class: Type[Cacheable]) -> bytes:
+    if isinstance(record, model_class):
+        return binary_codec.dumps(record)
+    return json.dumps(record, default=custom_serializer).encode()
+
+
+def _deserialize_record(data: bytes | str, model_class: Type[Cacheable], zero_copy: bool = False) -> Any:
+    if isinstance(data, bytes) and data.startswith(binary_codec.MAGIC):
+        return binary_codec.loads(data, model_class, zero_copy)
+    # Records saved as JSON text
+    return json.loads(data, object_hook=custom_deserializer)
+
+
 def save_prepared_pages_to_cache(root_page_id: str, prepared_pages: dict[str, GraphPage],
-                                 file_name: str = 'prepared_pages.json'):
-    save_model_cache(file_name,
-                     {page_id: page.to_dict() for page_id, page in prepared_pages.items()}, GraphPage,
-                     root_page_id)
+                                 file_name: str = 'prepared_pages.json', replace: bool = True):
+    """Save the pages as one binary encoded record each, only pages that changed since they were saved are written."""
+    save_model_records(file_name, prepared_pages, GraphPage, root_page_id, replace)
 
 
-def load_prepared_pages_from_cache(root_page_id: str, file_name: str = 'prepared_pages.json') -> dict[str, GraphPage]:
-    prepared_pages_cache = load_model_cache(file_name, GraphPage, root_page_id)
-    return {page_id: GraphPage.from_dict(page_data) for page_id, page_data
+def load_prepared_pages_from_cache(root_page_id: str, file_name: str = 'prepared_pages.json', check_ttl: bool = True,
+                                   page_ids: list[str] | None = None, zero_copy: bool = False) -> dict[str, GraphPage]:
+    try:
+        prepared_pages_cache = load_model_records(file_name, GraphPage, root_page_id, check_ttl, page_ids, zero_copy)
+    except KeyError:
+        # Pages cached as a whole JSON file before they were stored as records
+        prepared_pages_cache = load_model_cache(file_name, GraphPage, root_page_id, check_ttl)
+        if page_ids is not None:
+            prepared_pages_cache = {page_id: prepared_pages_cache[page_id] for page_id in page_ids
+                                    if page_id in prepared_pages_cache}
+    return {page_id: page if isinstance(page, GraphPage) else GraphPage.from_dict(page) for page_id, page
             in prepared_pages_cache.items()}
 
 
+def remove_prepared_pages_from_cache(root_page_id: str, page_ids: list[str], file_name: str = 'prepared_pages.json'):
+    delete_model_records(file_name, page_ids, root_page_id)
+
+
 def save_page_relations_to_cache(root_page_id: str, page_relations: list[GraphRelation],
                                  file_name: str = 'page_relations.json'):
     save_model_cache(file_name,
                      [relation.to_dict() for relation in page_relations], GraphRelation, root_page_id)
 
 
-def load_page_relations_from_cache(root_page_id: str, file_name: str = 'page_relations.json') -> list[GraphRelation]:
-    page_relations_cache = load_model_cache(file_name, GraphRelation, root_page_id)
+def load_page_relations_from_cache(root_page_id: str, file_name: str = 'page_relations.json',
+                                   check_ttl: bool = True) -> list[GraphRelation]:
+    page_relations_cache = load_model_cache(file_name, GraphRelation, root_page_id, check_ttl)
     return [GraphRelation.from_dict(relation_data) for relation_data
             in page_relations_cache]
+
+
+def save_sync_state_to_cache(root_page_id: str, sync_state: SyncState, file_name: str = 'sync_state.json'):
+    save_model_cache(file_name, sync_state.to_dict(), SyncState, root_page_id)
+
+
+def load_sync_state_from_cache(root_page_id: str, file_name: str = 'sync_state.json') -> SyncState:
+    return SyncState.from_dict(load_model_cache(file_name, SyncState, root_page_id, check_ttl=False))
+
+
+def save_page_fingerprints_to_cache(root_page_id: str, fingerprints: PageFingerprints,
+                                    file_name: str = 'page_fingerprints.json'):
+    save_model_cache(file_name, fingerprints.to_dict(), PageFingerprints, root_page_id)
+
+
+def load_page_fingerprints_from_cache(root_page_id: str, file_name: str = 'page_fingerprints.json') -> PageFingerprints:
+    return PageFingerprints.from_dict(load_model_cache(file_name, PageFingerprints, root_page_id, check_ttl=False))
+
+
+def _get_crawl_checkpoint_path(root_page_id: str) -> str:
+    return os.path.join(config.DATA_DIR, config.CACHE_PATH, f"crawl_checkpoint_{root_page_id or 'workspace'}.json")
+
+
+def save_crawl_checkpoint(root_page_id: str, checkpoint: dict[str, Any]):
+    file_path = _get_crawl_checkpoint_path(root_page_id)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    save_cache(file_path, checkpoint)
+
+
+def load_crawl_checkpoint(root_page_id: str) -> dict[str, Any] | None:
+    try:
+        return load_cache(_get_crawl_checkpoint_path(root_page_id))
+    except FileNotFoundError:
+        return None
+
+
+def remove_crawl_checkpoint(root_page_id: str):
+    try:
+        os.remove(_get_crawl_checkpoint_path(root_page_id))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# Max number of parameters per SQLite query (the default SQLITE_MAX_VARIABLE_NUMBER of older versions is 999)
+_QUERY_BATCH_SIZE = 900
+
+
+class EmbeddingStore:
+    """
+    Persistent embeddings of texts, keyed by model, dimensions and hash of the text, so the same text is never
+    embedded twice. Vectors are appended as packed float32 records to one file per model and dimensions and read
+    through mmap, a SQLite index maps text hashes to record numbers.
+    """
+
+    def __init__(self, directory: str, model: str, dimensions: int):
+        self.model = model
+        self.dimensions = dimensions
+        self.record_size = dimensions * array('f').itemsize
+        os.makedirs(directory, exist_ok=True)
+        safe_model = re.sub(r'[^\w.-]', '_', model)
+        self.vectors_path = os.path.join(directory, f"embeddings_{safe_model}_{dimensions}.f32")
+        self._lock = threading.Lock()
+        self._mmap: mmap.mmap | None = None
+        self._conn = sqlite3.connect(os.path.join(directory, 'embeddings_index.sqlite'), check_same_thread=False,
+                                     isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings ("
+                               "model TEXT NOT NULL, "
+                               "dimensions INTEGER NOT NULL, "
+                               "text_hash BLOB NOT NULL, "
+                               "record INTEGER NOT NULL, "
+                               "PRIMARY KEY (model, dimensions, text_hash)) WITHOUT ROWID")
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def get_many(self, texts: list[str]) -> list[list[float] | None]:
+        """Stored embeddings of the texts, None for texts that were never stored."""
+        hashes = [self.text_hash(text) for text in texts]
+        with self._lock:
+            records = self._find_records(hashes)
+            vectors = self._get_vectors()
+            embeddings = []
+            for text_hash in hashes:
+                record = records.get(text_hash)
+                offset = record * self.record_size if record is not None else None
+                if offset is None or vectors is None or offset + self.record_size > len(vectors):
+                    embeddings.append(None)
+                    continue
+                vector = array('f')
+                vector.frombytes(vectors[offset:offset + self.record_size])
+                embeddings.append(vector.tolist())
+            return embeddings
+
+    def put_many(self, texts: list[str], embeddings: list[list[float]]):
+        """Store embeddings of the texts, texts that are already stored are skipped."""
+        new_vectors: dict[bytes, list[float]] = {}
+        for text, embedding in zip(texts, embeddings):
+            if len(embedding) != self.dimensions:
+                logger.warning(f"Embedding has {len(embedding)} dimensions instead of {self.dimensions}, "
+                               f"it won't be stored")
+                continue
+            new_vectors[self.text_hash(text)] = embedding
+        with self._lock:
+            for text_hash in self._find_records(list(new_vectors)):
+                del new_vectors[text_hash]
+            if not new_vectors:
+                return
+            # Vectors are written before the index, so the index never points past the end of the vectors file
+            with open(self.vectors_path, 'ab') as f:
+                first_record, partial_record_size = divmod(f.tell(), self.record_size)
+                if partial_record_size:
+                    # Leftover of an interrupted write, it isn't in the index
+                    f.truncate(first_record * self.record_size)
+                    f.seek(0, os.SEEK_END)
+                packed = array('f')
+                for embedding in new_vectors.values():
+                    packed.extend(embedding)
+                f.write(packed.tobytes())
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO embeddings (model, dimensions, text_hash, record) "
+                                   "VALUES (?, ?, ?, ?)",
+                                   [(self.model, self.dimensions, text_hash, first_record + i)
+                                    for i, text_hash in enumerate(new_vectors)])
+            self._conn.execute("COMMIT")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ? AND dimensions = ?",
+                                      (self.model, self.dimensions)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._conn.close()
+
+    def _find_records(self, hashes: list[bytes]) -> dict[bytes, int]:
+        records = {}
+        for start in range(0, len(hashes), _QUERY_BATCH_SIZE):
+            batch = hashes[start:start + _QUERY_BATCH_SIZE]
+            rows = self._conn.execute(f"SELECT text_hash, record FROM embeddings WHERE model = ? AND dimensions = ? "
+                                      f"AND text_hash IN ({','.join('?' * len(batch))})",
+                                      (self.model, self.dimensions, *batch)).fetchall()
+            records.update(rows)
+        return records
+
+    def _get_vectors(self) -> mmap.mmap | None:
+        """Memory map of the vectors file, re-mapped when the file has grown since it was mapped."""
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if size == 0:
+            return None
+        if self._mmap is None or len(self._mmap) < size:
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self.vectors_path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
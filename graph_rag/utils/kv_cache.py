@@ -0,0 +1,171 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteCache:
+    """
+    Key-value cache stored in a single SQLite file in WAL mode.
+    Entries can expire after a TTL. When the total size of stored values exceeds max_size_bytes,
+    least recently used entries are evicted.
+    """
+    # After eviction the cache is shrunk to this fraction of max_size_bytes, so it doesn't evict on every write
+    EVICTION_TARGET_RATIO = 0.9
+
+    def __init__(self, file_path: str, max_size_bytes: int = 0):
+        self.file_path = file_path
+        self.max_size_bytes = max_size_bytes
+        dir_name = os.path.dirname(file_path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cache ("
+                               "key TEXT PRIMARY KEY, "
+                               "value BLOB NOT NULL, "
+                               "size INTEGER NOT NULL, "
+                               "created_at REAL NOT NULL, "
+                               "expires_at REAL, "
+                               "accessed_at REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+            self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, size, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._total_size -= size
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: float = None):
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value, size, created_at, expires_at, accessed_at) "
+                               "VALUES (?, ?, ?, ?, ?, ?)", (key, value, len(value), now, expires_at, now))
+            self._total_size += len(value) - (row[0] if row else 0)
+            if self.max_size_bytes and self._total_size > self.max_size_bytes:
+                self._evict(int(self.max_size_bytes * self.EVICTION_TARGET_RATIO))
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._total_size -= row[0]
+
+    def vacuum_expired(self, compact: bool = False) -> int:
+        """Remove all expired entries at once. Returns the number of removed entries."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+            if compact:
+                self._conn.execute("VACUUM")
+        if removed:
+            logger.info(f"Removed {removed} expired entries from {self.file_path}")
+        return removed
+
+    def _evict(self, target_size: int):
+        evicted = 0
+        while self._total_size > target_size:
+            rows = self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                break
+            to_delete = []
+            for key, size in rows:
+                if self._total_size <= target_size:
+                    break
+                to_delete.append((key,))
+                self._total_size -= size
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", to_delete)
+            evicted += len(to_delete)
+        logger.debug(f"Evicted {evicted} least recently used entries from {self.file_path}")
+
+    @property
+    def total_size(self) -> int:
+        return self._total_size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LRUMemoryCache:
+    """
+    Thread-safe in-memory cache bounded by the total size of its values in bytes (as reported by callers).
+    Least recently used entries are evicted first. Keeps hit, miss and eviction counters.
+    """
+
+    def __init__(self, max_size_bytes: int):
+        self.max_size_bytes = max_size_bytes
+        self._entries: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, max_age_seconds: float = None) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if max_age_seconds and time.time() - stored_at >= max_age_seconds:
+                del self._entries[key]
+                self._total_size -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, size: int):
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry:
+                self._total_size -= old_entry[1]
+            if size > self.max_size_bytes:
+                return
+            self._entries[key] = (value, size, time.time())
+            self._total_size += size
+            while self._total_size > self.max_size_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._total_size -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self._total_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -18,8 +18,8 @@ class LoggingProgressBar:
         self._stop_event = Event()
         self._progress_thread = None
 
-    def update(self):
-        self.iteration += 1
+    def update(self, count: int = 1):
+        self.iteration += count
         self._print_progress_bar()
 
     def start(self):
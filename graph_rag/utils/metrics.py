@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Iterator
+
+from graph_rag.utils.rate_scheduler import rate_schedulers
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = 'graph_rag'
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    seconds: float = 0.0
+
+    def add(self, other: 'CallStats', sign: int = 1):
+        self.calls += sign * other.calls
+        self.errors += sign * other.errors
+        self.bytes_sent += sign * other.bytes_sent
+        self.bytes_received += sign * other.bytes_received
+        self.seconds += sign * other.seconds
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    kind: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    items_in: int = 0
+    items_out: int = 0
+    # External calls made while the stage was running, stages running concurrently see each other's calls
+    calls: dict[str, CallStats] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        items = max(self.items_in, self.items_out)
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'items_per_second': round(items / self.wall_seconds, 2) if self.wall_seconds else None,
+            'calls': {service: asdict(stats) for service, stats in self.calls.items()},
+        }
+
+
+class PipelineMetrics:
+    """
+    Collects wall and CPU time and item counts of pipeline stages (data sources and processors), and the number,
+    duration and size of external calls (Notion, OpenAI, Neo4j, web) made during a pipeline run.
+    CPU time is the process CPU time, so it includes work of other threads running at the same time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._start_wall = time.perf_counter()
+            self._start_cpu = time.process_time()
+            self.stages: dict[str, StageMetrics] = {}
+            self.calls: dict[str, CallStats] = {}
+
+    def stage(self, name: str, kind: str) -> StageMetrics:
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = StageMetrics(name, kind)
+            return self.stages[name]
+
+    @contextmanager
+    def measure(self, name: str, kind: str, items_in: int = 0) -> Iterator[StageMetrics]:
+        """Add time and external calls spent in the block to the stage, the block can set items_out of it."""
+        stage = self.stage(name, kind)
+        calls_before = self._snapshot_calls()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+            with self._lock:
+                stage.wall_seconds += wall
+                stage.cpu_seconds += cpu
+                stage.items_in += items_in
+                for service, stats in self.calls.items():
+                    delta = CallStats()
+                    delta.add(stats)
+                    delta.add(calls_before.get(service, CallStats()), sign=-1)
+                    if delta.calls:
+                        stage.calls.setdefault(service, CallStats()).add(delta)
+
+    def record_call(self, service: str, bytes_sent: int = 0, bytes_received: int = 0, seconds: float = 0.0,
+                    error: bool = False):
+        with self._lock:
+            stats = self.calls.setdefault(service, CallStats())
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.seconds += seconds
+
+    def httpx_event_hooks(self, service: str) -> dict:
+        """Event hooks recording calls of an httpx client (e.g. the one used by the OpenAI client)."""
+        def on_request(request):
+            request.extensions['metrics_start'] = time.perf_counter()
+
+        def on_response(response):
+            response.read()
+            start = response.request.extensions.get('metrics_start', time.perf_counter())
+            # Bytes on the wire (possibly compressed), responses not read from the network report their content size
+            bytes_received = response.num_bytes_downloaded or len(response.content)
+            self.record_call(service, bytes_sent=len(response.request.content), bytes_received=bytes_received,
+                             seconds=time.perf_counter() - start,
+                             error=response.status_code >= 400)
+
+        return {'request': [on_request], 'response': [on_response]}
+
+    def report(self, error: BaseException | None = None) -> dict:
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(),
+                'finished_at': datetime.now(timezone.utc).isoformat(),
+                'succeeded': error is None,
+                'error': str(error) if error is not None else None,
+                'wall_seconds': round(time.perf_counter() - self._start_wall, 3),
+                'cpu_seconds': round(time.process_time() - self._start_cpu, 3),
+                'stages': [stage.to_dict() for stage in self.stages.values()],
+                'calls': {service: asdict(stats) for service, stats in self.calls.items()},
+                # Throughput of API schedulers since the process started
+                'rate_schedulers': {name: scheduler.stats() for name, scheduler in rate_schedulers.items()},
+            }
+
+    def write_report(self, file_path: str, error: BaseException | None = None) -> dict:
+        report = self.report(error)
+        _write_atomically(file_path, json.dumps(report, indent=2))
+        logger.info(f"Pipeline run report saved to {file_path}")
+        return report
+
+    def write_prometheus_textfile(self, file_path: str, error: BaseException | None = None):
+        """Write the run metrics in Prometheus text format, for the node exporter textfile collector."""
+        report = self.report(error)
+        lines = []
+
+        def add_metric(name: str, help_text: str, samples: list[tuple[dict, float]]):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{PROMETHEUS_PREFIX}_{name} {value}")
+
+        add_metric('run_success', "Whether the last pipeline run succeeded", [({}, int(report['succeeded']))])
+        add_metric('run_finished_timestamp_seconds', "When the last pipeline run finished",
+                   [({}, round(time.time(), 3))])
+        add_metric('run_wall_seconds', "Wall time of the last pipeline run", [({}, report['wall_seconds'])])
+        add_metric('run_cpu_seconds', "CPU time of the last pipeline run", [({}, report['cpu_seconds'])])
+        for key, help_text in [('wall_seconds', "Wall time spent in the stage"),
+                               ('cpu_seconds', "Process CPU time spent while the stage was running"),
+                               ('items_in', "Items received by the stage"),
+                               ('items_out', "Items produced by the stage"),
+                               ('items_per_second', "Stage throughput")]:
+            add_metric(f"stage_{key}", help_text, [({'stage': stage['name'], 'kind': stage['kind']}, stage[key])
+                                                  for stage in report['stages'] if stage[key] is not None])
+        for key, help_text in [('calls', "External calls"), ('errors', "Failed external calls"),
+                               ('bytes_sent', "Bytes sent to the external service"),
+                               ('bytes_received', "Bytes received from the external service"),
+                               ('seconds', "Time spent waiting for the external service")]:
+            add_metric(f"external_{key}", help_text, [({'service': service}, round(stats[key], 3))
+                                                     for service, stats in report['calls'].items()])
+        for key, help_text in [('requests_per_minute', "Requests per minute made through the rate scheduler"),
+                               ('tokens_per_minute', "Tokens per minute sent through the rate scheduler"),
+                               ('throttled', "Rate limited (429) responses"),
+                               ('concurrency', "Concurrent requests currently allowed by the rate scheduler")]:
+            add_metric(f"rate_scheduler_{key}", help_text, [({'scheduler': name}, stats[key])
+                                                           for name, stats in report['rate_schedulers'].items()])
+        _write_atomically(file_path, '\n'.join(lines) + '\n')
+
+    def _snapshot_calls(self) -> dict[str, CallStats]:
+        with self._lock:
+            return {service: CallStats(**asdict(stats)) for service, stats in self.calls.items()}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomically(file_path: str, content: str):
+    # Readers (e.g. the textfile collector) must never see a partially written file
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+
+
+run_metrics = PipelineMetrics()
@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from graph_rag.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Waiting requests of a lower priority are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKFILL = 10
+
+# Rough number of request body characters per token, for requests whose token count isn't known up front
+CHARS_PER_TOKEN = 4
+
+# Longest a waiting request sleeps before checking the budgets again
+MAX_WAIT_SECONDS = 1.0
+
+DURATION_PART_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNIT_SECONDS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_reset_duration(value: str | None) -> float | None:
+    """Seconds of an x-ratelimit-reset-* header value like 1s, 6m0s or 20ms."""
+    if not value:
+        return None
+    parts = DURATION_PART_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+class _Budget:
+    """Per-minute budget refilled continuously, like a token bucket holding at most a minute of the limit."""
+
+    def __init__(self, per_minute: float):
+        self.limit = per_minute
+        self.available = per_minute
+        self._updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.available = min(self.limit, self.available + (now - self._updated_at) * self.limit / 60)
+        self._updated_at = now
+
+    def seconds_until(self, amount: float) -> float:
+        return max(0.0, (min(amount, self.limit) - self.available) * 60 / self.limit)
+
+
+class RateScheduler:
+    """
+    Shares per-minute request and token budgets of an API and an adaptive number of concurrent requests between all
+    its callers. Waiting requests are served by priority, then in arrival order. Budgets are corrected from
+    x-ratelimit-* response headers, concurrency is halved on a 429 and grows by one after as many successful
+    responses as there are concurrent requests (AIMD).
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float, max_concurrency: int,
+                 min_concurrency: int = 1):
+        if requests_per_minute <= 0 or tokens_per_minute <= 0:
+            raise ValueError(f"Rate limits must be positive, got {requests_per_minute} requests and "
+                             f"{tokens_per_minute} tokens per minute")
+        self.name = name
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.concurrency = self.max_concurrency
+        self._requests = _Budget(requests_per_minute)
+        self._tokens = _Budget(tokens_per_minute)
+        self._condition = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._arrivals = itertools.count()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._successes = 0
+        self._started_at = time.monotonic()
+        self._stats = {'requests': 0, 'tokens': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    @contextmanager
+    def slot(self, tokens: int = 0, priority: int = PRIORITY_BACKFILL):
+        """Wait until a request of the given number of tokens fits into the budgets and concurrency, and make it."""
+        self._acquire(tokens, priority)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def on_response(self, status_code: int, headers: httpx.Headers | dict):
+        """Adjust budgets and concurrency to a response of the API."""
+        with self._condition:
+            now = time.monotonic()
+            for budget, kind in [(self._requests, 'requests'), (self._tokens, 'tokens')]:
+                budget.refill(now)
+                limit, remaining = headers.get(f'x-ratelimit-limit-{kind}'), headers.get(f'x-ratelimit-remaining-{kind}')
+                if limit and float(limit) > 0:
+                    budget.limit = float(limit)
+                if remaining:
+                    budget.available = min(budget.available, float(remaining))
+
+            if status_code == 429:
+                self._stats['throttled'] += 1
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+                self._successes = 0
+                delay = _retry_after(headers)
+                self._blocked_until = max(self._blocked_until, now + delay)
+                logger.info(f"{self.name} rate limited, pausing for {delay:.2f}s with concurrency {self.concurrency}")
+            elif status_code < 400:
+                self._successes += 1
+                if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+    def httpx_transport(self, priority: int = PRIORITY_BACKFILL,
+                        transport: httpx.BaseTransport | None = None) -> httpx.BaseTransport:
+        """Transport of an httpx client (e.g. the one of an OpenAI client) scheduling its requests."""
+        return SchedulingTransport(self, priority, transport or httpx.HTTPTransport())
+
+    def stats(self) -> dict:
+        with self._condition:
+            minutes = max(time.monotonic() - self._started_at, 1e-9) / 60
+            return {
+                **self._stats,
+                'wait_seconds': round(self._stats['wait_seconds'], 3),
+                'requests_per_minute': round(self._stats['requests'] / minutes, 2),
+                'tokens_per_minute': round(self._stats['tokens'] / minutes, 2),
+                'request_limit_per_minute': self._requests.limit,
+                'token_limit_per_minute': self._tokens.limit,
+                'concurrency': self.concurrency,
+                'in_flight': self._in_flight,
+                'waiting': len(self._waiting),
+            }
+
+    def _acquire(self, tokens: int, priority: int):
+        entry = (priority, next(self._arrivals))
+        start = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                timeout = None
+                if self._waiting[0] == entry and self._in_flight < self.concurrency:
+                    timeout = max(self._blocked_until - now, self._requests.seconds_until(1),
+                                  self._tokens.seconds_until(tokens))
+                    if timeout <= 0:
+                        break
+                self._condition.wait(min(timeout, MAX_WAIT_SECONDS) if timeout is not None else MAX_WAIT_SECONDS)
+            heapq.heappop(self._waiting)
+            self._requests.available -= 1
+            self._tokens.available -= tokens
+            self._in_flight += 1
+            self._stats['requests'] += 1
+            self._stats['tokens'] += tokens
+            self._stats['wait_seconds'] += time.monotonic() - start
+            # The next waiting request may fit as well
+            self._condition.notify_all()
+
+
+class SchedulingTransport(httpx.BaseTransport):
+    def __init__(self, scheduler: RateScheduler, priority: int, transport: httpx.BaseTransport):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self.scheduler.slot(len(request.content) // CHARS_PER_TOKEN, self.priority):
+            response = self.transport.handle_request(request)
+        self.scheduler.on_response(response.status_code, response.headers)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+def _retry_after(headers: httpx.Headers | dict) -> float:
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    resets = [parse_reset_duration(headers.get(f'x-ratelimit-reset-{kind}')) for kind in ['requests', 'tokens']]
+    return max((reset for reset in resets if reset is not None), default=1.0)
+
+
+# Schedulers by name (e.g. openai/<model>), shared by every client of the process calling the same API
+rate_schedulers: dict[str, RateScheduler] = {}
+_rate_schedulers_lock = threading.Lock()
+
+
+def get_rate_scheduler(name: str, config: Config) -> RateScheduler:
+    with _rate_schedulers_lock:
+        if name not in rate_schedulers:
+            rate_schedulers[name] = RateScheduler(name, config.RATE_SCHEDULER_REQUESTS_PER_MINUTE,
+                                                  config.RATE_SCHEDULER_TOKENS_PER_MINUTE,
+                                                  config.RATE_SCHEDULER_MAX_CONCURRENCY)
+        return rate_schedulers[name]
+
+
+def scheduled_http_client(name: str, config: Config, priority: int = PRIORITY_BACKFILL,
+                          event_hooks: dict | None = None) -> httpx.Client:
+    """httpx client whose requests go through the shared scheduler of the name."""
+    return httpx.Client(transport=get_rate_scheduler(name, config).httpx_transport(priority), event_hooks=event_hooks)
@@ -0,0 +1,33 @@
+import math
+
+from graph_rag.config import Config
+
+
+def truncate_embedding(embedding: list[float], dimensions: int) -> list[float]:
+    """
+    First dimensions of a Matryoshka embedding (e.g. OpenAI text-embedding-3), normalized again so that
+    cosine similarity stays a dot product.
+    """
+    truncated = embedding[:dimensions]
+    norm = math.sqrt(sum(value * value for value in truncated))
+    return [value / norm for value in truncated] if norm else truncated
+
+
+def embedding_model_id(config: Config) -> str:
+    """Backend and model the embeddings come from, embeddings of different ones aren't comparable."""
+    backend = config.EMBEDDINGS_BACKEND
+    if backend == 'local':
+        return f"local/{config.EMBEDDINGS_LOCAL_MODEL}"
+    if backend == 'hash':
+        return 'hash'
+    return f"{backend}/{config.EMBEDDINGS_MODEL}"
+
+
+def embedding_dimensions(config: Config) -> int:
+    """Dimensions of the embeddings that are stored and searched, after truncation."""
+    return int(config.EMBEDDINGS_TRUNCATE_DIMENSIONS or config.EMBEDDINGS_DIMENSIONS)
+
+
+def embedding_space_id(config: Config) -> str:
+    """Model and dimensions of the stored embeddings, embeddings of different ones can't be searched together."""
+    return f"{embedding_model_id(config)}/{embedding_dimensions(config)}"
@@ -1,3 +1,4 @@
+import argparse
 import logging
 import os
 
@@ -16,12 +17,17 @@ logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(mes
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Ingest the knowledge base into the graph database")
+    parser.add_argument('--resume', action='store_true',
+                        help="resume an interrupted Notion crawl from its last checkpoint")
+    args = parser.parse_args()
+
     # manager = Neo4jManager()
     # manager.clean_database()
     pipeline = DataProcessingPipeline()
 
     # Add data sources
-    pipeline.add_data_source(NotionProvider())
+    pipeline.add_data_source(NotionProvider(resume=args.resume))
 
     # Add processors
     pipeline.add_processor(ContentChunkerAndEmbedder())
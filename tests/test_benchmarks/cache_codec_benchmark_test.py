@@ -0,0 +1,16 @@
+import unittest
+
+from benchmarks.cache_codec_benchmark import generate_pages, run_benchmark
+
+
+class TestCacheCodecBenchmark(unittest.TestCase):
+
+    def test_report_compares_json_with_binary_codec(self):
+        results = {result['variant']: result for result in run_benchmark(generate_pages(5, 2, 64), repeats=1)}
+
+        self.assertEqual({'json', 'binary', 'binary_zero_copy'}, set(results))
+        self.assertLess(results['binary']['bytes'], results['json']['bytes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,16 @@
+import unittest
+
+from benchmarks.embedding_compression_benchmark import generate_embeddings, run_benchmark
+
+
+class TestEmbeddingCompressionBenchmark(unittest.TestCase):
+
+    def test_report_compares_truncated_embeddings_with_exact_search(self):
+        results = run_benchmark(generate_embeddings(200, 64), dimensions=[32, 16], k=5, queries=10)
+
+        self.assertEqual([64, 32, 16], [result['dimensions'] for result in results])
+        self.assertEqual(1.0, results[0]['recall_at_k'])
+        self.assertEqual([256, 128, 64], [result['bytes_per_vector'] for result in results])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from benchmarks.ingestion_benchmark import run_benchmark
+from benchmarks.notion_workspace import generate_workspace
+
+
+class TestIngestionBenchmark(unittest.TestCase):
+
+    def test_generated_workspace_is_reproducible(self):
+        first = generate_workspace(page_count=30, databases=1, items_per_database=3, seed=7)
+        second = generate_workspace(page_count=30, databases=1, items_per_database=3, seed=7)
+        self.assertEqual(first.objects, second.objects)
+        self.assertEqual(30 + 1 + 3, first.node_count)
+
+    def test_crawl_of_mock_workspace_finds_every_node(self):
+        report = run_benchmark(pages=20, blocks_per_page=12, databases=1, items_per_database=8,
+                               bookmarks_per_page=1, server_page_size=5, rate_limit_probability=0.05, seed=1)
+        self.assertEqual(report['expected_nodes'], report['nodes'])
+        self.assertEqual(report['rate_limited_responses'], report['retries'])
+        self.assertGreater(report['api_calls_per_page'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
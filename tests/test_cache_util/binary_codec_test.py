@@ -0,0 +1,50 @@
+import unittest
+from array import array
+
+from graph_rag.data_model import Chunk, GraphPage, PageType, binary_codec
+
+
+def make_page(page_id: str = 'page1') -> GraphPage:
+    return GraphPage(page_id, 'Page ✓', PageType.DATABASE, 'http://test.com', content=None,
+                     chunks=[Chunk('first', [0.5, -1.25, 3.0]), Chunk('second', [])])
+
+
+class TestBinaryCodec(unittest.TestCase):
+    def test_round_trip(self):
+        page = make_page()
+
+        loaded = binary_codec.loads(binary_codec.dumps(page), GraphPage)
+
+        self.assertEqual(page.to_dict(), loaded.to_dict())
+        self.assertIsInstance(loaded.chunks[0].embedding, list)
+
+    def test_zero_copy_embeddings_are_views_of_the_data(self):
+        data = binary_codec.dumps(make_page())
+
+        loaded = binary_codec.loads(data, GraphPage, zero_copy=True)
+
+        embedding = loaded.chunks[0].embedding
+        self.assertIsInstance(embedding, memoryview)
+        self.assertIs(data, embedding.obj)
+        self.assertEqual([0.5, -1.25, 3.0], embedding.tolist())
+        self.assertEqual(data, binary_codec.dumps(loaded))
+
+    def test_embeddings_are_aligned_float32_blocks(self):
+        data = binary_codec.dumps(make_page())
+        embedding = array('f', [0.5, -1.25, 3.0]).tobytes()
+
+        self.assertEqual(0, data.index(embedding) % 4)
+
+    def test_version_mismatch(self):
+        data = binary_codec.dumps(make_page())
+        encoded_version = b'version' + bytes([3]) + (1).to_bytes(8, 'little')
+        tampered = data[:data.rindex(encoded_version)] + b'version' + bytes([3]) + (2).to_bytes(8, 'little')
+
+        with self.assertRaises(ValueError):
+            binary_codec.loads(tampered, GraphPage)
+        with self.assertRaises(ValueError):
+            binary_codec.loads(b'{"id": "page1"}', GraphPage)
+
+
+if __name__ == '__main__':
+    unittest.main()
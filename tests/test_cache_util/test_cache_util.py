@@ -1,7 +1,10 @@
+import json
 import os
+import sqlite3
 import tempfile
 import time
 import unittest
+from contextlib import closing
 from dataclasses import dataclass
 from unittest.mock import patch
 
@@ -16,7 +19,7 @@ class MockConfig:
 with patch('graph_rag.config.Config', MockConfig):
     from graph_rag.utils import cache_util
     from graph_rag.data_model import Cacheable, RelationType
-    from graph_rag.data_model import GraphPage, GraphRelation, PageType
+    from graph_rag.data_model import Chunk, GraphPage, GraphRelation, PageType
 
 
 class TestCacheUtil(unittest.TestCase):
@@ -104,6 +107,61 @@ class TestCacheUtil(unittest.TestCase):
         for page_id, page in prepared_pages.items():
             self.assertEqual(page.to_dict(), loaded_pages[page_id].to_dict())
 
+    def test_prepared_pages_are_stored_as_records(self):
+        root_page_id = 'root_id'
+        pages = {page_id: GraphPage(page_id, f"Page {page_id}", PageType.PAGE, 'http://test.com')
+                 for page_id in ['page1', 'page2', 'page3']}
+        cache_util.save_prepared_pages_to_cache(root_page_id, pages)
+        pages['page2'].title = 'Renamed'
+        cache_util.save_prepared_pages_to_cache(root_page_id, {'page2': pages['page2']}, replace=False)
+
+        loaded_pages = cache_util.load_prepared_pages_from_cache(root_page_id, page_ids=['page2', 'missing'])
+        self.assertEqual(['page2'], list(loaded_pages))
+        self.assertEqual('Renamed', loaded_pages['page2'].title)
+
+        cache_util.remove_prepared_pages_from_cache(root_page_id, ['page1'])
+        self.assertEqual(['page2', 'page3'], sorted(cache_util.load_prepared_pages_from_cache(root_page_id)))
+        cache_util.save_prepared_pages_to_cache(root_page_id, {'page3': pages['page3']})
+        self.assertEqual(['page3'], list(cache_util.load_prepared_pages_from_cache(root_page_id)))
+
+    def test_unchanged_page_records_are_not_rewritten(self):
+        root_page_id = 'root_id'
+        pages = {page_id: GraphPage(page_id, f"Page {page_id}", PageType.PAGE, '') for page_id in ['page1', 'page2']}
+        cache_util.save_prepared_pages_to_cache(root_page_id, pages)
+        db_path = os.path.join(self.mock_config.DATA_DIR, self.mock_config.CACHE_PATH, cache_util.RECORDS_DB_FILE_NAME)
+        with closing(sqlite3.connect(db_path)) as conn, conn:
+            conn.execute("UPDATE records SET data = ? WHERE record_id = 'page1'",
+                         (json.dumps({**pages['page1'].to_dict(), 'title': 'Marker'}),))
+
+        pages['page2'].content = 'Edited'
+        cache_util.save_prepared_pages_to_cache(root_page_id, pages)
+
+        loaded_pages = cache_util.load_prepared_pages_from_cache(root_page_id)
+        self.assertEqual('Marker', loaded_pages['page1'].title)
+        self.assertEqual('Edited', loaded_pages['page2'].content)
+
+    def test_zero_copy_embeddings_are_views_of_the_records(self):
+        root_page_id = 'root_id'
+        page = GraphPage('page1', 'Page 1', PageType.PAGE, '', chunks=[Chunk('chunk', [0.5, -1.25, 3.0])])
+        cache_util.save_prepared_pages_to_cache(root_page_id, {'page1': page})
+
+        loaded_pages = cache_util.load_prepared_pages_from_cache(root_page_id, zero_copy=True)
+
+        embedding = loaded_pages['page1'].chunks[0].embedding
+        self.assertIsInstance(embedding, memoryview)
+        self.assertEqual([0.5, -1.25, 3.0], embedding.tolist())
+        # Saving the loaded pages again encodes the views to the same, so not rewritten, records
+        cache_util.save_prepared_pages_to_cache(root_page_id, loaded_pages)
+        self.assertEqual(page.to_dict(), cache_util.load_prepared_pages_from_cache(root_page_id)['page1'].to_dict())
+
+    def test_prepared_pages_are_loaded_from_legacy_json_cache(self):
+        root_page_id = 'root_id'
+        page = GraphPage('page1', 'Page 1', PageType.PAGE, 'http://test.com')
+        cache_util.save_model_cache('legacy_pages.json', {'page1': page.to_dict()}, GraphPage, root_page_id)
+
+        loaded_pages = cache_util.load_prepared_pages_from_cache(root_page_id, 'legacy_pages.json')
+        self.assertEqual(page.to_dict(), loaded_pages['page1'].to_dict())
+
     def test_save_and_load_page_relations(self):
         root_page_id = 'root_id'
         page_relations = [
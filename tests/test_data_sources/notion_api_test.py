@@ -0,0 +1,90 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from graph_rag.data_source.notion_api import NotionAPI, prune_notion_payload
+from graph_rag.data_source.to_markdown_parser import _extract_rich_text
+
+
+def _response(status_code, json_data=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = json_data
+    response.content = json.dumps(json_data).encode()
+    response.text = str(json_data)
+    return response
+
+
+class TestNotionAPI(unittest.TestCase):
+    def setUp(self):
+        self.api = NotionAPI()
+        self.api.config.NOTION_CACHE_PATH = None
+        self.api.session = MagicMock()
+        self.sleep = patch('graph_rag.data_source.notion_api.time.sleep').start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_rate_limited_request_honors_retry_after(self):
+        self.api.session.request.side_effect = [_response(429, headers={'Retry-After': '2'}),
+                                                _response(200, {'id': 'page'})]
+        with patch.object(self.api.rate_limiter, 'pause') as pause:
+            self.assertEqual({'id': 'page'}, self.api.get_page_metadata('page'))
+        pause.assert_called_once_with(2.0)
+        self.sleep.assert_called_once_with(2.0)
+        self.assertEqual({'calls': 2, 'retries': 1, 'errors': 1}, {k: v for k, v in self.api.get_stats()['pages'].items()
+                                                                 if k in ['calls', 'retries', 'errors']})
+
+    def test_timeouts_are_retried_with_backoff(self):
+        self.api.session.request.side_effect = [requests.Timeout(), _response(500), _response(200, {'id': 'db'})]
+        self.assertEqual({'id': 'db'}, self.api.get_database_metadata('db'))
+        self.assertEqual(2, self.sleep.call_count)
+        self.assertEqual(2, self.api.get_stats()['databases']['retries'])
+
+    def test_gives_up_after_max_retries(self):
+        self.api.max_retries = 2
+        self.api.session.request.return_value = _response(503)
+        with self.assertRaises(Exception):
+            self.api.get_page_metadata('page')
+        self.assertEqual(3, self.api.session.request.call_count)
+
+    def test_client_errors_are_not_retried(self):
+        self.api.session.request.return_value = _response(404)
+        with self.assertRaises(Exception):
+            self.api.get_page_metadata('missing')
+        self.assertEqual(1, self.api.session.request.call_count)
+        self.sleep.assert_not_called()
+
+    def test_default_arguments_share_cache_entry(self):
+        self.api.session.request.return_value = _response(200, {'results': [], 'has_more': False})
+        self.api.get_page_content_blocks('page')
+        self.api.get_page_content_blocks('page', start_cursor=None)
+        self.api.get_page_content_blocks(page_id='page', page_size=100)
+        self.assertEqual(1, self.api.session.request.call_count)
+        self.assertEqual(2, self.api.get_stats()['memory_cache']['hits'])
+
+    def test_prune_notion_payload(self):
+        plain = {'type': 'text', 'plain_text': 'plain', 'href': None, 'text': {'content': 'plain', 'link': None},
+                 'annotations': {'bold': False, 'italic': False, 'strikethrough': False, 'underline': False,
+                                 'code': False, 'color': 'default'}}
+        linked_bold = {'type': 'text', 'plain_text': 'bold', 'href': 'https://a.com',
+                       'text': {'content': 'bold', 'link': {'url': 'https://a.com'}},
+                       'annotations': {**plain['annotations'], 'bold': True}}
+        block = {'object': 'block', 'id': 'b', 'type': 'callout', 'has_children': False,
+                 'created_by': {'object': 'user', 'id': 'u'}, 'created_time': '2024-01-01T00:00:00.000Z',
+                 'callout': {'rich_text': [plain, linked_bold], 'icon': {'type': 'emoji', 'emoji': '💡'}}}
+
+        pruned = prune_notion_payload({'object': 'list', 'results': [block], 'has_more': False})
+
+        pruned_block = pruned['results'][0]
+        self.assertEqual({'object', 'id', 'type', 'has_children', 'callout'}, set(pruned_block))
+        self.assertEqual({'type': 'emoji', 'emoji': '💡'}, pruned_block['callout']['icon'])
+        self.assertEqual({'type': 'text', 'plain_text': 'plain', 'href': None}, pruned_block['callout']['rich_text'][0])
+        self.assertEqual(_extract_rich_text([plain, linked_bold]), _extract_rich_text(pruned_block['callout']['rich_text']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,35 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 
+from graph_rag.utils import cache_util
+from graph_rag.utils.kv_cache import SqliteCache
 from graph_rag.data_model.graph_data_classes import GraphPage, GraphRelation, RelationType, PageType
 from graph_rag.data_source.notion_provider import (NotionProvider,
                                                    _extract_notion_uuid,
                                                    normalize_uuid,
                                                    _extract_title,
-                                                   _extract_rich_text,
-                                                   first_time_after_second)
+                                                   _extract_rich_text)
+
+
+def _rich_text(text):
+    return {'type': 'text', 'plain_text': text, 'text': {'content': text}, 'href': None,
+            'annotations': {'bold': False, 'italic': False, 'strikethrough': False, 'underline': False, 'code': False,
+                            'color': 'default'}}
+
+
+def _page_info(page_id, title, obj='page'):
+    return {'id': page_id, 'object': obj, 'url': f"https://www.notion.so/{page_id}", 'archived': False,
+            'in_trash': False, 'last_edited_time': "2024-01-01T00:00:00.000Z",
+            'properties': {'Name': {'id': 'title', 'type': 'title', 'title': [_rich_text(title)]}}}
+
+
+def _block(block_id, block_type, payload, has_children=False):
+    return {'id': block_id, 'type': block_type, 'has_children': has_children, block_type: payload}
 
 
 class TestNotionProvider(unittest.TestCase):
@@ -74,14 +96,6 @@ class TestNotionProvider(unittest.TestCase):
         ]
         self.assertEqual(_extract_rich_text(rich_text), 'This is a test.')
 
-    def test_first_time_after_second(self):
-        time1 = "2023-08-01T12:00:00.000Z"
-        time2 = "2023-08-01T11:00:00.000Z"
-        self.assertTrue(first_time_after_second(time1, time2))
-
-        time3 = "2023-08-01T10:00:00.000Z"
-        self.assertFalse(first_time_after_second(time3, time2))
-
     @patch('graph_rag.utils.cache_util.load_prepared_pages_from_cache')
     @patch('graph_rag.utils.cache_util.load_page_relations_from_cache')
     def test_process_pages_with_cache(self, mock_load_pages, mock_load_relations):
@@ -101,3 +115,232 @@ class TestNotionProvider(unittest.TestCase):
         self.assertEqual(len(self.processor.page_relations), 1)
         mock_load_pages.assert_called_once_with("root_page_id")
         mock_load_relations.assert_called_once_with("root_page_id")
+
+    def test_crawl_deduplicates_pages_and_keeps_depth_first_order(self):
+        pages = {
+            'root': _page_info('root', 'Root'),
+            'a': _page_info('a', 'A'),
+            'b': _page_info('b', 'B'),
+            'c': _page_info('c', 'C'),
+        }
+        blocks = {
+            'root': [_block('a', 'child_page', {'title': 'A'}), _block('b', 'child_page', {'title': 'B'})],
+            'a': [_block('link_a', 'link_to_page', {'type': 'page_id', 'page_id': 'c'})],
+            'b': [_block('link_b', 'link_to_page', {'type': 'page_id', 'page_id': 'c'})],
+            'c': [],
+        }
+        notion_api = MagicMock()
+        notion_api.get_root_page_info.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_page_metadata.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_all_content_blocks.side_effect = lambda page_id: blocks[page_id]
+        self.processor.notion_api = notion_api
+        self.processor.config.CACHE_ENABLED = False
+
+        self.processor.process_pages('root')
+
+        self.assertEqual(['root', 'a', 'c', 'b'], list(self.processor.prepared_pages.keys()))
+        self.assertEqual([('root', 'a'), ('a', 'c'), ('root', 'b'), ('b', 'c')],
+                         [(r.from_page_id, r.to_page_id) for r in self.processor.page_relations])
+        self.assertEqual(['c', 'root'], sorted(c.args[0] for c in notion_api.get_root_page_info.call_args_list))
+        self.assertEqual("###Properties:\n**Name**: Root\nChild page: A\n\nChild page: B\n\n",
+                         self.processor.prepared_pages['root'].content)
+
+    def test_sync_changes_recrawls_only_edited_pages(self):
+        edited_a = _page_info('a', 'A')
+        edited_a['last_edited_time'] = "2024-02-01T00:00:00.000Z"
+        new_c = _page_info('c', 'C')
+        blocks = {'a': [_block('c', 'child_page', {'title': 'C'})], 'c': []}
+        notion_api = MagicMock()
+        notion_api.get_pages_edited_since.return_value = [edited_a]
+        notion_api.get_page_metadata.side_effect = lambda page_id: new_c
+        notion_api.get_all_content_blocks.side_effect = lambda page_id: blocks[page_id]
+        self.processor.notion_api = notion_api
+        self.processor.prepared_pages = {
+            'root': GraphPage(id='root', title='Root', type=PageType.PAGE, url='url'),
+            'a': GraphPage(id='a', title='Old A', type=PageType.PAGE, url='url'),
+        }
+        self.processor.page_relations = [GraphRelation('root', RelationType.CONTAINS, 'a'),
+                                         GraphRelation('a', RelationType.REFERENCES, 'https://removed.link')]
+
+        asyncio.run(self.processor.sync_changes('root', "2024-01-15T00:00:00.000Z"))
+
+        self.assertEqual(['root', 'a', 'c'], list(self.processor.prepared_pages.keys()))
+        self.assertEqual('A', self.processor.prepared_pages['a'].title)
+        self.assertEqual([('root', 'a'), ('a', 'c')],
+                         [(r.from_page_id, r.to_page_id) for r in self.processor.page_relations])
+        self.assertEqual(['a', 'c'], sorted(c.args[0] for c in notion_api.get_all_content_blocks.call_args_list))
+        notion_api.get_pages_edited_since.assert_called_once_with("2024-01-15T00:00:00.000Z")
+
+    def test_sync_changes_of_edited_database_adds_new_item_relation_once(self):
+        edited_db = _page_info('db', 'DB', obj='database')
+        edited_db['last_edited_time'] = "2024-02-01T00:00:00.000Z"
+        new_item = _page_info('item', 'Item')
+        notion_api = MagicMock()
+        notion_api.get_pages_edited_since.return_value = [edited_db]
+        notion_api.query_database_edited_since.return_value = [new_item]
+        notion_api.get_all_database_items.return_value = [new_item]
+        notion_api.get_all_content_blocks.return_value = []
+        self.processor.notion_api = notion_api
+        self.processor.prepared_pages = {
+            'root': GraphPage(id='root', title='Root', type=PageType.PAGE, url='url'),
+            'db': GraphPage(id='db', title='DB', type=PageType.DATABASE, url='url'),
+        }
+        self.processor.page_relations = [GraphRelation('root', RelationType.CONTAINS, 'db')]
+
+        asyncio.run(self.processor.sync_changes('root', "2024-01-15T00:00:00.000Z"))
+
+        self.assertEqual([('root', 'db'), ('db', 'item')],
+                         [(r.from_page_id, r.to_page_id) for r in self.processor.page_relations])
+
+    def test_sync_changes_removes_pages_of_removed_child_page_blocks(self):
+        edited_root = _page_info('root', 'Root')
+        edited_root['last_edited_time'] = "2024-02-01T00:00:00.000Z"
+        notion_api = MagicMock()
+        notion_api.get_pages_edited_since.return_value = [edited_root]
+        notion_api.get_all_content_blocks.return_value = [_block('a', 'child_page', {'title': 'A'})]
+        self.processor.notion_api = notion_api
+        self.processor.prepared_pages = {
+            'root': GraphPage(id='root', title='Root', type=PageType.PAGE, url='url'),
+            'a': GraphPage(id='a', title='A', type=PageType.PAGE, url='url'),
+            'b': GraphPage(id='b', title='B', type=PageType.PAGE, url='url'),
+            'c': GraphPage(id='c', title='C', type=PageType.PAGE, url='url'),
+        }
+        self.processor.page_relations = [GraphRelation('root', RelationType.CONTAINS, 'a'),
+                                         GraphRelation('root', RelationType.CONTAINS, 'b'),
+                                         GraphRelation('b', RelationType.CONTAINS, 'c')]
+
+        asyncio.run(self.processor.sync_changes('root', "2024-01-15T00:00:00.000Z"))
+
+        self.assertEqual(['root', 'a'], list(self.processor.prepared_pages.keys()))
+        self.assertEqual([('root', 'a')], [(r.from_page_id, r.to_page_id) for r in self.processor.page_relations])
+
+    def test_crawl_resumes_from_checkpoint(self):
+        pages = {'root': _page_info('root', 'Root'), 'a': _page_info('a', 'A'), 'b': _page_info('b', 'B')}
+        blocks = {
+            'root': [_block('a', 'child_page', {'title': 'A'}), _block('b', 'child_page', {'title': 'B'})],
+            'a': [],
+            'b': [_block('link_b', 'link_to_page', {'type': 'page_id', 'page_id': 'a'})],
+        }
+        notion_api = MagicMock()
+        notion_api.get_root_page_info.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_page_metadata.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_all_content_blocks.side_effect = lambda page_id: blocks[page_id]
+        self.processor.notion_api = notion_api
+        self.processor.checkpoint_interval = 1e-9
+        checkpoints = []
+
+        def save_checkpoint(_root_page_id, checkpoint):
+            serialized = json.dumps(checkpoint, default=cache_util.custom_serializer)
+            checkpoints.append(json.loads(serialized, object_hook=cache_util.custom_deserializer))
+
+        with patch('graph_rag.utils.cache_util.save_crawl_checkpoint', side_effect=save_checkpoint), \
+                patch('graph_rag.utils.cache_util.remove_crawl_checkpoint'):
+            expected_pages, expected_relations = asyncio.run(self.processor.crawl('root'))
+
+            # Resume from the first checkpoint: root is done, its sub-pages are still pending
+            self.assertEqual(['root'], list(checkpoints[0]['nodes'].keys()))
+            self.assertEqual({'a', 'b'}, set(checkpoints[0]['pending'].keys()))
+            notion_api.reset_mock()
+            resumed = NotionProvider(resume=True)
+            resumed.notion_api = notion_api
+            with patch('graph_rag.utils.cache_util.load_crawl_checkpoint', return_value=checkpoints[0]):
+                pages_after_resume, relations_after_resume = asyncio.run(resumed.crawl('root'))
+
+        self.assertNotIn('root', [c.args[0] for c in notion_api.get_all_content_blocks.call_args_list])
+        self.assertEqual([p.to_dict() for p in expected_pages.values()],
+                         [p.to_dict() for p in pages_after_resume.values()])
+        self.assertEqual([r.to_dict() for r in expected_relations], [r.to_dict() for r in relations_after_resume])
+
+    def test_block_tree_cache_reused_until_page_is_edited(self):
+        root = _page_info('root', 'Root')
+        blocks = {'root': [_block('toggle', 'toggle', {'rich_text': [_rich_text('T')]}, has_children=True)],
+                  'toggle': [_block('p', 'paragraph', {'rich_text': [_rich_text('P')]})]}
+        notion_api = MagicMock()
+        notion_api.get_root_page_info.side_effect = lambda page_id: root
+        notion_api.get_all_content_blocks.side_effect = lambda page_id: blocks[page_id]
+        self.processor.notion_api = notion_api
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.processor.block_tree_cache = SqliteCache(os.path.join(tmp_dir, 'block_trees.sqlite'))
+            first_pages, _ = asyncio.run(self.processor.crawl('root'))
+            self.assertEqual(2, notion_api.get_all_content_blocks.call_count)
+
+            notion_api.get_all_content_blocks.reset_mock()
+            cached_pages, _ = asyncio.run(self.processor.crawl('root'))
+            notion_api.get_all_content_blocks.assert_not_called()
+            self.assertEqual(first_pages['root'].content, cached_pages['root'].content)
+
+            root['last_edited_time'] = "2024-02-01T00:00:00.000Z"
+            asyncio.run(self.processor.crawl('root'))
+            self.assertEqual(2, notion_api.get_all_content_blocks.call_count)
+            self.processor.block_tree_cache.close()
+
+    def test_bookmarks_are_filled_after_crawl(self):
+        root = _page_info('root', 'Root')
+        notion_api = MagicMock()
+        notion_api.get_root_page_info.return_value = root
+        notion_api.get_all_content_blocks.return_value = [_block('bm', 'bookmark', {'url': 'https://a.com'}),
+                                                          _block('em', 'embed', {'url': 'https://dead.com'})]
+        self.processor.notion_api = notion_api
+        self.processor.bookmark_fetcher = MagicMock()
+        self.processor.bookmark_fetcher.fetch_all.return_value = {'https://a.com': ('A', 'About A'),
+                                                                  'https://dead.com': None}
+
+        pages, relations = asyncio.run(self.processor.crawl('root'))
+
+        self.processor.bookmark_fetcher.fetch_all.assert_called_once_with(['https://a.com', 'https://dead.com'])
+        self.assertEqual(('A', 'About A'), (pages['https://a.com'].title, pages['https://a.com'].content))
+        self.assertEqual('', pages['https://dead.com'].title)
+        self.assertEqual(['https://a.com', 'https://dead.com'], [r.to_page_id for r in relations])
+
+    @patch('graph_rag.utils.cache_util.save_sync_state_to_cache')
+    @patch('graph_rag.utils.cache_util.save_page_relations_to_cache')
+    @patch('graph_rag.utils.cache_util.save_prepared_pages_to_cache')
+    @patch('graph_rag.utils.cache_util.load_prepared_pages_from_cache', side_effect=FileNotFoundError)
+    def test_stream_data_yields_every_crawled_page_once(self, *_mocks):
+        pages = {'root': _page_info('root', 'Root'), 'a': _page_info('a', 'A'), 'b': _page_info('b', 'B')}
+        blocks = {'root': [_block('a', 'child_page', {'title': 'A'}), _block('b', 'child_page', {'title': 'B'})],
+                  'a': [_block('bm', 'bookmark', {'url': 'https://a.com'})], 'b': []}
+        notion_api = MagicMock()
+        notion_api.get_root_page_info.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_page_metadata.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_all_content_blocks.side_effect = lambda page_id: blocks[page_id]
+        self.processor.notion_api = notion_api
+        self.processor.bookmark_fetcher = MagicMock()
+        self.processor.bookmark_fetcher.fetch_all.return_value = {'https://a.com': ('A site', None)}
+        self.processor.config.NOTION_ROOT_PAGE_ID = 'root'
+        self.processor.config.NOTION_SYNC_MODE = 'full'
+
+        batches = list(self.processor.stream_data(batch_size=1))
+
+        streamed_pages = [page_id for batch in batches for page_id in batch.pages]
+        streamed_relations = [relation for batch in batches for relation in batch.relations]
+        self.assertEqual(sorted(self.processor.prepared_pages), sorted(streamed_pages))
+        self.assertEqual(len(self.processor.page_relations), len(streamed_relations))
+        self.assertEqual('A site', batches[-1].pages['https://a.com'].title)
+
+    @patch('graph_rag.utils.cache_util.save_sync_state_to_cache')
+    @patch('graph_rag.utils.cache_util.save_page_relations_to_cache')
+    @patch('graph_rag.utils.cache_util.save_prepared_pages_to_cache')
+    @patch('graph_rag.utils.cache_util.load_prepared_pages_from_cache', side_effect=FileNotFoundError)
+    def test_closing_stream_early_stops_ingest_thread(self, *_mocks):
+        child_ids = [f"page{i}" for i in range(10)]
+        pages = {'root': _page_info('root', 'Root'), **{page_id: _page_info(page_id, page_id) for page_id in child_ids}}
+        blocks = {'root': [_block(page_id, 'child_page', {'title': page_id}) for page_id in child_ids],
+                  **{page_id: [] for page_id in child_ids}}
+        notion_api = MagicMock()
+        notion_api.get_root_page_info.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_page_metadata.side_effect = lambda page_id: pages[page_id]
+        notion_api.get_all_content_blocks.side_effect = lambda page_id: blocks[page_id]
+        self.processor.notion_api = notion_api
+        self.processor.checkpoint_interval = 0
+        self.processor.config.NOTION_ROOT_PAGE_ID = 'root'
+        self.processor.config.NOTION_SYNC_MODE = 'full'
+        self.processor.config.PIPELINE_QUEUE_SIZE = 1
+
+        stream = self.processor.stream_data(batch_size=1)
+        next(stream)
+        stream.close()
+
+        ingest_thread = next(thread for thread in threading.enumerate() if thread.name == 'notion-stream')
+        ingest_thread.join(timeout=5)
+        self.assertFalse(ingest_thread.is_alive())
@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import requests
+
+from graph_rag.data_source.web_scraper import BookmarkFetcher
+from graph_rag.utils.kv_cache import SqliteCache
+
+
+def _response(chunks, content_type='text/html; charset=utf-8', status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {'Content-Type': content_type, **(headers or {})}
+    response.iter_content.return_value = iter(chunks)
+    response.__enter__.return_value = response
+    return response
+
+
+class TestBookmarkFetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.fetcher = BookmarkFetcher(max_workers=2, per_host_limit=1, max_head_bytes=1024, timeout=1)
+        self.fetcher.session = MagicMock()
+
+    def test_reads_only_head(self):
+        chunks = [b'<html><HEAD><title>T\xc3\xa9st</title><meta name="description" content="Desc"></he',
+                  b'ad><body>', b'never read']
+        response = _response(iter(chunks))
+        self.fetcher.session.get.return_value = response
+
+        self.assertEqual(('Tést', 'Desc'), self.fetcher.fetch('https://example.com'))
+        self.assertEqual([b'never read'], list(response.iter_content.return_value))
+
+    def test_stops_at_byte_cap(self):
+        chunks = [b'<html><title>Long</title>', b'x' * 2048, b'y' * 2048]
+        response = _response(iter(chunks))
+        self.fetcher.session.get.return_value = response
+
+        self.assertEqual(('Long', None), self.fetcher.fetch('https://example.com'))
+        self.assertEqual([b'y' * 2048], list(response.iter_content.return_value))
+
+    def test_fetch_all_isolates_failures(self):
+        def get(url, **kwargs):
+            if 'dead' in url:
+                raise requests.ConnectionError('unreachable')
+            return _response([b'<title>Ok</title></head>'])
+        self.fetcher.session.get.side_effect = get
+
+        self.assertEqual({'https://ok.com': ('Ok', None), 'https://dead.com': None},
+                         self.fetcher.fetch_all(['https://ok.com', 'https://dead.com']))
+
+
+    def test_busy_host_doesnt_hold_workers_of_other_hosts(self):
+        requested, busy_requests, max_busy_requests = [], [], []
+
+        def get(url, **kwargs):
+            requested.append(url)
+            if 'busy' in url:
+                busy_requests.append(url)
+                max_busy_requests.append(len(busy_requests))
+                time.sleep(0.05)
+                busy_requests.remove(url)
+            return _response([b'<title>Ok</title></head>'])
+        self.fetcher.session.get.side_effect = get
+        urls = [f"https://busy.com/{i}" for i in range(3)] + ['https://other.com']
+
+        results = self.fetcher.fetch_all(urls)
+
+        self.assertEqual(urls, list(results))
+        self.assertEqual(1, max(max_busy_requests))
+        self.assertIn('https://other.com', requested[:2])
+
+class TestBookmarkFetcherCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = SqliteCache(os.path.join(self.tmp_dir.name, 'bookmarks.sqlite'))
+        self.fetcher = BookmarkFetcher(max_workers=1, per_host_limit=1, max_head_bytes=1024, timeout=1,
+                                       cache=self.cache)
+        self.fetcher.session = MagicMock()
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_fresh_info_is_reused_and_stale_info_revalidated(self):
+        self.fetcher.session.get.return_value = _response([b'<title>A</title></head>'], headers={'ETag': '"v1"'})
+        self.assertEqual(('A', None), self.fetcher.fetch('https://a.com'))
+        self.assertEqual(('A', None), self.fetcher.fetch('https://a.com'))
+        self.assertEqual(1, self.fetcher.session.get.call_count)
+
+        self.fetcher.freshness_seconds = 0
+        self.fetcher.session.get.return_value = _response([], status_code=304)
+        self.assertEqual(('A', None), self.fetcher.fetch('https://a.com'))
+        self.assertEqual({'If-None-Match': '"v1"'}, self.fetcher.session.get.call_args.kwargs['headers'])
+
+    def test_failed_urls_are_backed_off(self):
+        response = _response([])
+        response.raise_for_status.side_effect = requests.HTTPError('404 Not Found')
+        self.fetcher.session.get.return_value = response
+
+        self.assertIsNone(self.fetcher.fetch_all(['https://dead.com'])['https://dead.com'])
+        self.assertIsNone(self.fetcher.fetch_all(['https://dead.com'])['https://dead.com'])
+        self.assertEqual(1, self.fetcher.session.get.call_count)
+
+        # Once the backoff expires the url is retried, and the next backoff is doubled
+        self.cache.set('https://dead.com', json.dumps({'failures': 1, 'retry_at': 0}).encode())
+        self.fetcher.fetch_all(['https://dead.com'])
+        self.assertEqual(2, self.fetcher.session.get.call_count)
+        entry = json.loads(self.cache.get('https://dead.com'))
+        self.assertEqual(2, entry['failures'])
+        self.assertAlmostEqual(time.time() + 2 * self.fetcher.failure_backoff_seconds, entry['retry_at'], delta=5)
+
+
+    def test_stale_info_is_served_while_url_is_backed_off(self):
+        self.fetcher.session.get.return_value = _response([b'<title>A</title></head>'])
+        self.assertEqual(('A', None), self.fetcher.fetch('https://a.com'))
+
+        self.fetcher.freshness_seconds = 0
+        self.fetcher.session.get.side_effect = requests.ConnectionError('unreachable')
+        self.assertEqual(('A', None), self.fetcher.fetch('https://a.com'))
+        self.assertEqual(('A', None), self.fetcher.fetch('https://a.com'))
+        # The third fetch is in the backoff window, so the host isn't requested again
+        self.assertEqual(2, self.fetcher.session.get.call_count)
+        self.assertEqual(1, json.loads(self.cache.get('https://a.com'))['failures'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,288 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from graph_rag.config import Config
+from graph_rag.data_model import ProcessedData, GraphPage, GraphRelation, PageType, RelationType
+from graph_rag.data_source import ContentProvider
+from graph_rag.pipeline import DataProcessingPipeline
+from graph_rag.processor import Processor
+
+
+def _page(page_id):
+    return GraphPage(id=page_id, title=page_id, type=PageType.PAGE, url='url')
+
+
+class StaticProvider(ContentProvider):
+    def __init__(self, pages, relations):
+        super().__init__()
+        self.data = ProcessedData({page.id: page for page in pages}, relations)
+
+    def _fetch_data(self) -> ProcessedData:
+        return self.data
+
+
+class FailingProvider(ContentProvider):
+    def _fetch_data(self) -> ProcessedData:
+        raise Exception("Source is down")
+
+
+class FlakyProvider(StaticProvider):
+    def __init__(self, pages, relations):
+        super().__init__(pages, relations)
+        self.down = False
+
+    def _fetch_data(self) -> ProcessedData:
+        if self.down:
+            raise Exception("Source is down")
+        return super()._fetch_data()
+
+
+class StreamingProcessor(Processor):
+    """Marks pages as soon as their batch arrives."""
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def _process(self, processed_content: ProcessedData):
+        self._process_batch(processed_content)
+
+    def _process_batch(self, batch: ProcessedData) -> ProcessedData:
+        self.batches.append(batch)
+        for page in batch.pages.values():
+            page.content = 'streamed'
+        return batch
+
+
+class RecordingProcessor(Processor):
+    """Processes all data at once, using the default buffering of batches."""
+    def __init__(self):
+        super().__init__()
+        self.processed = []
+        self.thread_names = set()
+
+    def _process(self, processed_content: ProcessedData):
+        self.thread_names.add(threading.current_thread().name)
+        self.processed.append(processed_content)
+
+
+class FailingProcessor(Processor):
+    def _process(self, processed_content: ProcessedData):
+        raise Exception("Processor failed")
+
+
+class TestDataProcessingPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = DataProcessingPipeline()
+        self.pipeline.config.PIPELINE_BATCH_SIZE = 2
+        self.pipeline.config.PIPELINE_QUEUE_SIZE = 1
+
+    def test_streaming_passes_all_batches_through_processors(self):
+        pages = [_page(str(i)) for i in range(5)]
+        relations = [GraphRelation('0', RelationType.CONTAINS, str(i)) for i in range(1, 5)]
+        self.pipeline.add_data_source(StaticProvider(pages, relations))
+        streaming, recording = StreamingProcessor(), RecordingProcessor()
+        self.pipeline.add_processor(streaming)
+        self.pipeline.add_processor(recording)
+
+        self.pipeline.run_streaming()
+
+        self.assertEqual([2, 2, 1], [len(batch.pages) for batch in streaming.batches])
+        self.assertEqual(1, len(recording.processed))
+        self.assertEqual(['0', '1', '2', '3', '4'], list(recording.processed[0].pages))
+        self.assertEqual(relations, recording.processed[0].relations)
+        self.assertTrue(all(page.content == 'streamed' for page in recording.processed[0].pages.values()))
+        self.assertEqual({'pipeline-RecordingProcessor'}, recording.thread_names)
+
+    def test_streaming_failure_stops_pipeline(self):
+        self.pipeline.add_data_source(FailingProvider())
+        recording = RecordingProcessor()
+        self.pipeline.add_processor(recording)
+
+        with self.assertRaisesRegex(Exception, "Source is down"):
+            self.pipeline.run_streaming()
+        self.assertEqual([], recording.processed)
+
+
+class SlowProvider(StaticProvider):
+    def _fetch_data(self) -> ProcessedData:
+        time.sleep(0.05)
+        return self.data
+
+
+class TestConcurrentDataSources(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = DataProcessingPipeline()
+        self.pipeline.config.PIPELINE_STREAMING = False
+        self.pipeline.config.PIPELINE_MAX_SOURCE_WORKERS = None
+        self.pipeline.config.PIPELINE_PAGE_CONFLICT_POLICY = 'keep_last'
+        self.pipeline.config.METRICS_REPORT_FILE = None
+        self.pipeline.config.METRICS_PROMETHEUS_TEXTFILE = None
+        self.pipeline.config.PIPELINE_INCREMENTAL = False
+        self.recording = RecordingProcessor()
+        self.pipeline.add_processor(self.recording)
+
+    def _add_sources(self):
+        first = _page('shared')
+        first.last_edited_time = '2024-02-01T00:00:00.000Z'
+        second = _page('shared')
+        second.last_edited_time = '2024-01-01T00:00:00.000Z'
+        # The slow source is added first, its data should still be merged first
+        self.pipeline.add_data_source(SlowProvider([_page('a'), first], [GraphRelation('a', RelationType.CONTAINS, 'shared')]))
+        self.pipeline.add_data_source(FailingProvider())
+        self.pipeline.add_data_source(StaticProvider([second, _page('b')], [GraphRelation('b', RelationType.CONTAINS, 'shared')]))
+        return first, second
+
+    def test_failing_source_does_not_abort_others_and_merge_is_ordered(self):
+        _, second = self._add_sources()
+
+        self.pipeline.run()
+
+        data = self.recording.processed[0]
+        self.assertEqual(['a', 'shared', 'b'], list(data.pages))
+        self.assertIs(second, data.pages['shared'])
+        self.assertEqual(['a', 'b'], [relation.from_page_id for relation in data.relations])
+
+    def test_conflict_policies(self):
+        first, second = self._add_sources()
+        for policy, expected in [('keep_first', first), ('latest_edited', first)]:
+            self.pipeline.config.PIPELINE_PAGE_CONFLICT_POLICY = policy
+            self.pipeline.run()
+            self.assertIs(expected, self.recording.processed[-1].pages['shared'], policy)
+
+        self.pipeline.config.PIPELINE_PAGE_CONFLICT_POLICY = 'fail'
+        with self.assertRaisesRegex(Exception, "Page shared is produced by both SlowProvider and StaticProvider"):
+            self.pipeline.run()
+
+    def test_all_sources_failing_raises(self):
+        self.pipeline.add_data_source(FailingProvider())
+        with self.assertRaisesRegex(Exception, "Source is down"):
+            self.pipeline.run()
+
+    def test_streaming_isolates_failing_source(self):
+        self.pipeline.config.PIPELINE_BATCH_SIZE = 1
+        self.pipeline.config.PIPELINE_QUEUE_SIZE = 1
+        self.pipeline.config.PIPELINE_PAGE_CONFLICT_POLICY = 'keep_first'
+        self._add_sources()
+
+        self.pipeline.run_streaming()
+
+        self.assertEqual({'a', 'b', 'shared'}, set(self.recording.processed[0].pages))
+
+
+class TestRunReport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = DataProcessingPipeline()
+        self.pipeline.config.DATA_DIR = self.temp_dir.name
+        self.pipeline.config.PIPELINE_STREAMING = False
+        self.pipeline.config.METRICS_REPORT_FILE = 'report.json'
+        self.pipeline.config.METRICS_PROMETHEUS_TEXTFILE = 'metrics.prom'
+        self.pipeline.config.PIPELINE_INCREMENTAL = False
+        self.pipeline.add_data_source(StaticProvider([_page('a'), _page('b')], []))
+        self.pipeline.add_processor(RecordingProcessor())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_run_writes_stage_metrics(self):
+        self.pipeline.run()
+
+        with open(os.path.join(self.temp_dir.name, 'report.json')) as f:
+            report = json.load(f)
+        self.assertTrue(report['succeeded'])
+        self.assertEqual([('StaticProvider', 'source', 0, 2), ('RecordingProcessor', 'processor', 2, 2)],
+                         [(stage['name'], stage['kind'], stage['items_in'], stage['items_out'])
+                          for stage in report['stages']])
+        with open(os.path.join(self.temp_dir.name, 'metrics.prom')) as f:
+            self.assertIn('graph_rag_stage_items_out{stage="StaticProvider",kind="source"} 2', f.read())
+
+    def test_failed_run_is_reported(self):
+        self.pipeline.data_sources = [FailingProvider()]
+
+        with self.assertRaisesRegex(Exception, "Source is down"):
+            self.pipeline.run()
+
+        with open(os.path.join(self.temp_dir.name, 'report.json')) as f:
+            report = json.load(f)
+        self.assertFalse(report['succeeded'])
+        self.assertEqual("Source is down", report['error'])
+
+
+class TestIncrementalRun(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = DataProcessingPipeline()
+        self.pipeline.config.DATA_DIR = self.temp_dir.name
+        self.pipeline.config.PIPELINE_STREAMING = False
+        self.pipeline.config.PIPELINE_INCREMENTAL = True
+        self.pipeline.config.METRICS_REPORT_FILE = None
+        self.pipeline.config.METRICS_PROMETHEUS_TEXTFILE = None
+        cache_config = Config()
+        cache_config.DATA_DIR = self.temp_dir.name
+        self.patcher = patch('graph_rag.utils.cache_util.config', cache_config)
+        self.patcher.start()
+        self.recording = RecordingProcessor()
+        self.pipeline.add_processor(self.recording)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _run(self, pages, relations):
+        self.pipeline.data_sources = [StaticProvider(pages, relations)]
+        self.pipeline.run()
+        return self.recording.processed[-1].changes
+
+    def test_changes_are_detected_against_previous_run(self):
+        changes = self._run([_page('a'), _page('b'), _page('c')], [])
+        self.assertEqual(({'a', 'b', 'c'}, set(), set()), (changes.added, changes.changed, changes.removed))
+
+        edited = _page('a')
+        edited.content = 'edited'
+        changes = self._run([edited, _page('b'), _page('d')], [GraphRelation('b', RelationType.REFERENCES, 'd')])
+        self.assertEqual(({'d'}, {'a', 'b'}, {'c'}), (changes.added, changes.changed, changes.removed))
+
+        changes = self._run([edited, _page('b'), _page('d')], [GraphRelation('b', RelationType.REFERENCES, 'd')])
+        self.assertEqual(set(), changes.dirty | changes.removed)
+
+    def test_failed_run_does_not_save_fingerprints(self):
+        self._run([_page('a')], [])
+        self.pipeline.add_processor(FailingProcessor())
+
+        with self.assertRaisesRegex(Exception, "Processor failed"):
+            self._run([_page('a'), _page('b')], [])
+        self.pipeline.processors.pop()
+
+        self.assertEqual({'b'}, self._run([_page('a'), _page('b')], []).added)
+
+
+    def test_pages_of_failed_source_are_not_removed(self):
+        flaky = FlakyProvider([_page('b')], [])
+        self.pipeline.data_sources = [StaticProvider([_page('a')], []), flaky]
+        self.pipeline.run()
+
+        flaky.down = True
+        self.pipeline.run()
+        changes = self.recording.processed[-1].changes
+        self.assertEqual(set(), changes.dirty | changes.removed)
+
+        # Once the source is back its pages are still unchanged, and they're removed when it stops producing them
+        flaky.down = False
+        self.pipeline.run()
+        changes = self.recording.processed[-1].changes
+        self.assertEqual(set(), changes.dirty | changes.removed)
+        flaky.data.pages = {}
+        self.pipeline.run()
+        self.assertEqual({'b'}, self.recording.processed[-1].changes.removed)
+
+if __name__ == '__main__':
+    unittest.main()
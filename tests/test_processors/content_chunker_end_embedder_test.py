@@ -1,8 +1,15 @@
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
+from random import Random
+from unittest.mock import patch, MagicMock, call
 
-from graph_rag.data_model.graph_data_classes import PageType, GraphPage
-from graph_rag.processor.content_chunker_and_embedder import ChunkCreator, TokenCounter, TextCleaner
+import tiktoken
+
+from graph_rag.config import Config
+from graph_rag.data_model.graph_data_classes import PageType, GraphPage, ProcessedData, PageChanges
+from graph_rag.processor.content_chunker_and_embedder import ChunkCreator, TokenCounter, TextCleaner, \
+    ContentChunkerAndEmbedder
+from graph_rag.utils.embedding_store import EmbeddingStore
 
 
 class TestTextCleaner(unittest.TestCase):
@@ -120,5 +127,194 @@ class TestChunkCreator(unittest.TestCase):
                           "and is intended for testing purposes"], result)
 
 
+class TestContentChunkerAndEmbedderChanges(unittest.TestCase):
+    def setUp(self):
+        patch('graph_rag.processor.content_chunker_and_embedder.TokenCounter').start()
+        patch('graph_rag.processor.embedding_backends.OpenAIEmbeddings').start()
+        patch('graph_rag.processor.content_chunker_and_embedder.EmbeddingStore').start()
+        self.processor = ContentChunkerAndEmbedder()
+        self.processor.config.CACHE_ENABLED = False
+        self.processor.embedding_store = None
+        self.processor.chunk_creator = MagicMock()
+        self.processor.chunk_creator.create_chunks.side_effect = lambda page: [page.content]
+        self.processor.chunk_creator.create_chunks_for_pages.side_effect = \
+            lambda pages: [self.processor.chunk_creator.create_chunks(page) for page in pages]
+        self.processor.embeddings.embed_documents.side_effect = lambda texts: [[1.0] for _ in texts]
+        self.processor.embedding_batcher.count_tokens = len
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_stored_embeddings_are_not_requested_again(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.processor.embedding_store = EmbeddingStore(temp_dir, 'model', 1)
+            self.processor.chunk_creator.create_chunks.side_effect = lambda page: page.content.split()
+            pages = {'a': GraphPage(id='a', title='a', type=PageType.PAGE, url='', content='1 2 2')}
+            self.processor.process_data(ProcessedData(pages, []))
+            pages['a'].content = '1 2 3'
+            self.processor.process_data(ProcessedData(pages, []))
+            self.processor.embedding_store.close()
+
+        self.assertEqual([call(['1', '2']), call(['3'])], self.processor.embeddings.embed_documents.call_args_list)
+        self.assertEqual(3, len(pages['a'].chunks))
+
+    def test_only_dirty_pages_are_embedded(self):
+        pages = {page_id: GraphPage(id=page_id, title=page_id, type=PageType.PAGE, url='', content=page_id)
+                 for page_id in ['added', 'changed', 'unchanged']}
+        data = ProcessedData(pages, [], changes=PageChanges(added={'added'}, changed={'changed'}, removed={'gone'}))
+
+        self.processor.process_data(data)
+
+        self.processor.embeddings.embed_documents.assert_called_once_with(['added', 'changed'])
+        self.assertEqual([], pages['unchanged'].chunks)
+
+    @patch('graph_rag.processor.content_chunker_and_embedder.cache_util')
+    def test_removed_pages_are_deleted_from_cache_and_others_kept(self, mock_cache_util):
+        self.processor.config.CACHE_ENABLED = True
+        mock_cache_util.load_prepared_pages_from_cache.return_value = {}
+        pages = {'added': GraphPage(id='added', title='added', type=PageType.PAGE, url='', content='added')}
+
+        self.processor.process_data(ProcessedData(pages, [], changes=PageChanges(added={'added'}, removed={'gone'})))
+
+        self.assertFalse(mock_cache_util.save_prepared_pages_to_cache.call_args.kwargs['replace'])
+        self.assertEqual(['gone'], mock_cache_util.remove_prepared_pages_from_cache.call_args.args[1])
+
+    def _create_processor(self, config: Config) -> ContentChunkerAndEmbedder:
+        with patch('graph_rag.processor.base_processor.Config', return_value=config):
+            processor = ContentChunkerAndEmbedder()
+        processor.embedding_store = None
+        processor.chunk_creator = self.processor.chunk_creator
+        processor.embedding_batcher.count_tokens = len
+        return processor
+
+    def test_pages_are_embedded_again_when_embeddings_backend_changes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = Config()
+            config.DATA_DIR = temp_dir
+            config.CACHE_ENABLED = True
+            config.EMBEDDINGS_BACKEND = 'hash'
+            config.EMBEDDINGS_DIMENSIONS = 8
+            pages = {'a': GraphPage(id='a', title='a', type=PageType.PAGE, url='', content='some text')}
+            with patch('graph_rag.utils.cache_util.config', config):
+                self._create_processor(config).process_data(ProcessedData(pages, [], changes=PageChanges(added={'a'})))
+                self.assertEqual(8, len(pages['a'].chunks[0].embedding))
+
+                unchanged = PageChanges()
+                self._create_processor(config).process_data(ProcessedData(pages, [], changes=unchanged))
+                self.assertEqual(set(), unchanged.changed)
+
+                config.EMBEDDINGS_BACKEND = 'openai'
+                processor = self._create_processor(config)
+                processor.embeddings.embed_documents.side_effect = lambda texts: [[1.0] for _ in texts]
+                changes = PageChanges()
+                processor.process_data(ProcessedData(pages, [], changes=changes))
+
+        processor.embeddings.embed_documents.assert_called_once_with(['some text'])
+        self.assertEqual({'a'}, changes.changed)
+        self.assertEqual([1.0], pages['a'].chunks[0].embedding)
+
+    def test_pages_are_embedded_again_when_embeddings_get_truncated(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = Config()
+            config.DATA_DIR = temp_dir
+            config.CACHE_ENABLED = True
+            config.EMBEDDINGS_BACKEND = 'hash'
+            config.EMBEDDINGS_DIMENSIONS = 8
+            pages = {'a': GraphPage(id='a', title='a', type=PageType.PAGE, url='', content='some longer text')}
+            with patch('graph_rag.utils.cache_util.config', config):
+                self._create_processor(config).process_data(ProcessedData(pages, [], changes=PageChanges(added={'a'})))
+
+                config.EMBEDDINGS_TRUNCATE_DIMENSIONS = 4
+                changes = PageChanges()
+                self._create_processor(config).process_data(ProcessedData(pages, [], changes=changes))
+
+        self.assertEqual({'a'}, changes.changed)
+        self.assertEqual(4, len(pages['a'].chunks[0].embedding))
+
+    def test_embeddings_are_scattered_back_to_pages(self):
+        self.processor.chunk_creator.create_chunks.side_effect = lambda page: page.content.split()
+        self.processor.embeddings.embed_documents.side_effect = lambda texts: [[float(text)] for text in texts]
+        self.processor.embedding_batcher.max_inputs_per_request = 2
+        pages = {page_id: GraphPage(id=page_id, title=page_id, type=PageType.PAGE, url='', content=content)
+                 for page_id, content in [('a', '1 2 3'), ('b', '4'), ('c', '5 6')]}
+
+        self.processor.process_data(ProcessedData(pages, []))
+
+        self.assertEqual(3, self.processor.embeddings.embed_documents.call_count)
+        self.assertEqual({'a': [('1', [1.0]), ('2', [2.0]), ('3', [3.0])], 'b': [('4', [4.0])], 'c': [('5', [5.0]), ('6', [6.0])]},
+                         {page_id: [(chunk.content, chunk.embedding) for chunk in page.chunks] for page_id, page in pages.items()})
+
+
+def _byte_level_encoding() -> tiktoken.Encoding:
+    """Small offline BPE encoding, tokens carry their leading space like the OpenAI encodings."""
+    merges = [b'th', b'he', b'the', b' t', b' the', b'.\n', b'in', b'is', b' is', b'en', b'ce', b'.', b' a']
+    mergeable_ranks = {bytes([i]): i for i in range(256)}
+    for merge in merges:
+        mergeable_ranks.setdefault(merge, len(mergeable_ranks))
+    return tiktoken.Encoding('test_byte_level', pat_str=r"""'s| ?\w+| ?[^\s\w]+|\s+(?!\S)|\s+""",
+                             mergeable_ranks=mergeable_ranks, special_tokens={})
+
+
+def _legacy_sentence_aware_chunks(encoder, content: str, available_tokens: int, overlap: int) -> list[str]:
+    """Chunking by re-slicing and re-encoding token windows, the reference for the single-pass chunker."""
+    chunks = []
+    tokens = encoder.encode(content)
+    while tokens:
+        chunk_text = encoder.decode(tokens[:available_tokens])
+        last_punctuation = max(chunk_text.rfind(char) for char in '.?!\n')
+        if last_punctuation != -1:
+            chunk_text = chunk_text[: last_punctuation + 1]
+        if chunk_text and not chunk_text.isspace():
+            chunks.append(chunk_text)
+        chunk_size = len(encoder.encode(chunk_text))
+        if chunk_size >= len(tokens):
+            break
+        tokens = tokens[chunk_size - overlap if chunk_size > overlap else chunk_size:]
+    return chunks
+
+
+class TestSinglePassChunker(unittest.TestCase):
+    def setUp(self):
+        self.encoding = _byte_level_encoding()
+        with patch('tiktoken.encoding_for_model', return_value=self.encoding):
+            self.chunk_creator = ChunkCreator(chunk_size=40, chunk_overlap=5, token_counter=TokenCounter('test'))
+
+    def test_chunks_are_equivalent_to_legacy_chunker(self):
+        random = Random(0)
+        words = ['the', 'is', 'a', 'sentence', 'content', 'thinking', 'end.', 'why?', 'yes!', 'line.\n', '\n\n']
+        for _ in range(20):
+            content = ' '.join(random.choice(words) for _ in range(random.randint(1, 300)))
+            for available_tokens in [8, 25, 60]:
+                self.assertEqual(_legacy_sentence_aware_chunks(self.encoding, content, available_tokens, 5),
+                                 self.chunk_creator.create_sentence_aware_chunks(content, available_tokens))
+
+    def test_pages_are_chunked_in_batch_and_in_worker_processes_in_page_order(self):
+        random = Random(1)
+        words = ['the', 'is', 'a', 'sentence', 'content', 'end.', 'why?', 'line.\n']
+        pages = [GraphPage(id=str(i), title=f"Page {i}", type=PageType.PAGE, url='', last_edited_time='2024-01-01',
+                           content=' '.join(random.choice(words) for _ in range(random.randint(0, 200))))
+                 for i in range(12)]
+        with patch('tiktoken.encoding_for_model', return_value=self.encoding):
+            chunk_creator = ChunkCreator(chunk_size=120, chunk_overlap=5, token_counter=TokenCounter('test'))
+        expected = [chunk_creator.create_chunks(page) for page in pages]
+
+        self.assertEqual(expected, chunk_creator.create_chunks_for_pages(pages))
+        chunk_creator.workers = 3
+        self.assertEqual(expected, chunk_creator.create_chunks_for_pages(pages))
+
+    def test_constant_part_longer_than_chunk_size_does_not_loop_forever(self):
+        self.assertEqual(['a', 'b', '.'], self.chunk_creator.create_sentence_aware_chunks('ab.', -10))
+
+    def test_multibyte_characters_are_not_split(self):
+        content = 'Größe ändern 😀 schön. ' * 20
+
+        chunks = self.chunk_creator.create_sentence_aware_chunks(content, 12)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all('\ufffd' not in chunk and chunk in content for chunk in chunks))
+        self.assertTrue(content.startswith(chunks[0]))
+        self.assertTrue(content.rstrip().endswith(chunks[-1]))
+
+
 if __name__ == '__main__':
     unittest.main()
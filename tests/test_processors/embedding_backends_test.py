@@ -0,0 +1,130 @@
+import math
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from graph_rag.config import Config
+from graph_rag.processor.embedding_backends import HashEmbeddings, LocalEmbeddings, TruncatedEmbeddings, \
+    create_embeddings
+from graph_rag.utils.vector_index import embedding_dimensions, embedding_model_id
+
+
+class FakeModel:
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def encode(self, texts, batch_size, normalize_embeddings):
+        with self._lock:
+            self.batches.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class TestHashEmbeddings(unittest.TestCase):
+    def test_embeddings_are_deterministic_and_normalized(self):
+        embeddings = HashEmbeddings(64)
+
+        vector = embeddings.embed_query("Knowledge graph of Notion pages")
+
+        self.assertEqual(vector, HashEmbeddings(64).embed_documents(["Knowledge graph of Notion pages"])[0])
+        self.assertEqual(64, len(vector))
+        self.assertAlmostEqual(1.0, math.sqrt(sum(value * value for value in vector)))
+        self.assertEqual([0.0] * 64, embeddings.embed_query("..."))
+
+    def test_texts_sharing_words_are_more_similar(self):
+        embeddings = HashEmbeddings(256)
+        query, related, unrelated = embeddings.embed_documents(
+            ["graph of notion pages", "notion pages in a graph", "weather forecast for tomorrow"])
+
+        def similarity(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        self.assertGreater(similarity(query, related), similarity(query, unrelated))
+
+
+class TestLocalEmbeddings(unittest.TestCase):
+    def test_documents_are_batched_by_length_and_returned_in_order(self):
+        model = FakeModel()
+        embeddings = LocalEmbeddings('model', batch_size=2, workers=2, model=model)
+        texts = ['aaaa', 'a', 'aaa', 'aa', 'aaaaa']
+
+        result = embeddings.embed_documents(texts)
+
+        self.assertEqual([[float(len(text)), 1.0] for text in texts], result)
+        self.assertCountEqual([['a', 'aa'], ['aaa', 'aaaa'], ['aaaaa']], model.batches)
+
+    def test_concurrent_queries_are_encoded_together(self):
+        model = FakeModel()
+        embeddings = LocalEmbeddings('model', model=model)
+        results = {}
+        threads = [threading.Thread(target=lambda text=text: results.update({text: embeddings.embed_query(text)}))
+                   for text in ['a', 'bb', 'ccc']]
+
+        with patch('graph_rag.processor.embedding_backends.QUERY_BATCH_WAIT_SECONDS', 0.2):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual({'a': [1.0, 1.0], 'bb': [2.0, 1.0], 'ccc': [3.0, 1.0]}, results)
+        self.assertLess(len(model.batches), 3)
+
+    def test_model_of_other_dimensions_is_rejected(self):
+        sentence_transformers = MagicMock()
+        sentence_transformers.SentenceTransformer.return_value.get_sentence_embedding_dimension.return_value = 384
+
+        with patch.dict('sys.modules', {'sentence_transformers': sentence_transformers}):
+            with self.assertRaisesRegex(Exception, 'Set embeddings.dimensions to 384'):
+                LocalEmbeddings('all-MiniLM-L6-v2', dimensions=3072).embed_query('text')
+            self.assertEqual(384, LocalEmbeddings('all-MiniLM-L6-v2', dimensions=384).model
+                             .get_sentence_embedding_dimension())
+
+    def test_unknown_pool_is_rejected(self):
+        with self.assertRaises(Exception):
+            LocalEmbeddings('model', pool='gpu')
+
+
+class TestCreateEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.config = Config()
+
+    def test_backend_is_selected_by_config(self):
+        self.config.EMBEDDINGS_BACKEND = 'hash'
+        self.config.EMBEDDINGS_DIMENSIONS = 32
+        embeddings = create_embeddings(self.config)
+        self.assertIsInstance(embeddings, HashEmbeddings)
+        self.assertEqual(32, len(embeddings.embed_query("text")))
+        self.assertEqual('hash', embedding_model_id(self.config))
+
+        self.config.EMBEDDINGS_BACKEND = 'local'
+        self.config.EMBEDDINGS_LOCAL_MODEL = 'all-MiniLM-L6-v2'
+        self.assertIsInstance(create_embeddings(self.config), LocalEmbeddings)
+        self.assertEqual('local/all-MiniLM-L6-v2', embedding_model_id(self.config))
+
+        self.config.EMBEDDINGS_BACKEND = 'openai'
+        with patch('graph_rag.processor.embedding_backends.OpenAIEmbeddings', MagicMock()) as openai_embeddings:
+            self.assertIs(openai_embeddings.return_value, create_embeddings(self.config))
+        self.assertEqual(f"openai/{self.config.EMBEDDINGS_MODEL}", embedding_model_id(self.config))
+
+    def test_embeddings_are_truncated_for_documents_and_queries(self):
+        self.config.EMBEDDINGS_BACKEND = 'hash'
+        self.config.EMBEDDINGS_DIMENSIONS = 64
+        self.config.EMBEDDINGS_TRUNCATE_DIMENSIONS = 16
+        embeddings = create_embeddings(self.config)
+
+        self.assertIsInstance(embeddings, TruncatedEmbeddings)
+        self.assertEqual(16, embedding_dimensions(self.config))
+        text = "knowledge graph of notion pages, projects, goals, values, habits and ideas"
+        query = embeddings.embed_query(text)
+        self.assertEqual([query], embeddings.embed_documents([text]))
+        self.assertEqual(16, len(query))
+        self.assertAlmostEqual(1.0, math.sqrt(sum(value * value for value in query)))
+
+    def test_unknown_backend_is_rejected(self):
+        self.config.EMBEDDINGS_BACKEND = 'unknown'
+        with self.assertRaises(Exception):
+            create_embeddings(self.config)
+
+
+if __name__ == '__main__':
+    unittest.main()
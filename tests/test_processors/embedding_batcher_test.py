@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+
+from graph_rag.processor.embedding_batcher import EmbeddingBatcher
+
+
+class TestEmbeddingBatcher(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def _embed_documents(self, texts):
+        with self.lock:
+            self.requests.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    def test_requests_respect_input_and_token_limits(self):
+        batcher = EmbeddingBatcher(self._embed_documents, lambda text: len(text), max_inputs_per_request=3,
+                                   max_tokens_per_request=6)
+        texts = ['a', 'bb', 'ccc', 'd', 'e', 'f', 'g', 'hhhhhhhh']
+
+        embeddings = batcher.embed(texts)
+
+        self.assertEqual([[float(len(text))] for text in texts], embeddings)
+        self.assertEqual([['a', 'bb', 'ccc'], ['d', 'e', 'f'], ['g'], ['hhhhhhhh']],
+                         sorted(self.requests, key=lambda request: texts.index(request[0])))
+
+    def test_requests_are_sent_concurrently_and_results_kept_in_order(self):
+        in_flight, max_in_flight = [0], [0]
+
+        def slow_embed_documents(texts):
+            with self.lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            # Earlier requests finish last
+            time.sleep(0.05 / int(texts[0]))
+            with self.lock:
+                in_flight[0] -= 1
+            return [[float(text)] for text in texts]
+
+        batcher = EmbeddingBatcher(slow_embed_documents, lambda text: 1, max_inputs_per_request=1,
+                                   max_concurrent_requests=4)
+        progress = []
+
+        embeddings = batcher.embed([str(i) for i in range(1, 9)], on_progress=progress.append)
+
+        self.assertEqual([[float(i)] for i in range(1, 9)], embeddings)
+        self.assertEqual(4, max_in_flight[0])
+        self.assertEqual([1] * 8, progress)
+
+    def test_failed_request_raises(self):
+        def failing_embed_documents(texts):
+            raise Exception("Rate limit exceeded")
+
+        batcher = EmbeddingBatcher(failing_embed_documents, lambda text: 1)
+        with self.assertRaisesRegex(Exception, "Rate limit exceeded"):
+            batcher.embed(['text'])
+        self.assertEqual([], batcher.embed([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
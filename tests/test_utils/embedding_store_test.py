@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from graph_rag.utils.embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = EmbeddingStore(self.temp_dir.name, 'text-embedding-3-large', 3)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_put_and_get_many(self):
+        self.store.put_many(['a', 'b'], [[0.5, 1.0, -2.0], [3.0, 4.0, 5.0]])
+        self.store.put_many(['b', 'c'], [[9.0, 9.0, 9.0], [6.0, 7.0, 8.0]])
+
+        self.assertEqual([[6.0, 7.0, 8.0], None, [0.5, 1.0, -2.0], [3.0, 4.0, 5.0]],
+                         self.store.get_many(['c', 'unknown', 'a', 'b']))
+        self.assertEqual(3, len(self.store))
+        self.assertEqual(3 * 3 * 4, os.path.getsize(self.store.vectors_path))
+
+    def test_store_is_persistent_and_keyed_by_model_and_dimensions(self):
+        self.store.put_many(['a'], [[1.0, 2.0, 3.0]])
+        self.store.close()
+
+        self.store = EmbeddingStore(self.temp_dir.name, 'text-embedding-3-large', 3)
+        self.assertEqual([[1.0, 2.0, 3.0]], self.store.get_many(['a']))
+        other_model = EmbeddingStore(self.temp_dir.name, 'other-model', 3)
+        self.assertEqual([None], other_model.get_many(['a']))
+        other_model.close()
+
+    def test_embeddings_of_wrong_dimensions_are_skipped(self):
+        self.store.put_many(['a', 'b'], [[1.0, 2.0], [1.0, 2.0, 3.0]])
+
+        self.assertEqual([None, [1.0, 2.0, 3.0]], self.store.get_many(['a', 'b']))
+
+    def test_partial_record_of_interrupted_write_is_discarded(self):
+        self.store.put_many(['a'], [[1.0, 2.0, 3.0]])
+        with open(self.store.vectors_path, 'ab') as f:
+            f.write(b'\x00' * 5)
+
+        self.store.put_many(['b'], [[4.0, 5.0, 6.0]])
+
+        self.assertEqual([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], self.store.get_many(['a', 'b']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+import unittest
+
+from graph_rag.utils.kv_cache import SqliteCache, LRUMemoryCache
+
+
+class TestSqliteCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'cache', 'test.sqlite')
+        self.cache = SqliteCache(self.file_path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_set_and_get(self):
+        self.cache.set('key', b'value')
+        self.assertEqual(b'value', self.cache.get('key'))
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_persists_between_instances(self):
+        self.cache.set('key', b'value')
+        self.cache.close()
+        self.cache = SqliteCache(self.file_path)
+        self.assertEqual(b'value', self.cache.get('key'))
+        self.assertEqual(5, self.cache.total_size)
+
+    def test_expired_entry_is_not_returned(self):
+        self.cache.set('key', b'value', ttl_seconds=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(0, self.cache.total_size)
+
+    def test_vacuum_expired(self):
+        self.cache.set('expired', b'value', ttl_seconds=0.01)
+        self.cache.set('fresh', b'value', ttl_seconds=60)
+        self.cache.set('eternal', b'value')
+        time.sleep(0.02)
+        self.assertEqual(1, self.cache.vacuum_expired(compact=True))
+        self.assertEqual(2, len(self.cache))
+
+    def test_evicts_least_recently_used_entries(self):
+        self.cache.max_size_bytes = 30
+        self.cache.set('a', b'x' * 10)
+        self.cache.set('b', b'x' * 10)
+        self.cache.set('c', b'x' * 10)
+        self.cache.get('a')
+        self.cache.set('d', b'x' * 10)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('d'))
+        self.assertLessEqual(self.cache.total_size, 30)
+
+    def test_overwrite_updates_size(self):
+        self.cache.set('key', b'x' * 10)
+        self.cache.set('key', b'x' * 4)
+        self.assertEqual(4, self.cache.total_size)
+        self.cache.delete('key')
+        self.assertEqual(0, self.cache.total_size)
+
+
+class TestLRUMemoryCache(unittest.TestCase):
+    def test_evicts_least_recently_used_entries_over_budget(self):
+        cache = LRUMemoryCache(max_size_bytes=20)
+        cache.set('a', 'A', 10)
+        cache.set('b', 'B', 10)
+        self.assertEqual('A', cache.get('a'))
+        cache.set('c', 'C', 10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual('A', cache.get('a'))
+        self.assertEqual('C', cache.get('c'))
+        self.assertEqual({'entries': 2, 'size_bytes': 20, 'hits': 3, 'misses': 1, 'evictions': 1}, cache.stats())
+
+    def test_values_larger_than_budget_are_not_stored(self):
+        cache = LRUMemoryCache(max_size_bytes=5)
+        cache.set('a', 'A', 6)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, cache.stats()['size_bytes'])
+
+    def test_max_age(self):
+        cache = LRUMemoryCache(max_size_bytes=100)
+        cache.set('a', 'A', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a', max_age_seconds=0.01))
+        self.assertEqual(0, len(cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
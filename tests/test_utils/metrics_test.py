@@ -0,0 +1,43 @@
+import unittest
+
+import httpx
+
+from graph_rag.utils.metrics import PipelineMetrics
+
+
+class TestPipelineMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = PipelineMetrics()
+
+    def test_stage_accumulates_time_items_and_calls(self):
+        self.metrics.record_call('notion', bytes_received=100)
+        for _ in range(2):
+            with self.metrics.measure('Chunker', 'processor', items_in=3) as stage:
+                stage.items_out += 3
+                self.metrics.record_call('openai', bytes_sent=10, bytes_received=20, seconds=0.5)
+
+        stage = self.metrics.report()['stages'][0]
+        self.assertEqual(('Chunker', 'processor', 6, 6), (stage['name'], stage['kind'], stage['items_in'], stage['items_out']))
+        self.assertEqual({'openai': {'calls': 2, 'errors': 0, 'bytes_sent': 20, 'bytes_received': 40, 'seconds': 1.0}},
+                         stage['calls'])
+        self.assertEqual(1, self.metrics.report()['calls']['notion']['calls'])
+
+    def test_httpx_event_hooks_record_calls(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b'{"data": []}'))
+        with httpx.Client(transport=transport, event_hooks=self.metrics.httpx_event_hooks('openai')) as client:
+            client.post('https://api.openai.com/v1/embeddings', content=b'{"input": "text"}')
+
+        stats = self.metrics.report()['calls']['openai']
+        self.assertEqual((1, 0, 17, 12), (stats['calls'], stats['errors'], stats['bytes_sent'], stats['bytes_received']))
+
+    def test_reset_clears_run(self):
+        with self.metrics.measure('Source', 'source'):
+            self.metrics.record_call('neo4j', error=True)
+        self.metrics.reset()
+
+        report = self.metrics.report()
+        self.assertEqual(([], {}), (report['stages'], report['calls']))
+
+
+if __name__ == '__main__':
+    unittest.main()
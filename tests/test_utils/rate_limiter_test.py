@@ -0,0 +1,33 @@
+import time
+import unittest
+
+from graph_rag.utils.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_does_not_wait(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        waited = [bucket.acquire() for _ in range(3)]
+        self.assertEqual([0.0, 0.0, 0.0], waited)
+
+    def test_waits_for_refill_when_empty(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        bucket.acquire()
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+    def test_pause_blocks_all_callers(self):
+        bucket = TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.05)
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.045)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+
+import httpx
+
+from graph_rag.utils.rate_scheduler import PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, RateScheduler, \
+    parse_reset_duration
+
+
+class TestRateScheduler(unittest.TestCase):
+    def test_interactive_requests_are_served_before_backfill(self):
+        scheduler = RateScheduler('test', requests_per_minute=60000, tokens_per_minute=1000000, max_concurrency=1)
+        order = []
+
+        def request(name, priority):
+            with scheduler.slot(priority=priority):
+                order.append(name)
+
+        with scheduler.slot():
+            threads = [threading.Thread(target=request, args=('backfill', PRIORITY_BACKFILL))]
+            threads[0].start()
+            time.sleep(0.05)
+            threads.append(threading.Thread(target=request, args=('query', PRIORITY_INTERACTIVE)))
+            threads[1].start()
+            time.sleep(0.05)
+            self.assertEqual(2, scheduler.stats()['waiting'])
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['query', 'backfill'], order)
+
+    def test_budgets_follow_response_headers(self):
+        scheduler = RateScheduler('test', requests_per_minute=60000, tokens_per_minute=1000000, max_concurrency=4)
+
+        scheduler.on_response(200, {'x-ratelimit-limit-requests': '3000', 'x-ratelimit-remaining-requests': '0',
+                                    'x-ratelimit-limit-tokens': '50000'})
+        start = time.monotonic()
+        with scheduler.slot(tokens=10):
+            pass
+
+        # A request is refilled every 20ms at 3000 requests per minute
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+        stats = scheduler.stats()
+        self.assertEqual((3000, 50000, 1, 10), (stats['request_limit_per_minute'], stats['token_limit_per_minute'],
+                                                stats['requests'], stats['tokens']))
+
+    def test_concurrency_is_halved_on_rate_limit_and_grows_back(self):
+        scheduler = RateScheduler('test', requests_per_minute=60000, tokens_per_minute=1000000, max_concurrency=8)
+
+        scheduler.on_response(429, {'retry-after': '0'})
+        self.assertEqual(4, scheduler.concurrency)
+        for _ in range(4):
+            scheduler.on_response(200, {})
+        self.assertEqual(5, scheduler.concurrency)
+        self.assertEqual(1, scheduler.stats()['throttled'])
+
+    def test_transport_schedules_requests_and_pauses_after_rate_limit(self):
+        scheduler = RateScheduler('test', requests_per_minute=60000, tokens_per_minute=1000000, max_concurrency=2)
+        responses = iter([httpx.Response(429, headers={'x-ratelimit-reset-requests': '50ms'}), httpx.Response(200)])
+        transport = scheduler.httpx_transport(transport=httpx.MockTransport(lambda request: next(responses)))
+
+        with httpx.Client(transport=transport) as client:
+            self.assertEqual(429, client.post('https://api.openai.com/v1/embeddings', content=b'x' * 400).status_code)
+            start = time.monotonic()
+            self.assertEqual(200, client.post('https://api.openai.com/v1/embeddings', content=b'x' * 400).status_code)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        stats = scheduler.stats()
+        # Concurrency was halved to 1 by the 429 and grew back after the successful response
+        self.assertEqual((2, 200, 1, 2), (stats['requests'], stats['tokens'], stats['throttled'], stats['concurrency']))
+
+    def test_parse_reset_duration(self):
+        self.assertEqual(1.0, parse_reset_duration('1s'))
+        self.assertEqual(360.0, parse_reset_duration('6m0s'))
+        self.assertAlmostEqual(0.02, parse_reset_duration('20ms'))
+        self.assertIsNone(parse_reset_duration(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,14 @@
+import unittest
+
+from graph_rag.utils.vector_index import truncate_embedding
+
+
+class TestCompression(unittest.TestCase):
+    def test_truncated_embedding_is_normalized(self):
+        truncated = truncate_embedding([0.6, 0.0, 0.8], 2)
+        self.assertEqual([1.0, 0.0], truncated)
+        self.assertEqual([0.0, 0.0], truncate_embedding([0.0, 0.0, 1.0], 2))
+
+
+if __name__ == '__main__':
+    unittest.main()